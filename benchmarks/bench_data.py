@@ -0,0 +1,245 @@
+# Benchmark jalur data pada data sintetis 1x/10x/100x ukuran produksi:
+# load_data (snapshot dibangun / dibaca / refresh inkremental), validasi/pembersihan, filter_data per time frame, agregasi
+# Dashboard (pandas dan DuckDB), deteksi trip anomali, prakiraan, konteks Sistok Assistant, pivot tab Analysis dan ekspor laporan.
+#
+#   python -m benchmarks.bench_data
+#   python -m benchmarks.bench_data --scales 1 10 100
+#   python -m benchmarks.bench_data --baseline benchmarks/results/data.json
+import argparse
+import os
+import shutil
+import sys
+
+import pandas as pd
+
+from benchmarks import synthetic
+from benchmarks.common import compare_results, report, save_results, time_call
+
+import sistok_analysis
+import sistok_anomaly
+import sistok_assistant
+import sistok_clean
+import sistok_completeness
+import sistok_data
+import sistok_forecast
+import sistok_query
+import sistok_report
+import sistok_sql
+
+# Data sintetis dan snapshot-nya disimpan di sini (tidak ikut git), dibuat
+# sekali per (skala, seed) lalu dipakai ulang
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+TIME_FRAMES = ['Daily', 'Weekly', 'Monthly', 'Yearly']
+
+
+def dataset_path(scale, seed=0):
+    path = os.path.join(DATA_DIR, f'data_bersih-x{scale}-s{seed}.csv')
+    if not os.path.exists(path):
+        print(f'Membuat data sintetis x{scale} ({synthetic.PRODUCTION_ROWS * scale:,} baris)...')
+        synthetic.write_trips_csv(path, synthetic.PRODUCTION_ROWS * scale, seed=seed)
+    return path
+
+
+def upload_path(scale, seed=0):
+    path = os.path.join(DATA_DIR, f'data_kembung-x{scale}-s{seed}.csv')
+    if not os.path.exists(path):
+        synthetic.write_upload_csv(path, synthetic.UPLOAD_ROWS * scale, seed=seed)
+    return path
+
+
+# Arahkan sistok_data ke CSV sintetis dengan folder snapshot sendiri, supaya
+# snapshot data asli di data/cache tidak tersentuh
+def use_dataset(csv_path, cache_dir):
+    sistok_data.SOURCE_PATH = csv_path
+    sistok_data.CACHE_DIR = cache_dir
+
+
+# Filter yang diukur: tanpa filter (semua baris) dan filter khas Dashboard
+# (pelabuhan tersibuk, 2 jenis ikan teratas, 4 tahun)
+def selections(df):
+    port = df['pelabuhan_kedatangan_id'].value_counts().index[0]
+    species = df['nama_ikan_id'].value_counts().index[:2].tolist()
+    return {
+        'semua': (None, [], None, None),
+        'filter': (port, species, 2020, 2023),
+    }
+
+
+def bench_load(metrics, prefix, repeat):
+    shutil.rmtree(sistok_data.CACHE_DIR, ignore_errors=True)
+    metrics[f'{prefix}.load_data_ms.cold'] = time_call(sistok_data.load_dataset, repeat=1)
+    metrics[f'{prefix}.load_data_ms.warm'] = time_call(sistok_data.load_dataset, repeat=repeat)
+    return sistok_data.load_dataset()
+
+
+# Refresh inkremental: salinan CSV ditambah 0,5% baris baru (kedatangan di
+# hari terakhir) di akhir file, lalu load_data hanya mem-parse baris baru
+def bench_refresh(metrics, prefix, csv_path, rows):
+    copy = os.path.join(sistok_data.CACHE_DIR, 'refresh.csv')
+    shutil.copyfile(csv_path, copy)
+    sistok_data.SOURCE_PATH = copy
+    new_rows = synthetic.generate_trips(max(1, rows // 200), seed=10**6)
+    new_rows['tanggal_kedatangan'] = f'{synthetic.END_DATE}T00:00:00.000'
+    new_rows.to_csv(copy, mode='a', header=False, index=False)
+    metrics[f'{prefix}.load_data_ms.append'] = time_call(sistok_data.load_dataset, repeat=1)
+    sistok_data.SOURCE_PATH = csv_path
+    os.remove(copy)
+
+
+# Validasi dan pembersihan: satu potongan di proses ini (clean_frame) dan
+# seluruh file lewat process pool (clean_file)
+def bench_clean(metrics, prefix, csv_path, repeat):
+    raw = pd.read_csv(csv_path, nrows=200_000, low_memory=False)
+    metrics[f'{prefix}.clean_ms.clean_frame'] = time_call(lambda: sistok_clean.clean_frame(raw), repeat=repeat)
+    output = os.path.join(sistok_data.CACHE_DIR, 'bersih.parquet')
+    metrics[f'{prefix}.clean_ms.clean_file'] = time_call(lambda: sistok_clean.clean_file(csv_path, output), repeat=1)
+    os.remove(output)
+    os.remove(sistok_clean.report_path(output))
+
+
+def bench_filter(metrics, prefix, df, repeat):
+    metrics[f'{prefix}.build_filter_index_ms'] = time_call(lambda: sistok_query.build_filter_index(df), repeat=repeat)
+    index = sistok_query.build_filter_index(df)
+    for name, selection in selections(df).items():
+        for time_frame in TIME_FRAMES:
+            metrics[f'{prefix}.filter_data_ms.{name}.{time_frame}'] = time_call(
+                lambda: sistok_query.filter_data(index, *selection, time_frame), repeat=repeat
+            )
+
+
+def bench_dashboard(metrics, prefix, df, repeat):
+    metrics[f'{prefix}.build_cube_ms'] = time_call(lambda: sistok_query.build_cube(df), repeat=repeat)
+    cube = sistok_query.build_cube(df)
+    metrics[f'{prefix}.gear_cpue_ms'] = time_call(lambda: sistok_query.gear_cpue(cube), repeat=repeat)
+    # Flag anomali per partisi tahun (seperti saat refresh) dan kubus tanpa trip anomali
+    metrics[f'{prefix}.anomaly_ms.flags'] = time_call(
+        lambda: [sistok_anomaly.anomaly_flags(part) for _, part in df.groupby('tahun', dropna=False)], repeat=repeat
+    )
+    metrics[f'{prefix}.anomaly_ms.exclude_cube'] = time_call(lambda: cube[~cube['anomali'].astype(bool)], repeat=repeat)
+    metrics[f'{prefix}.completeness_ms.matrix'] = time_call(lambda: sistok_completeness.completeness_matrix(cube), repeat=repeat)
+    matrix = sistok_completeness.completeness_matrix(cube)
+    metrics[f'{prefix}.forecast_ms.fit'] = time_call(lambda: sistok_forecast.fit_forecasts(matrix), repeat=repeat)
+    forecasts = sistok_forecast.fit_forecasts(matrix)
+
+    # Mode perbandingan: 3 pelabuhan tersibuk x 2 alat tangkap teratas
+    ports = df['pelabuhan_kedatangan_id'].value_counts().index[:3].tolist()
+    gears = df['jenis_api'].value_counts().index[:2].tolist()
+    metrics[f'{prefix}.compare_groups_ms'] = time_call(
+        lambda: sistok_query.compare_groups(cube, {'pelabuhan_kedatangan_id': ports, 'jenis_api': gears}, [], None, None), repeat=repeat
+    )
+
+    summary = None
+    for name, selection in selections(df).items():
+        key = f'{prefix}.dashboard_ms.{name}'
+        metrics[f'{key}.slice_cube'] = time_call(lambda: sistok_query.slice_cube(cube, *selection), repeat=repeat)
+        cube_slice = sistok_query.slice_cube(cube, *selection)
+        metrics[f'{key}.cube_totals'] = time_call(lambda: sistok_query.cube_totals(cube_slice), repeat=repeat)
+        for column, n in [('tahun', None), ('nama_ikan_id', 10), ('jenis_api', 10)]:
+            metrics[f'{key}.cube_group.{column}'] = time_call(
+                lambda: sistok_query.cube_group(cube_slice, column, n=n), repeat=repeat
+            )
+        metrics[f'{key}.summary'] = time_call(lambda: sistok_query.dashboard_summary(cube_slice), repeat=repeat)
+        metrics[f'{prefix}.completeness_ms.{name}.view'] = time_call(
+            lambda: sistok_completeness.completeness_view(matrix, *selection), repeat=repeat
+        )
+        metrics[f'{prefix}.forecast_ms.{name}.view'] = time_call(
+            lambda: sistok_forecast.forecast_view(matrix, forecasts, *selection[:3]), repeat=repeat
+        )
+        summary = sistok_query.dashboard_summary(cube_slice)
+    return summary
+
+
+# Backend DuckDB (DATA_BACKEND = 'duckdb'): query yang sama langsung ke
+# partisi Parquet; dilewati jika duckdb tidak terpasang
+def bench_sql(metrics, prefix, df, repeat):
+    try:
+        import duckdb  # noqa: F401
+    except ImportError:
+        return
+    _, manifest = sistok_data.refresh_dataset()
+    key = f'{prefix}.sql_ms'
+    metrics[f'{key}.open_source'] = time_call(lambda: sistok_sql.open_source(manifest), repeat=repeat)
+    source = sistok_sql.open_source(manifest)
+    metrics[f'{key}.build_cube'] = time_call(lambda: sistok_sql.build_cube(source), repeat=repeat)
+    columns = sistok_sql.view_columns(source)
+    for name, selection in selections(df).items():
+        rows = sistok_sql.select_rows(source, *selection)
+        metrics[f'{key}.{name}.count_rows'] = time_call(lambda: sistok_sql.count_rows(source, rows), repeat=repeat)
+        metrics[f'{key}.{name}.page_data'] = time_call(
+            lambda: sistok_sql.page_data(source, rows, columns, 'Daily', 1, 100), repeat=repeat
+        )
+        for time_frame in TIME_FRAMES:
+            metrics[f'{key}.{name}.period_series.{time_frame}'] = time_call(
+                lambda: sistok_sql.period_series(source, rows, time_frame), repeat=repeat
+            )
+
+
+# Bagian get_openai_response yang dihitung lokal: system prompt + kunci cache
+def bench_assistant(metrics, prefix, summary, repeat):
+    def build_context():
+        prompt = sistok_assistant.build_system_prompt(summary)
+        return sistok_assistant.cache_key('Apa tren tangkapan?', prompt)
+
+    metrics[f'{prefix}.assistant_context_ms'] = time_call(build_context, repeat=repeat)
+
+
+def bench_analysis(metrics, prefix, path, repeat):
+    key = f'{prefix}.analysis_ms'
+    metrics[f'{key}.ingest_upload'] = time_call(lambda: sistok_analysis.ingest_upload(path), repeat=repeat)
+    aggregates = sistok_analysis.ingest_upload(path)['aggregates']
+    metrics[f'{key}.yearly_production'] = time_call(lambda: sistok_analysis.yearly_production(aggregates), repeat=repeat)
+    metrics[f'{key}.dominant_gears'] = time_call(lambda: sistok_analysis.dominant_gears(aggregates), repeat=repeat)
+    for measure in ['berat', 'Jumlah Hari']:
+        metrics[f'{key}.gear_pivot.{measure}'] = time_call(
+            lambda: sistok_analysis.gear_pivot(aggregates, measure), repeat=repeat
+        )
+    metrics[f'{key}.cpue_table'] = time_call(lambda: sistok_analysis.cpue_table(aggregates), repeat=repeat)
+
+    # Ekspor laporan (tanpa thread pool): waktu render per format
+    tables = {name: table for name, table in sistok_analysis.analysis_tables(aggregates).items() if name in sistok_report.REPORT_TABLES}
+    for fmt, writer in sistok_report.WRITERS.items():
+        output = os.path.join(DATA_DIR, f'laporan.{fmt}')
+        metrics[f'{key}.report.{fmt}'] = time_call(lambda: writer(tables, output), repeat=1)
+        os.remove(output)
+
+
+def run_scale(scale, repeat, seed=0):
+    metrics = {}
+    prefix = f'x{scale}'
+    use_dataset(dataset_path(scale, seed), os.path.join(DATA_DIR, f'cache-x{scale}'))
+    df = bench_load(metrics, prefix, repeat)
+    bench_refresh(metrics, prefix, sistok_data.SOURCE_PATH, len(df))
+    bench_clean(metrics, prefix, sistok_data.SOURCE_PATH, repeat)
+    bench_filter(metrics, prefix, df, repeat)
+    summary = bench_dashboard(metrics, prefix, df, repeat)
+    bench_sql(metrics, prefix, df, repeat)
+    bench_assistant(metrics, prefix, summary, repeat)
+    bench_analysis(metrics, prefix, upload_path(scale, seed), repeat)
+    info = {'rows': len(df), 'upload_rows': synthetic.UPLOAD_ROWS * scale}
+    return metrics, info
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark load/filter/agregasi pada data sintetis')
+    parser.add_argument('--scales', nargs='+', type=int, default=[1], help='kelipatan ukuran produksi, mis. 1 10 100')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--baseline', default=None)
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--floor', type=float, default=1.0, help='metrik di bawah nilai ini (ms) tidak dianggap regresi')
+    args = parser.parse_args(argv)
+
+    metrics, info = {}, {}
+    for scale in args.scales:
+        scale_metrics, info[f'x{scale}'] = run_scale(scale, args.repeat, args.seed)
+        metrics.update(scale_metrics)
+
+    regressions = compare_results(metrics, args.baseline, args.tolerance, args.floor) if args.baseline else {}
+    report(metrics, regressions)
+    print('Hasil disimpan di', save_results('data', metrics, args.output, info))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
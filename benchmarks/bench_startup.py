@@ -0,0 +1,111 @@
+# Benchmark waktu startup per tab: biaya import (python -X importtime) dan
+# waktu render pertama (streamlit AppTest).
+#
+#   python -m benchmarks.bench_startup
+#   python -m benchmarks.bench_startup --baseline benchmarks/results/startup.json
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+from benchmarks.common import compare_results, median, report, save_results
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, 'sistok_app.py')
+TABS = ['Dashboard', 'Analysis', 'About']
+
+
+def _imported_modules(nodes):
+    modules = []
+    for node in nodes:
+        if isinstance(node, ast.Import):
+            modules += [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            modules.append(node.module)
+    return modules
+
+
+def _tab_of(test):
+    # if menu == 'Dashboard':
+    if isinstance(test, ast.Compare) and isinstance(test.comparators[0], ast.Constant):
+        return test.comparators[0].value
+    return None
+
+
+# Modul yang di-import saat startup (level modul) dan per tab (di dalam if menu == ...)
+def app_imports(path=APP_PATH):
+    with open(path, encoding='utf-8') as file:
+        tree = ast.parse(file.read())
+    startup = _imported_modules(tree.body)
+    per_tab = {}
+    for node in tree.body:
+        while isinstance(node, ast.If):
+            tab = _tab_of(node.test)
+            if tab is not None:
+                per_tab[tab] = _imported_modules(node.body)
+            node = node.orelse[0] if node.orelse else None
+    return startup, per_tab
+
+
+# Total waktu import (ms) modul-modul dalam interpreter baru
+def import_time(modules):
+    code = 'import ' + ', '.join(modules)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        # Hanya modul level teratas (tanpa indentasi) supaya tidak dihitung ganda
+        if not name[1:].startswith(' '):
+            total_us += int(cumulative)
+    return total_us / 1000
+
+
+# Waktu run pertama script untuk satu tab (AppTest, menu dipilih langsung)
+def first_paint(tab):
+    code = f"""
+import os, sys, time
+sys.path.insert(0, {ROOT!r})
+os.chdir({ROOT!r})
+import streamlit_option_menu
+streamlit_option_menu.option_menu = lambda *args, **kwargs: {tab!r}
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file({APP_PATH!r}, default_timeout=600)
+app.secrets['ASSISTANT_BACKEND'] = 'mock'
+start = time.perf_counter()
+app.run()
+print((time.perf_counter() - start) * 1000)
+"""
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark startup sistok_app per tab')
+    parser.add_argument('--tabs', nargs='+', default=TABS)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default=None)
+    parser.add_argument('--baseline', default=None)
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    startup, per_tab = app_imports()
+    metrics = {'import_ms.startup': median(import_time(startup) for _ in range(args.repeat))}
+    for tab in args.tabs:
+        modules = startup + per_tab.get(tab, [])
+        metrics[f'import_ms.{tab}'] = median(import_time(modules) for _ in range(args.repeat))
+        metrics[f'first_paint_ms.{tab}'] = median(first_paint(tab) for _ in range(args.repeat))
+
+    regressions = compare_results(metrics, args.baseline, args.tolerance) if args.baseline else {}
+    report(metrics, regressions)
+    print('Hasil disimpan di', save_results('startup', metrics, args.output))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
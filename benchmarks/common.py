@@ -0,0 +1,62 @@
+import json
+import os
+import platform
+import time
+from datetime import datetime, timezone
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+# Jalankan fungsi beberapa kali, kembalikan median waktu (ms)
+def time_call(func, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return median(timings)
+
+
+# Simpan hasil benchmark {nama metrik: nilai} sebagai JSON. info: keterangan
+# tambahan (mis. jumlah baris) yang tidak ikut dibandingkan dengan baseline.
+def save_results(name, metrics, path=None, info=None):
+    path = path or os.path.join(RESULTS_DIR, f'{name}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w') as file:
+        json.dump({
+            'benchmark': name,
+            'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'info': info or {},
+            'metrics': metrics,
+        }, file, indent=2)
+    return path
+
+
+# Bandingkan dengan hasil baseline; metrik yang lebih lambat dari
+# baseline * (1 + tolerance) dianggap regresi. Metrik di bawah floor (ms)
+# diabaikan karena noise pengukurannya lebih besar dari tolerance.
+def compare_results(metrics, baseline_path, tolerance=0.2, floor=0.0):
+    with open(baseline_path) as file:
+        baseline = json.load(file)['metrics']
+    regressions = {}
+    for key, value in metrics.items():
+        base = baseline.get(key)
+        if base and value > base * (1 + tolerance) and value >= floor:
+            regressions[key] = (base, value)
+    return regressions
+
+
+def report(metrics, regressions=None):
+    regressions = regressions or {}
+    for key, value in metrics.items():
+        flag = ''
+        if key in regressions:
+            flag = f'  <-- REGRESI (baseline {regressions[key][0]:.1f})'
+        print(f'{key:<50} {value:>12.1f}{flag}')
@@ -0,0 +1,126 @@
+# Generator data sintetis dengan skema dan kardinalitas data_bersih.csv
+# (pelabuhan, provinsi, kelas pelabuhan, jenis ikan, alat tangkap, tanggal
+# 2018-2024) dan format file upload data_kembung_*.csv.
+import os
+
+import numpy as np
+import pandas as pd
+
+# Perkiraan ukuran produksi: file LFS data_bersih.csv 78 MB, +-138 byte per baris
+PRODUCTION_ROWS = 565_000
+# Ukuran sample upload terbesar di repo (data_kembung_karangantu.csv)
+UPLOAD_ROWS = 4_653
+
+START_DATE = '2018-01-01'
+END_DATE = '2024-12-31'
+
+# (pelabuhan, provinsi); kelas pelabuhan diambil dari prefix nama
+PORTS = [
+    ('PPS Nizam Zachman', 'DKI Jakarta'), ('PPS Cilacap', 'Jawa Tengah'), ('PPS Belawan', 'Sumatera Utara'),
+    ('PPS Bitung', 'Sulawesi Utara'), ('PPS Kendari', 'Sulawesi Tenggara'), ('PPS Bungus', 'Sumatera Barat'),
+    ('PPN Karangantu', 'Banten'), ('PPN Pekalongan', 'Jawa Tengah'), ('PPN Brondong', 'Jawa Timur'),
+    ('PPN Palabuhanratu', 'Jawa Barat'), ('PPN Kejawanan', 'Jawa Barat'), ('PPN Prigi', 'Jawa Timur'),
+    ('PPN Sibolga', 'Sumatera Utara'), ('PPN Ambon', 'Maluku'), ('PPN Ternate', 'Maluku Utara'),
+    ('PPN Pemangkat', 'Kalimantan Barat'), ('PPN Sungailiat', 'Kepulauan Bangka Belitung'),
+    ('PPN Tanjung Pandan', 'Kepulauan Bangka Belitung'), ('PPN Kwandang', 'Gorontalo'),
+    ('PPN Pengambengan', 'Bali'), ('PPN Tual', 'Maluku'), ('PPN Merauke', 'Papua'),
+    ('PPP Muncar', 'Jawa Timur'), ('PPP Tegalsari', 'Jawa Tengah'), ('PPP Labuhan Lombok', 'Nusa Tenggara Barat'),
+]
+
+NAMED_SPECIES = [
+    'Kembung Perempuan [RAB]', 'Kembung Lelaki', 'Bawal Putih', 'Tongkol Krai', 'Tongkol Komo', 'Cakalang',
+    'Layang', 'Tembang', 'Teri', 'Selar', 'Lemuru', 'Tenggiri', 'Cumi-cumi', 'Udang Putih', 'Kakap Merah',
+    'Kerapu', 'Bawal Hitam', 'Layur', 'Manyung', 'Peperek', 'Swanggi', 'Kuniran', 'Madidihang',
+    'Tuna Mata Besar', 'Albakora', 'Julung-julung', 'Banyar', 'Kuwe', 'Ekor Kuning', 'Baronang',
+]
+N_SPECIES = 150
+
+# Alat tangkap di sample upload
+GEARS = [
+    'Bagan Apung', 'Bagan perahu', 'Bagan tancap', 'Bouke ami', 'Bubu', 'Cantrang', 'Dogol', 'Gillnet',
+    'Hand Line Tuna', 'Huhate', 'Jala jatuh berkapal', 'Jala tebar lainnya', 'Jaring Insang Tetap',
+    'Jaring Tarik Berkantong', 'Jaring insang berlapis', 'Jaring insang hanyut', 'Jaring insang lainnya',
+    'Jaring insang lingkar', 'Jaring insang oseanik', 'Jaring liong bun', 'Pancing Cumi', 'Pancing Tonda',
+    'Pancing Ulur', 'Payang', 'Pengangkut', 'Pukat Cincin Pelagis Kecil dengan Dua Kapal', 'Pukat Pantai',
+    'Pukat cincin Pelagis Kecil dengan satu kapal', 'Pukat cincin dua kapal', 'Pukat cincin satu kapal',
+    'Pukat hela dasar berpapan', 'Pukat tarik lainnya', 'Rawai Tuna', 'Rawai dasar', 'Rawai hanyut',
+]
+# Lama trip khas (hari) yang dipilih per alat tangkap
+TRIP_DAYS = [1, 2, 3, 7, 14, 30, 100]
+
+
+def species_names(n=N_SPECIES):
+    return NAMED_SPECIES + [f'Ikan Lainnya {i}' for i in range(1, n - len(NAMED_SPECIES) + 1)]
+
+
+def _skewed_choice(rng, n_values, size, exponent=1.1):
+    # Frekuensi mirip data nyata: sedikit nilai sangat sering, ekor panjang jarang
+    weights = 1 / np.arange(1, n_values + 1) ** exponent
+    return rng.choice(n_values, size=size, p=weights / weights.sum())
+
+
+# Satu blok baris trip dengan kolom data_bersih.csv
+def generate_trips(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    species = species_names()
+    # Atribut tetap per kategori (sama untuk setiap seed supaya blok konsisten)
+    fixed = np.random.default_rng(12345)
+    gear_days = fixed.choice(TRIP_DAYS, size=len(GEARS))
+    species_price = fixed.integers(5, 60, size=len(species)) * 1000
+
+    port = _skewed_choice(rng, len(PORTS), n_rows, exponent=0.8)
+    origin = np.where(rng.random(n_rows) < 0.9, port, rng.integers(0, len(PORTS), n_rows))
+    fish = _skewed_choice(rng, len(species), n_rows)
+    gear = _skewed_choice(rng, len(GEARS), n_rows)
+
+    start, end = pd.Timestamp(START_DATE), pd.Timestamp(END_DATE)
+    arrival = start + pd.to_timedelta(rng.integers(0, (end - start).days + 1, n_rows), unit='D')
+    days = np.maximum(1, rng.poisson(gear_days[gear]))
+    departure = arrival - pd.to_timedelta(days, unit='D')
+    berat = np.maximum(1, np.round(rng.lognormal(np.log(50), 1.3, n_rows)))
+    price = np.round(species_price[fish] * rng.uniform(0.6, 1.4, n_rows), -2)
+
+    port_names = np.array([name for name, _ in PORTS], dtype=object)
+    provinces = np.array([province for _, province in PORTS], dtype=object)
+    return pd.DataFrame({
+        'pelabuhan_kedatangan_id': port_names[port],
+        'pelabuhan_keberangkatan_id': port_names[origin],
+        'nama_ikan_id': np.array(species, dtype=object)[fish],
+        'jenis_api': np.array(GEARS, dtype=object)[gear],
+        'provinsi': provinces[port],
+        'kelas_pelabuhan': [name[:3] for name in port_names[port]],
+        'berat': berat,
+        'nilai_produksi': berat * price,
+        'jumlah_hari': days,
+        'tanggal_berangkat': departure.strftime('%Y-%m-%dT%H:%M:%S.000'),
+        'tanggal_kedatangan': arrival.strftime('%Y-%m-%dT%H:%M:%S.000'),
+    })
+
+
+# Tulis CSV data_bersih sintetis per blok (memori tetap kecil untuk skala 100x)
+def write_trips_csv(path, n_rows, seed=0, chunk_rows=1_000_000):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + '.tmp'
+    for i, start in enumerate(range(0, n_rows, chunk_rows)):
+        chunk = generate_trips(min(chunk_rows, n_rows - start), seed=seed + i)
+        chunk.to_csv(tmp_path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+# File upload sintetis dengan format data_kembung_*.csv
+def write_upload_csv(path, n_rows, seed=0):
+    trips = generate_trips(n_rows, seed=seed)
+    upload = pd.DataFrame({
+        'tahun': trips['tanggal_kedatangan'].str[:4].astype(int),
+        'jenis_api': trips['jenis_api'],
+        'Nilai Produksi': trips['nilai_produksi'],
+        'Jumlah Hari': trips['jumlah_hari'],
+        'Tanggal Berangkat': trips['tanggal_berangkat'],
+        'Tanggal Kedatangan': trips['tanggal_kedatangan'],
+        'nama_ikan_id': trips['nama_ikan_id'],
+        'berat': trips['berat'],
+    })
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    upload.to_csv(path)
+    return path
@@ -0,0 +1,182 @@
+import hashlib
+
+import pandas as pd
+
+import sistok_clean
+
+# Tipe kolom tetap untuk file upload (format data_kembung_*.csv). Kolom angka
+# dibaca tanpa tipe lalu dikonversi (_coerce_numeric), supaya sel rusak
+# menjadi NaN dan tidak menggagalkan read_csv.
+UPLOAD_DTYPES = {
+    'tahun': 'Int16',
+    'jenis_api': 'category',
+    'nama_ikan_id': 'category',
+    'berat': 'float64',
+    'Nilai Produksi': 'float64',
+    'Jumlah Hari': 'float64',
+}
+
+# Agregat dasar tab Analysis: jumlah per (alat tangkap, tahun)
+AGG_KEYS = ['jenis_api', 'tahun']
+AGG_MEASURES = ['berat', 'Nilai Produksi', 'Jumlah Hari']
+
+CHUNK_SIZE = 200_000
+
+
+# Hash isi file upload (tanpa meng-copy buffer)
+def upload_hash(file):
+    digest = hashlib.sha256()
+    if hasattr(file, 'getbuffer'):
+        digest.update(file.getbuffer())
+    else:
+        with open(file, 'rb') as source:
+            for chunk in iter(lambda: source.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Konversi kolom angka chunk ke UPLOAD_DTYPES; teks yang bukan angka (dan
+# tahun yang tidak bulat) menjadi NaN, lalu ditandai oleh cek kualitas
+def _coerce_numeric(chunk):
+    for column, dtype in UPLOAD_DTYPES.items():
+        if dtype != 'category' and column in chunk.columns:
+            values = pd.to_numeric(chunk[column], errors='coerce')
+            if dtype == 'Int16':
+                values = values.where(values == values.round())
+            chunk[column] = values.astype(dtype)
+    return chunk
+
+
+# Baca file upload per chunk dengan tipe tetap. Jumlah per jenis_api/tahun
+# dibangun bertahap selama chunk dibaca, jadi tabel dan grafik Analysis cukup
+# memakai agregat ini tanpa groupby ulang ke seluruh baris. keep_data=False
+# membuang baris mentah setelah diagregasi (untuk batch, hanya agregat dipakai).
+# Setiap chunk juga divalidasi (sistok_clean): baris mendapat kolom kualitas dan
+# 'quality' berisi jumlah baris per masalah.
+def ingest_upload(file, chunksize=CHUNK_SIZE, keep_data=True):
+    if hasattr(file, 'seek'):
+        file.seek(0)
+    chunks, partials = [], []
+    keys = measures = None
+    quality = dict.fromkeys(sistok_clean.ISSUES, 0)
+    categories = {column: dtype for column, dtype in UPLOAD_DTYPES.items() if dtype == 'category'}
+    for chunk in pd.read_csv(file, dtype=categories, chunksize=chunksize):
+        chunk = _coerce_numeric(chunk)
+        if keys is None:
+            keys = [k for k in AGG_KEYS if k in chunk.columns]
+            measures = [m for m in AGG_MEASURES if m in chunk.columns]
+        flags, _ = sistok_clean.quality_flags(chunk, sistok_clean.UPLOAD_COLUMNS)
+        chunk['kualitas'] = flags
+        for issue, count in sistok_clean.summarize(flags).items():
+            quality[issue] += count
+        chunks.append(chunk if keep_data else chunk.head(0))
+        if keys and measures:
+            partial = chunk.groupby(keys, observed=True, dropna=False)[measures].sum()
+            partial['trip'] = chunk.groupby(keys, observed=True, dropna=False).size()
+            partials.append(partial)
+
+    data = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+    # Kategori tiap chunk berbeda; samakan lagi setelah digabung
+    for column, dtype in UPLOAD_DTYPES.items():
+        if dtype == 'category' and column in data.columns:
+            data[column] = data[column].astype('category')
+
+    aggregates = None
+    if partials:
+        aggregates = pd.concat(partials).groupby(level=keys, observed=True, dropna=False).sum().reset_index()
+    return {'data': data, 'aggregates': aggregates, 'quality': quality}
+
+
+# Cek kolom agregat (None jika file tidak punya kolom kunci/ukuran)
+def has_columns(aggregates, *columns):
+    return aggregates is not None and set(columns).issubset(aggregates.columns)
+
+
+# Produksi dan nilai produksi per tahun
+def yearly_production(aggregates):
+    if 'Nilai Produksi' in aggregates.columns:
+        data_per_year = aggregates.groupby('tahun').agg({'berat': 'sum', 'Nilai Produksi': 'sum'}).reset_index()
+
+        # Menghitung rata-rata nilai produksi dan nilai produksi
+        data_per_year['Harga rata-rata nilai produksi'] = data_per_year['Nilai Produksi'] / data_per_year['berat']
+        data_per_year['Produksi (Ton)'] = data_per_year['berat'] / 1000
+        data_per_year['Nilai Produksi'] = data_per_year['Produksi (Ton)'] * data_per_year['Harga rata-rata nilai produksi']
+    else:
+        data_per_year = aggregates.groupby('tahun').agg({'berat': 'sum'}).reset_index()
+        data_per_year['Produksi (Ton)'] = data_per_year['berat'] / 1000
+        data_per_year['Harga rata-rata nilai produksi'] = None
+        data_per_year['Nilai Produksi'] = None
+    return data_per_year
+
+
+# 10 alat tangkap dengan tangkapan terbesar
+def dominant_gears(aggregates, n=10):
+    return (
+        aggregates.groupby('jenis_api', observed=True).agg({'berat': 'sum'}).reset_index()
+        .sort_values(by='berat', ascending=False).head(n)
+    )
+
+
+# Pivot alat tangkap x tahun + kolom Total dan baris Jumlah
+def gear_pivot(aggregates, measure):
+    pivot = aggregates.pivot_table(index='jenis_api', columns='tahun', values=measure, aggfunc='sum', observed=True).fillna(0)
+    pivot.index = pivot.index.astype(str)
+    pivot.columns.name = 'tahun'
+
+    # Tambahkan kolom total untuk tiap alat tangkap
+    pivot['Total'] = pivot.sum(axis=1)
+
+    # Tambahkan baris jumlah total untuk tiap alat tangkap
+    pivot.loc['Jumlah'] = pivot.sum()
+
+    # Reset index untuk tampilkan tabel
+    return pivot.reset_index()
+
+
+# CPUE dan FPI untuk alat tangkap dominan
+def cpue_table(aggregates, n=2):
+    alat_tangkap_group = aggregates.groupby('jenis_api', observed=True).agg({'berat': 'sum', 'Jumlah Hari': 'sum'}).reset_index()
+    alat_tangkap_group.columns = ['Alat Tangkap', 'catch (ton)', 'effort (hari)']
+
+    # Konversi tangkapan ke ton
+    alat_tangkap_group['catch (ton)'] = alat_tangkap_group['catch (ton)'] / 1000
+
+    # Menambah kolom CPUE
+    alat_tangkap_group['CPUE'] = alat_tangkap_group['catch (ton)'] / alat_tangkap_group['effort (hari)']
+
+    # Urutkan data berdasarkan berat, pilih alat tangkap dominan
+    alat_tangkap_dominan = alat_tangkap_group.sort_values(by='catch (ton)', ascending=False).head(n).copy()
+
+    # Kolom FPI (alat tangkap dengan CPUE tertinggi = 1)
+    cpue_max = alat_tangkap_dominan['CPUE'].max()
+    alat_tangkap_dominan['FPI'] = alat_tangkap_dominan['CPUE'] / cpue_max
+    alat_tangkap_dominan.loc[alat_tangkap_dominan['CPUE'] == cpue_max, 'FPI'] = 1
+    return alat_tangkap_dominan
+
+
+# Semua tabel tab Analysis untuk satu file, {nama: DataFrame}. Tabel yang
+# kolomnya tidak ada di file dilewati (sama seperti di tab Analysis).
+def analysis_tables(aggregates):
+    tables = {}
+    if has_columns(aggregates, 'tahun', 'jenis_api', 'berat'):
+        data_per_year = yearly_production(aggregates)
+        tables['produksi_tahunan'] = data_per_year[['tahun', 'Produksi (Ton)', 'Harga rata-rata nilai produksi', 'Nilai Produksi']]
+        tables['alat_tangkap_dominan'] = dominant_gears(aggregates)
+        tables['tangkapan_per_alat'] = gear_pivot(aggregates, 'berat')
+    if has_columns(aggregates, 'jenis_api', 'tahun', 'Jumlah Hari'):
+        # Tabel "Jumlah Trip per Alat Tangkap" di tab Analysis memakai Jumlah Hari
+        tables['trip_per_alat'] = gear_pivot(aggregates, 'Jumlah Hari')
+    if has_columns(aggregates, 'jenis_api', 'berat', 'Jumlah Hari'):
+        tables['cpue'] = cpue_table(aggregates)
+    return tables
+
+
+# Pipeline Analysis tanpa Streamlit: baca satu CSV lalu hitung semua tabelnya.
+# backend='duckdb' menghitung agregat dengan DuckDB langsung dari CSV
+# (lihat sistok_sql.upload_aggregates), untuk file yang terlalu besar bagi pandas.
+def run_pipeline(path, chunksize=CHUNK_SIZE, backend='pandas'):
+    if backend == 'duckdb':
+        import sistok_sql
+
+        return analysis_tables(sistok_sql.upload_aggregates(path))
+    return analysis_tables(ingest_upload(path, chunksize=chunksize, keep_data=False)['aggregates'])
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+# Deteksi trip anomali (mis. salah ketik satu nol di berat atau nilai
+# produksi) dengan skor robust median/MAD di dalam grup pelabuhan x jenis
+# ikan x alat tangkap x bulan. Semua grup di satu partisi dihitung sekaligus
+# dengan groupby; grup tidak melewati batas tahun, jadi flag cukup dihitung
+# per partisi tahun saat refresh (lihat sistok_data.refresh_partitions).
+GROUP_KEYS = ['pelabuhan_kedatangan_id', 'nama_ikan_id', 'jenis_api', 'periode_bulan']
+# Grup cadangan berurutan untuk baris yang grupnya < MIN_GROUP nilai: tanpa
+# alat tangkap, lalu pelabuhan x jenis ikan sepanjang tahun (partisi)
+FALLBACK_KEYS = [
+    ['pelabuhan_kedatangan_id', 'nama_ikan_id', 'periode_bulan'],
+    ['pelabuhan_kedatangan_id', 'nama_ikan_id'],
+]
+MIN_GROUP = 8
+# Batas |skor z robust| (Iglewicz-Hoaglin); skor dihitung di skala log10,
+# jadi satu nol tambahan (10x) bergeser 1 satuan log
+THRESHOLD = 3.5
+
+
+# Ukuran yang dinilai (log10): berat per hari trip dan harga per kg. NaN jika
+# berat, nilai atau jumlah hari tidak positif (sudah ditandai di kolom kualitas)
+def _log_measures(df):
+    berat = pd.to_numeric(df['berat'], errors='coerce').astype('float64')
+    hari = pd.to_numeric(df['jumlah_hari'], errors='coerce').astype('float64')
+    nilai = pd.to_numeric(df['nilai_produksi'], errors='coerce').astype('float64')
+    return pd.DataFrame({
+        'berat_per_hari': np.log10((berat / hari).where((berat > 0) & (hari > 0))),
+        'harga_per_kg': np.log10((nilai / berat).where((berat > 0) & (nilai > 0))),
+    }, index=df.index)
+
+
+# Median, MAD dan jumlah nilai per grup, disebar ke setiap baris (groupby transform)
+def _group_stats(values, groups):
+    grouped = values.groupby(groups, observed=True, dropna=False, sort=False)
+    median = grouped.transform('median')
+    mad = (values - median).abs().groupby(groups, observed=True, dropna=False, sort=False).transform('median')
+    count = grouped.transform('count')
+    return median, mad, count
+
+
+# Skor z robust per baris untuk setiap ukuran: 0.6745 x (x - median) / MAD di
+# grup GROUP_KEYS, atau grup FALLBACK_KEYS pertama yang punya >= MIN_GROUP
+# nilai. NaN jika ukuran tidak valid, semua grup terlalu kecil, atau MAD 0.
+def robust_scores(df):
+    values = _log_measures(df)
+    median, mad, count = _group_stats(values, [df[key] for key in GROUP_KEYS])
+    for keys in FALLBACK_KEYS:
+        small = count < MIN_GROUP
+        if not small.any().any():
+            break
+        median_c, mad_c, count_c = _group_stats(values, [df[key] for key in keys])
+        median = median.mask(small, median_c)
+        mad = mad.mask(small, mad_c)
+        count = count.mask(small, count_c)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = 0.6745 * (values - median) / mad.where(mad > 0)
+    return scores.where(count >= MIN_GROUP).astype('float32')
+
+
+# Flag anomali per baris (bool): salah satu ukuran melewati THRESHOLD
+def anomaly_flags(df):
+    if df.empty:
+        return np.zeros(0, dtype=bool)
+    scores = robust_scores(df)
+    return (scores.abs() > THRESHOLD).any(axis=1).to_numpy()
+
+
+# Tambah/perbarui kolom anomali di DataFrame satu partisi
+def add_anomaly_flags(df):
+    df['anomali'] = anomaly_flags(df)
+    return df
@@ -1,16 +1,27 @@
+import os
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+import numpy as np
 from streamlit_option_menu import option_menu
-from datetime import datetime
-import matplotlib.pyplot as plt
-import os
-import gdown
-from openai import OpenAI
+import sistok_analysis
+import sistok_anomaly
+import sistok_assistant
+import sistok_charts
+import sistok_clean
+import sistok_completeness
+import sistok_data
+import sistok_forecast
+import sistok_metrics
+import sistok_query
+import sistok_report
+import sistok_sql
+import sistok_surplus
+
 
 
 
+# Copy-on-Write: turunan DataFrame (rename, slice) tidak meng-copy data sampai diubah
+pd.options.mode.copy_on_write = True
 
 # Konfigurasi layout Streamlit
 st.set_page_config(
@@ -18,101 +29,297 @@ st.set_page_config(
     page_icon="🐟",
     layout="wide"
 )
-# Inisialisasi OpenAI Client
-client = OpenAI(api_key=st.secrets['OPENAI_API_KEY'])
-
+# Inisialisasi client Sistok Assistant (lazy, sekali per proses).
+# ASSISTANT_BACKEND = 'openai' (default) atau 'mock' untuk uji offline;
+# OPENAI_BASE_URL untuk server lokal yang kompatibel dengan OpenAI.
+@st.cache_resource
+def load_assistant_client():
+    return sistok_assistant.create_client(
+        backend=st.secrets.get('ASSISTANT_BACKEND', 'openai'),
+        api_key=st.secrets.get('OPENAI_API_KEY'),
+        base_url=st.secrets.get('OPENAI_BASE_URL'),
+    )
 
-# ID file Googel Drive
-file_id = '1eACQIHOn3oS96V8rHzN6VlMuKtNX5raz'
 
-# URL Google drive untuk diunduh
-drive_url = f'https://drive.google.com/uc?id={file_id}'
+# Backend query Dashboard (secrets DATA_BACKEND): 'pandas' (default, data
+# dimuat ke memori) atau 'duckdb' (query langsung ke partisi Parquet, untuk
+# data yang tidak muat di memori). Kedua modul punya fungsi query yang sama.
+DATA_BACKEND = st.secrets.get('DATA_BACKEND', 'pandas')
+query_backend = sistok_sql if DATA_BACKEND == 'duckdb' else sistok_query
 
-# Fungsi untuk memuat data dari database atau file CSV
-@st.cache_data
-def load_data():
+# Fungsi untuk memuat data dari snapshot lokal (lihat sistok_data.load_dataset).
+# cache_resource: satu DataFrame read-only (memory map) dipakai bersama semua
+# sesi dan rerun tanpa copy; jangan diubah in-place.
+# Di-key per versi data supaya refresh sumber terbaca tanpa restart app.
+@st.cache_resource(max_entries=2)
+def load_data(data_version):
     try:
-        # Download file CSV
-        file_path = 'data_bersih.csv'  
-        gdown.download(drive_url, file_path, quiet=False)
-        # Baca file CCSV
-        df = pd.read_csv(file_path,  low_memory=False)
-        # Konversi tanggal ke tipe datetime
-        df['tanggal_berangkat'] = pd.to_datetime(df['tanggal_berangkat'], errors='coerce')
-        df['tanggal_kedatangan'] = pd.to_datetime(df['tanggal_kedatangan'], errors='coerce')
-        df['tahun'] = df['tanggal_kedatangan'].dt.year
-        return df
+        return sistok_data.load_dataset()
 
     except FileNotFoundError:
         st.error("File tidak ditemukan. Pastikan file 'data_bersih.csv' ada di folder './data/'." )
         return pd.DataFrame()
+    except ValueError as e:
+        st.error(f"Data tidak valid: {e}")
+        return pd.DataFrame()
 
-# Fungsi filter data
-def filter_data(df, pelabuhan_kedatangan_id, nama_ikan_id, start_year, end_year, time_frame):
-
-    # Filter data berdasarkan pelabuhan kedatangan
-    if pelabuhan_kedatangan_id:
-        df = df[df['pelabuhan_kedatangan_id'] == pelabuhan_kedatangan_id]
+# Source DuckDB di atas partisi Parquet (tanpa snapshot gabungan di memori).
+# DUCKDB_THREADS / DUCKDB_MEMORY_LIMIT membatasi thread dan memori query.
+@st.cache_resource(max_entries=2)
+def load_sql_source(data_version):
+    _, manifest = sistok_data.refresh_dataset(data_version)
+    return sistok_sql.open_source(
+        manifest,
+        threads=st.secrets.get('DUCKDB_THREADS'),
+        memory_limit=st.secrets.get('DUCKDB_MEMORY_LIMIT'),
+    )
 
-    # Filter data berdasarkan nama ikan
-    if nama_ikan_id:
-        df = df[df['nama_ikan_id'].isin(nama_ikan_id)]
+# Data untuk backend terpilih: DataFrame (pandas) atau source DuckDB
+def load_source(data_version):
+    if DATA_BACKEND == 'duckdb':
+        return load_sql_source(data_version)
+    return load_data(data_version)
+
+# Hash isi partisi tahun {tahun: hash} dari metadata snapshot (pandas) atau manifest partisi (duckdb)
+@st.cache_resource(max_entries=2)
+def load_partitions(data_version):
+    if DATA_BACKEND == 'duckdb':
+        return sistok_data.partition_hashes(sistok_data.refresh_dataset(data_version)[1])
+    return sistok_data.read_meta(data_version).get('partitions')
+
+# Kubus dan CPUE/FPI per partisi tahun, di-cache per (tahun, hash isi): setelah
+# refresh hanya tahun yang berubah yang dihitung ulang
+@st.cache_resource(max_entries=64)
+def load_cube_partition(key, partition_hash, _data):
+    if DATA_BACKEND == 'duckdb':
+        return sistok_sql.build_cube(_data, key)
+    return sistok_query.build_cube(sistok_data.partition_slice(_data, key))
+
+@st.cache_resource(max_entries=64)
+def load_gear_cpue_partition(key, partition_hash, _cube_partition):
+    return sistok_query.gear_cpue(_cube_partition)
+
+# Kubus agregat tangkapan per versi data, digabung dari kubus per partisi
+@st.cache_resource(max_entries=2)
+def load_cube(data_version):
+    data = load_source(data_version)
+    partitions = load_partitions(data_version)
+    if not partitions:
+        return query_backend.build_cube(data)
+    return sistok_data.concat_frames([load_cube_partition(key, value, data) for key, value in partitions.items()])
+
+# CPUE/FPI semua alat tangkap per stok per versi data (FPI per stok-tahun,
+# jadi bisa dihitung per partisi)
+@st.cache_resource(max_entries=2)
+def load_gear_cpue(data_version):
+    partitions = load_partitions(data_version)
+    if not partitions:
+        return sistok_query.gear_cpue(load_cube(data_version))
+    data = load_source(data_version)
+    return sistok_data.concat_frames([
+        load_gear_cpue_partition(key, value, load_cube_partition(key, value, data)) for key, value in partitions.items()
+    ])
+
+# Kubus dan CPUE/FPI tanpa trip anomali (mode 'Kecualikan'): cukup memotong
+# kubus yang sudah ada dengan dimensi anomali, tanpa membaca data baris
+@st.cache_resource(max_entries=2)
+def load_normal_cube(data_version):
+    cube = load_cube(data_version)
+    return cube[~cube['anomali'].astype(bool)].reset_index(drop=True)
+
+@st.cache_resource(max_entries=2)
+def load_normal_gear_cpue(data_version):
+    return sistok_query.gear_cpue(load_normal_cube(data_version))
+
+# Matriks kelengkapan (pelabuhan x jenis ikan x bulan vs baseline historis),
+# dihitung sekali per versi data dari kubus
+@st.cache_resource(max_entries=2)
+def load_completeness(data_version):
+    return sistok_completeness.completeness_matrix(load_cube(data_version))
+
+# Prakiraan bulanan semua pelabuhan x jenis ikan, di-fit sekali per versi
+# data dalam satu batch (bukan per rerun atau per pilihan filter)
+@st.cache_resource(max_entries=2, show_spinner='Fitting prakiraan tangkapan...')
+def load_forecasts(data_version):
+    return sistok_forecast.fit_forecasts(load_completeness(data_version))
+
+# Ekspor metrik per rerun (Prometheus + log JSON), dikonfigurasi lewat secrets:
+# METRICS_PORT (endpoint HTTP), METRICS_TEXTFILE (file teks), METRICS_LOG (log JSON)
+@st.cache_resource
+def load_metrics():
+    return sistok_metrics.MetricsExporter(
+        textfile=st.secrets.get('METRICS_TEXTFILE'),
+        port=st.secrets.get('METRICS_PORT'),
+        log_path=st.secrets.get('METRICS_LOG'),
+    )
 
-    # Filter berdasarkan tahun
-    if start_year:
-        df = df[df['tahun'] >= start_year]
-    if end_year:
-        df = df[df['tahun'] <= end_year]
+# Cache LRU hasil Dashboard per filter, dipakai bersama semua sesi
+@st.cache_resource
+def load_result_cache():
+    return sistok_query.ResultCache(max_entries=256, max_bytes=64 * 2**20)
+
+# Angka dan tabel grafik Dashboard untuk filter tertentu (dari cache jika ada)
+def get_dashboard_summary(cube, data_version, pelabuhan_kedatangan_id, nama_ikan_id, start_year, end_year, time_frame):
+    key = sistok_query.filter_key(data_version, pelabuhan_kedatangan_id, nama_ikan_id, start_year, end_year, time_frame)
+    return load_result_cache().get_or_compute(key, lambda: sistok_query.dashboard_summary(
+        sistok_query.slice_cube(cube, pelabuhan_kedatangan_id, nama_ikan_id, start_year, end_year)
+    ))
+
+# Jumlah trip, berat dan nilai produksi anomali dibanding semua trip di filter
+def get_anomaly_summary(cube, data_version, pelabuhan_kedatangan_id, nama_ikan_id, start_year, end_year):
+    key = sistok_query.filter_key(data_version, pelabuhan_kedatangan_id, nama_ikan_id, start_year, end_year, None) + ('anomali',)
+
+    def build():
+        sliced = sistok_query.slice_cube(cube, pelabuhan_kedatangan_id, nama_ikan_id, start_year, end_year)
+        return {
+            'semua': sistok_query.cube_totals(sliced),
+            'anomali': sistok_query.cube_totals(sliced[sliced['anomali'].astype(bool)]),
+        }
+
+    return load_result_cache().get_or_compute(key, build)
+
+# Kelengkapan per pelabuhan x bulan dan per pelabuhan x jenis ikan x bulan
+# untuk filter tertentu. Baseline memakai semua tahun, jadi kuncinya versi data penuh.
+def get_completeness(data_version, pelabuhan_kedatangan_id, nama_ikan_id, start_year, end_year):
+    key = sistok_query.filter_key(data_version, pelabuhan_kedatangan_id, nama_ikan_id, start_year, end_year, None) + ('kelengkapan',)
+
+    def build():
+        matrix = load_completeness(data_version)
+        view = sistok_completeness.completeness_view(matrix, pelabuhan_kedatangan_id, nama_ikan_id, start_year, end_year)
+        by_species = sistok_completeness.completeness_view(
+            matrix, pelabuhan_kedatangan_id, nama_ikan_id, start_year, end_year, by=sistok_completeness.PAIR_KEYS
+        )
+        return {
+            'view': view,
+            'flags': sistok_completeness.completeness_flags(by_species),
+            'fig': sistok_completeness.completeness_heatmap(view),
+        }
 
-    # Filter berdasarkan time frame
-    if time_frame == 'Daily':
-        df['time_period'] = df['tanggal_kedatangan'].dt.date
-    elif time_frame == 'Weekly':
-        df['time_period'] = df['tanggal_kedatangan'].dt.to_period('W').astype(str)
-    elif time_frame == 'Monthly':
-        df['time_period'] = df['tanggal_kedatangan'].dt.to_period('M').astype(str)
-    elif time_frame == 'Yearly':
-        df['time_period'] = df['tanggal_kedatangan'].dt.to_period('Y').astype(str)
+    return load_result_cache().get_or_compute(key, build)
 
+# Perbandingan pelabuhan/alat tangkap terpilih (jenis ikan dan tahun dari
+# filter sidebar) dengan grafik per grup
+def get_comparison(cube, data_version, ports, gears, nama_ikan_id, start_year, end_year):
+    import plotly.express as px
 
-    return df
+    key = sistok_query.filter_key(data_version, None, nama_ikan_id, start_year, end_year, None) + ('perbandingan', tuple(ports), tuple(gears))
 
-# Function to get OpenAI chat response
+    def build():
+        comparison = sistok_query.compare_groups(
+            cube, {'pelabuhan_kedatangan_id': ports, 'jenis_api': gears}, nama_ikan_id, start_year, end_year
+        )
+        yearly = comparison['yearly']
+        comparison['fig_tahunan'] = px.line(yearly, x='tahun', y='berat', color='grup', markers=True, title='TANGKAPAN PER TAHUN', template='plotly_dark')
+        comparison['fig_cpue'] = px.line(yearly, x='tahun', y='CPUE', color='grup', markers=True, title='CPUE (KG / HARI TRIP)', template='plotly_dark')
+        comparison['fig_jenis_ikan'] = px.bar(
+            comparison['top_species'], x='berat', y='nama_ikan_id', color='grup', facet_col='grup', facet_col_wrap=3,
+            orientation='h', title='JENIS IKAN TERATAS PER GRUP', template='plotly_dark',
+        )
+        comparison['fig_jenis_ikan'].update_yaxes(matches=None, showticklabels=True, categoryorder='total ascending')
+        comparison['fig_jenis_ikan'].for_each_annotation(lambda a: a.update(text=a.text.split('=', 1)[-1]))
+        for fig in [comparison['fig_tahunan'], comparison['fig_cpue']]:
+            fig.update_layout(xaxis=dict(tickmode='linear'), plot_bgcolor='rgba(0,0,0,0)', legend_title='Grup')
+        return comparison
+
+    return load_result_cache().get_or_compute(key, build)
+
+# Riwayat bulanan + prakiraan untuk filter tertentu. Prakiraan memakai semua
+# data, jadi kuncinya versi data penuh; end_year tidak dipakai (riwayat
+# disambung sampai data terakhir).
+def get_forecast(data_version, pelabuhan_kedatangan_id, nama_ikan_id, start_year):
+    key = sistok_query.filter_key(data_version, pelabuhan_kedatangan_id, nama_ikan_id, start_year, None, None) + ('prakiraan',)
+
+    def build():
+        view = sistok_forecast.forecast_view(load_completeness(data_version), load_forecasts(data_version), pelabuhan_kedatangan_id, nama_ikan_id, start_year)
+        return {**view, 'fig': sistok_forecast.forecast_figure(view)}
+
+    return load_result_cache().get_or_compute(key, build)
+
+# Grafik tangkapan per periode time frame (LTTB + WebGL untuk deret panjang).
+# Figure dibangun sekali per (filter, time frame) lalu dipakai bersama semua
+# sesi; st.plotly_chart tidak mengubah figure.
+def get_catch_figure(filter_index, rows, data_version, pelabuhan_kedatangan_id, nama_ikan_id, start_year, end_year, time_frame):
+    key = sistok_query.filter_key(data_version, pelabuhan_kedatangan_id, nama_ikan_id, start_year, end_year, time_frame) + ('fig_tangkapan',)
+
+    def build():
+        period_series = sistok_sql.period_series if DATA_BACKEND == 'duckdb' else sistok_charts.period_series
+        series = period_series(filter_index, rows, time_frame)
+        fig = sistok_charts.line_chart(series, 'periode', 'berat', title='TOTAL BERAT TANGKAPAN', color='#0083b8')
+        fig.update_layout(
+            xaxis=dict(tickmode='linear') if time_frame == 'Yearly' else {},
+            plot_bgcolor='rgba(0,0,0,0)',
+            yaxis=(dict(showgrid=False))
+        )
+        return fig
 
-def get_openai_response(query, filtered_data):
-    # create context about the current data
+    return load_result_cache().get_or_compute(key, build)
 
-    data_context = {
-        'total_tangkapan' : f"{float(filtered_data['berat'].sum()):,.2f} Kg",
-        'nilai_produksi' : f"{filtered_data['nilai_produksi'].sum():,.2f} IDR",
-        'periode': f'{filtered_data['tahun'].min()} to {filtered_data['tahun'].max()}',
-        'jenis_ikan_dominan': filtered_data.groupby('nama_ikan_id')['berat'].sum().nlargest(3).index.tolist(),
-        'alat_tangkap_dominan': filtered_data.groupby('jenis_api')['berat'].sum().nlargest(3).index.tolist(),
-    }
-    system_prompt = f"""You are an expert fishing data analyst assistant. Analyzie the fishing data dashboard and provide insights based on the following context:
+# Sample CSV untuk tombol download (dibaca sekali)
+@st.cache_data
+def load_sample_csv():
+    with open('./data/data_kembung_karangantu.csv', 'r') as file:
+        return file.read()
+
+# File upload dibaca per chunk sekali per isi file (kunci: sha256 isi file);
+# rerun berikutnya memakai data dan agregat dari cache
+@st.cache_resource(max_entries=8, ttl=3600, show_spinner='Membaca file...')
+def load_upload(content_hash, _uploaded_file):
+    return sistok_analysis.ingest_upload(_uploaded_file)
+
+# Model produksi surplus untuk file upload, dihitung sekali per isi file
+@st.cache_data(max_entries=8, ttl=3600, show_spinner='Fitting model produksi surplus...')
+def load_surplus(content_hash, _aggregates):
+    return sistok_surplus.assess_upload(_aggregates)
+
+# Index filter (data urut per tahun + posisi baris per pelabuhan/jenis ikan),
+# dibangun sekali per versi data dan dipakai bersama semua sesi
+@st.cache_resource(max_entries=2)
+def load_filter_index(data_version):
+    return sistok_query.build_filter_index(load_data(data_version))
+
+# Antrian ekspor laporan XLSX/PDF (thread pool, dipakai bersama semua sesi);
+# file hasil disimpan di data/cache/laporan per (hash upload, opsi)
+@st.cache_resource
+def load_report_jobs():
+    return sistok_report.ReportJobs(os.path.join(sistok_data.CACHE_DIR, 'laporan'))
+
+# Status ekspor laporan. Selama job berjalan fragment ini di-rerun tiap detik
+# (hanya fragment, bukan seluruh halaman) untuk memperbarui progress.
+def show_report_status(key, options, polling):
+    job = load_report_jobs().status(key, options)
+    if job is None:
+        return
+    if not job['done']:
+        st.progress(job['progress'], text=job['stage'])
+    elif polling:
+        # Job selesai: rerun halaman supaya polling berhenti
+        st.rerun()
+    elif job['error']:
+        st.error(f"Ekspor laporan gagal: {job['error']}")
+    else:
+        # File laporan bisa sudah dihapus oleh pruning (MAX_REPORTS) setelah
+        # status dibaca: anggap job kedaluwarsa dan minta laporan dibuat ulang
+        try:
+            contents = {}
+            for fmt, path in job['paths'].items():
+                with open(path, 'rb') as file:
+                    contents[fmt] = file.read()
+        except FileNotFoundError:
+            st.info('File laporan sudah kedaluwarsa. Klik Buat Laporan untuk membuatnya lagi.')
+            return
+        columns = st.columns(len(contents))
+        for column, (fmt, content) in zip(columns, contents.items()):
+            column.download_button(
+                f'Download {fmt.upper()}', content, file_name=f'laporan_sistok.{fmt}',
+                mime=sistok_report.MIME_TYPES[fmt], key=f'download_{fmt}',
+            )
 
-Current Dashboard Data:
-- Total Tangkapan: {data_context['total_tangkapan']}
-- Nilai Produksi: {data_context['nilai_produksi']}
-- Time Period: {data_context['periode']}
-- Top 3 Jenis Ikan: {', '.join(data_context['jenis_ikan_dominan'])}
-- Top 3 Alat Tangkap: {', '.join(data_context['alat_tangkap_dominan'])}
+# Function to get OpenAI chat response
 
-Provide concise, data-driven answers in Bahasa Indonesia. Focus on trends, patterns, and insights from the data"""
-    try:
-        response=client.chat.completions.create(
-            model='gpt-3.5-turbo',
-            messages=[
-                {'role': 'system', 'content': system_prompt},
-                *[{'role': msg['role'], 'content': msg['content']} for msg in st.session_state.chat_history[-5::]],
-                {'role': 'user', 'content': query}
-            ],
-            temperature=0.7,
-            max_tokens=500
-        )
-        return response.choices[0].message.content
-    except Exception as e:
-        return f"Error: {str(e)}"
+def get_openai_response(query, summary):
+    # Riwayat chat sebelum pertanyaan ini (maks. 5 pesan)
+    history = st.session_state.chat_history[:-1][-5:]
+    return sistok_assistant.stream_response(load_assistant_client(), query, summary, history)
 
 # st.write('Kolom yang ada:', data.columns)
 
@@ -151,28 +358,64 @@ menu = option_menu(None, ['Dashboard', 'Analysis', 'About'],
 # # Sidebar untuk navigasi
 # menu = st.sidebar.radio('Navigasi', ['Dashboard', 'Analysis', 'About'])
 
-# Memuat data
-data = load_data()
-
+# Data, kubus dan library grafik hanya dimuat oleh tab yang membutuhkannya
 if menu == 'Dashboard':
+    import plotly.express as px
+
     st.title('Dashboard')
+    # Waktu, memori dan jumlah baris per tahap rerun (lihat panel Debug di sidebar)
+    trace = sistok_metrics.RerunTrace('Dashboard')
+
+    # Memuat data
+    data_version = sistok_data.source_version()
+    data = load_source(data_version)
+    trace.lap('load_data', rows=data['rows'] if DATA_BACKEND == 'duckdb' else len(data))
+    cube = load_cube(data_version)
+    trace.lap('load_cube', rows=len(cube))
      
 
-    # Filter
+    # Filter (pilihan diambil dari kubus, jadi tidak perlu membaca data baris)
+    options = sistok_query.filter_options(cube)
     st.sidebar.subheader("Filter Data")
-    pelabuhan = st.sidebar.selectbox("Pilih Pelabuhan", options=[None] + list(data['pelabuhan_kedatangan_id'].unique()))
+    pelabuhan = st.sidebar.selectbox("Pilih Pelabuhan", options=[None] + options['pelabuhan_kedatangan_id'])
 
-    jenis_ikan = st.sidebar.multiselect("Pilih Jenis Ikan", options=list(data['nama_ikan_id'].unique()), default=[])
+    jenis_ikan = st.sidebar.multiselect("Pilih Jenis Ikan", options=options['nama_ikan_id'], default=[])
 
-    start_year = st.sidebar.number_input('Start Year', min_value = int(data['tahun'].min()), max_value=int(data['tahun'].max()), value=int(data['tahun'].min()), step=1)
+    start_year = st.sidebar.number_input('Start Year', min_value = options['tahun_min'], max_value=options['tahun_max'], value=options['tahun_min'], step=1)
     
-    end_year = st.sidebar.number_input('End Year', min_value=start_year, max_value=int(data['tahun'].max()), value=int(data['tahun'].max()), step=1)
+    end_year = st.sidebar.number_input('End Year', min_value=start_year, max_value=options['tahun_max'], value=options['tahun_max'], step=1)
 
     time_frame = st.sidebar.selectbox('Time Frame', ['Daily', 'Weekly', 'Monthly', 'Yearly'])
 
+    # Mode perbandingan: beberapa pelabuhan dan/atau alat tangkap berdampingan
+    compare_mode = st.sidebar.checkbox('Mode Perbandingan')
+    compare_ports, compare_gears = [], []
+    if compare_mode:
+        compare_ports = st.sidebar.multiselect('Bandingkan Pelabuhan', options=options['pelabuhan_kedatangan_id'])
+        compare_gears = st.sidebar.multiselect('Bandingkan Alat Tangkap', options=options['jenis_api'])
+
+    # Trip anomali (flag dihitung sekali saat refresh, lihat sistok_anomaly):
+    # disertakan, disorot, atau dikecualikan dari angka dan grafik Dashboard
+    anomaly_mode = st.sidebar.radio('Trip Anomali', ['Sertakan', 'Sorot', 'Kecualikan'], horizontal=True)
+    trace.lap('sidebar_filter')
+
     
-    # Filter data
-    filtered_data = filter_data(data, pelabuhan, jenis_ikan, start_year, end_year, time_frame )
+    # Filter data (backend duckdb: filter menjadi predikat query, bukan posisi baris)
+    filter_index = data if DATA_BACKEND == 'duckdb' else load_filter_index(data_version)
+    filtered_rows = query_backend.select_rows(filter_index, pelabuhan, jenis_ikan, start_year, end_year)
+    excluded = anomaly_mode == 'Kecualikan'
+    if excluded:
+        filtered_rows = query_backend.anomaly_rows(filter_index, filtered_rows, False)
+    trace.lap('filter_data', rows=query_backend.count_rows(filter_index, filtered_rows))
+    # Kunci cache hasil per rentang tahun: refresh yang hanya mengubah tahun
+    # lain tidak membuang hasil filter ini (lihat sistok_data.range_version).
+    # Tuple (versi, tanpa anomali): versi bisa None sebelum ada snapshot, dan
+    # hasil tanpa trip anomali di-cache terpisah ('Sertakan' dan 'Sorot' sama).
+    cache_version = (sistok_data.range_version(load_partitions(data_version), start_year, end_year) or data_version, excluded)
+    if excluded:
+        cube = load_normal_cube(data_version)
+    summary = get_dashboard_summary(cube, cache_version, pelabuhan, jenis_ikan, start_year, end_year, time_frame)
+    trace.lap('dashboard_summary', rows=summary['totals']['trip'])
 
     # Chatbot
     st.sidebar.markdown('---')
@@ -182,16 +425,13 @@ if menu == 'Dashboard':
     user_input = st.sidebar.text_input('Ask about the Data:', key='chat_input')
 
     # Send Button
+    pending_question = None
     if st.sidebar.button('Send', key='send_button'):
         if user_input:
             # Add user message to history
             st.session_state.chat_history.append({'role': 'user', 'content': user_input})
-
-            # Get bot response
-            with st.spinner('Thinking...'):
-                bot_response = get_openai_response(user_input, filtered_data)
-            # Add bot response to history
-            st.session_state.chat_history.append({'role': 'assistant', 'content': bot_response})
+            # Jawaban di-stream setelah Dashboard selesai dirender (lihat bawah)
+            pending_question = user_input
 
     #  Display chat history
     st.sidebar.markdown("### Riwayat Chat")
@@ -201,24 +441,43 @@ if menu == 'Dashboard':
         else:
             st.sidebar.markdown(f"**Assistant:** {message['content']}")
         st.sidebar.markdown("---")
+    pending_answer = st.sidebar.container()
 
     # Clear chat history button
     if st.sidebar.button("Hapus Riwayat Chat"):
         st.session_state.chat_history = []
-        st.experimental_rerun()
-
+        st.rerun()
+    trace.lap('sidebar_chat')
     
 
- # Cek kelengkapan data tahun 2024
-    if 2024 in range(start_year, end_year+1):
-        if not filtered_data.empty:
-            data_tahun_2024 = filtered_data[filtered_data['tahun'] == 2024]
-            if data_tahun_2024.empty or data_tahun_2024['berat'].sum() == 0:
-                st.warning("⚠️ Data tahun 2024 belum lengkap. Mohon diperhatikan!")
-            else:
-                st.success("✅ Data tahun 2024 sudah lengkap.")
+    # Cek kelengkapan data: setiap pelabuhan x bulan di rentang filter
+    # dibandingkan dengan baseline historisnya (lihat sistok_completeness)
+    completeness = get_completeness(data_version, pelabuhan, jenis_ikan, start_year, end_year)
+    gaps = completeness['view'][completeness['view']['status'] != 'lengkap']
+    if not summary['totals']['trip']:
+        st.warning("Data tidak tersedia. Silahkan periksa kembali filter Anda.")
+    elif len(gaps):
+        latest = gaps.sort_values(['tahun', 'bulan']).iloc[-1]
+        st.warning(
+            f"⚠️ {len(gaps)} dari {len(completeness['view'])} pelabuhan × bulan belum lengkap "
+            f"(di bawah {sistok_completeness.LOW_RATIO:.0%} baseline historis), terbaru {latest['pelabuhan_kedatangan_id']} {latest['periode']}. "
+            "Lihat KELENGKAPAN DATA."
+        )
+    else:
+        st.success("✅ Data semua pelabuhan × bulan di rentang ini lengkap dibanding baseline historis.")
+    trace.lap('completeness', rows=len(completeness['view']))
+
+    if anomaly_mode == 'Sorot':
+        anomalies = get_anomaly_summary(cube, cache_version, pelabuhan, jenis_ikan, start_year, end_year)
+        semua, anomali = anomalies['semua'], anomalies['anomali']
+        if anomali['trip']:
+            st.warning(
+                f"⚠️ {anomali['trip']:,} dari {semua['trip']:,} trip anomali "
+                f"({anomali['berat'] / max(semua['berat'], 1):.1%} berat, "
+                f"{anomali['nilai_produksi'] / max(semua['nilai_produksi'], 1):.1%} nilai produksi). Lihat TRIP ANOMALI."
+            )
         else:
-            st.warning("Data tidak tersedia. Silahkan periksa kembali filter Anda.")
+            st.info('Tidak ada trip anomali di rentang filter ini.')
 
 
     # Rename column
@@ -232,24 +491,106 @@ if menu == 'Dashboard':
         'provinsi': 'Provinsi',
         'tanggal_berangkat': 'Tanggal Berangkat',
         'tanggal_kedatangan': 'Tanggal Kedatangan',
+        'harga_per_kg': 'Harga per Kg',
+        'kualitas': 'Kualitas',
+        'anomali': 'Anomali',
         
     }
-    #  rename kolom yang ada di dataframe
-    filtered_data = filtered_data.rename(columns={k: v for k, v in columns_to_rename.items() if k in filtered_data.columns})
 
-    # Ringkasan data
+    # Ringkasan data: hanya satu halaman (kolom terpilih) yang dikirim ke browser.
+    # Cari, urutkan, proyeksi kolom dan rename dilakukan di server.
     with st.expander('VIEW DATASET'):
-        showData= st.multiselect('Filter: ', filtered_data.columns, default=filtered_data.columns)
-        st.dataframe(filtered_data[showData], use_container_width=True)
+        view_columns = query_backend.view_columns(filter_index)
+        showData= st.multiselect('Filter: ', view_columns, default=view_columns, format_func=lambda c: columns_to_rename.get(c, c))
+        search_col, sort_col, order_col, size_col = st.columns(4)
+        search = search_col.text_input('Cari', key='view_search')
+        sort_by = sort_col.selectbox('Urutkan berdasarkan', [None] + showData, format_func=lambda c: '-' if c is None else columns_to_rename.get(c, c))
+        ascending = order_col.selectbox('Urutan', ['Naik', 'Turun']) == 'Naik'
+        page_size = size_col.selectbox('Baris per halaman', [50, 100, 500])
+
+        view_rows = filtered_rows
+        if search:
+            view_rows = query_backend.search_rows(filter_index, view_rows, showData, search)
+        if sort_by:
+            view_rows = query_backend.sort_rows(filter_index, view_rows, sort_by, time_frame, ascending)
+        view_count = query_backend.count_rows(filter_index, view_rows)
+        total_pages = max(1, -(-view_count // page_size))
+        page = st.number_input('Halaman', min_value=1, max_value=total_pages, value=1, step=1)
+        st.caption(f'{view_count:,} baris, halaman {page} dari {total_pages}')
+
+        data_page = query_backend.page_data(filter_index, view_rows, showData, time_frame, page, page_size).rename(columns=columns_to_rename)
+        trace.lap('view_dataset.page_data', rows=len(data_page))
+        st.dataframe(data_page, use_container_width=True, hide_index=True)
+        trace.lap('view_dataset.st_dataframe', rows=len(data_page))
+
+    # Trip anomali di filter ini, berat terbesar dulu (maks. 500 baris)
+    if anomaly_mode == 'Sorot':
+        with st.expander('TRIP ANOMALI'):
+            st.caption(
+                'Trip yang berat per hari trip atau harga per kg-nya menyimpang jauh dari trip lain di pelabuhan, jenis ikan, '
+                f'alat tangkap dan bulan yang sama (|skor z robust median/MAD| > {sistok_anomaly.THRESHOLD}, skala log).'
+            )
+            anomaly_rows = query_backend.anomaly_rows(filter_index, filtered_rows, True)
+            anomaly_rows = query_backend.sort_rows(filter_index, anomaly_rows, 'berat', time_frame, ascending=False)
+            anomaly_page = query_backend.page_data(filter_index, anomaly_rows, [
+                'tanggal_kedatangan', 'pelabuhan_kedatangan_id', 'nama_ikan_id', 'jenis_api',
+                'jumlah_hari', 'berat', 'nilai_produksi', 'harga_per_kg',
+            ], time_frame, 1, 500)
+            st.dataframe(anomaly_page.rename(columns={
+                **columns_to_rename, 'nama_ikan_id': 'Jenis Ikan', 'jenis_api': 'Alat Tangkap', 'berat': 'Berat',
+            }), use_container_width=True, hide_index=True)
+        trace.lap('anomaly_panel', rows=len(anomaly_page))
+
+    # Heatmap kelengkapan dan daftar sel yang kurang (pelabuhan x jenis ikan x bulan)
+    with st.expander('KELENGKAPAN DATA'):
+        st.caption(
+            'Rasio trip terhadap baseline (median bulan yang sama di tahun-tahun lain; '
+            'pelabuhan × jenis ikan yang baru punya data satu tahun belum punya baseline). '
+            f"Kosong = tidak ada trip padahal biasanya ada; rendah = trip atau berat di bawah {sistok_completeness.LOW_RATIO:.0%} baseline."
+        )
+        st.plotly_chart(completeness['fig'], use_container_width=True)
+        flags = completeness['flags']
+        st.write(f'{len(flags):,} pelabuhan × jenis ikan × bulan belum lengkap:')
+        st.dataframe(flags[[
+            'pelabuhan_kedatangan_id', 'nama_ikan_id', 'periode', 'trip', 'trip_baseline', 'berat', 'berat_baseline', 'status',
+        ]].head(500).rename(columns={
+            **columns_to_rename,
+            'nama_ikan_id': 'Jenis Ikan',
+            'periode': 'Bulan',
+            'trip': 'Trip',
+            'trip_baseline': 'Trip (baseline)',
+            'berat': 'Berat',
+            'berat_baseline': 'Berat (baseline)',
+            'status': 'Status',
+        }), use_container_width=True, hide_index=True)
+    trace.lap('completeness_panel', rows=len(flags))
+
+    # CPUE dan FPI semua alat tangkap per stok (pelabuhan x jenis ikan x tahun)
+    with st.expander('CPUE & FPI PER ALAT TANGKAP'):
+        gear_table = load_normal_gear_cpue(data_version) if anomaly_mode == 'Kecualikan' else load_gear_cpue(data_version)
+        gear_cpue = sistok_query.slice_cube(gear_table, pelabuhan, jenis_ikan, start_year, end_year)
+        st.caption('FPI dihitung terhadap alat tangkap dengan CPUE tertinggi di stok (pelabuhan, jenis ikan, tahun) yang sama.')
+        # Hanya satu halaman tabel yang dikirim ke browser (sama seperti VIEW DATASET)
+        page_col, size_col = st.columns(2)
+        cpue_page_size = size_col.selectbox('Baris per halaman', [50, 100, 500], key='cpue_page_size')
+        cpue_pages = max(1, -(-len(gear_cpue) // cpue_page_size))
+        cpue_page = page_col.number_input('Halaman', min_value=1, max_value=cpue_pages, value=1, step=1, key='cpue_page')
+        st.caption(f'{len(gear_cpue):,} baris, halaman {cpue_page} dari {cpue_pages}')
+        st.dataframe(gear_cpue.iloc[(cpue_page - 1) * cpue_page_size:cpue_page * cpue_page_size].rename(columns={
+            **columns_to_rename,
+            'jenis_api': 'Alat Tangkap',
+            'catch': 'Catch (ton)',
+            'effort': 'Effort (hari)',
+            'effort_std': 'Effort Standar (hari)',
+        }), use_container_width=True, hide_index=True)
+    trace.lap('gear_cpue', rows=len(gear_cpue))
      
     #  compute top analytics
-    if not filtered_data.empty:
-        total_tangkapan = float(pd.Series(filtered_data['berat']).sum())
-        total_nilai_produksi = float(pd.Series(filtered_data['Nilai Produksi']).sum())
-        total_hari = filtered_data['Jumlah Hari'].sum()
-        total_ikan = filtered_data['nama_ikan_id'].nunique()
-    else:
-        total_tangkapan = total_nilai_produksi = total_hari = total_ikan = 0
+    totals = summary['totals']
+    total_tangkapan = totals['berat']
+    total_nilai_produksi = totals['nilai_produksi']
+    total_hari = totals['jumlah_hari']
+    total_ikan = totals['jenis_ikan']
 
 
     # Display top analytics
@@ -262,32 +603,18 @@ if menu == 'Dashboard':
         st.markdown(f"<div class='metric-box'>📆<br>Total Hari<br><b>{total_hari}</b></div>", unsafe_allow_html=True)
     with total4:
         st.markdown(f"<div class='metric-box'>🎣<br>Jenis Ikan<br><b>{total_ikan}</b></div>", unsafe_allow_html=True)
+    trace.lap('metric_box')
 
     # Graph
     
     
-    # Grafik 1 : Data Tangkapan per Tahun
+    # Grafik 1 : Data Tangkapan per periode time frame
     # st.subheader('Tangkapan per Tahun')
-    tangkapan_tahunan = filtered_data.groupby('tahun').agg({'berat':'sum'}).reset_index()
-    fig_tangkapan = px.line(
-        tangkapan_tahunan, 
-        x='tahun', 
-        y='berat', 
-        orientation= 'v',
-        title='TOTAL BERAT TANGKAPAN',
-        color_discrete_sequence = ['#0083b8']*len(tangkapan_tahunan),
-        template='plotly_dark',
-    )
-    fig_tangkapan.update_layout(
-        xaxis=dict(tickmode='linear'),
-        plot_bgcolor='rgba(0,0,0,0)',
-        yaxis=(dict(showgrid=False))
-    )
+    fig_tangkapan = get_catch_figure(filter_index, filtered_rows, cache_version, pelabuhan, jenis_ikan, start_year, end_year, time_frame)
     
 
      # Grafik 2: 10 Jenis Tangkapan Terbanyak
-    tangkapan_dominan = (
-        filtered_data.groupby('nama_ikan_id').agg({'berat':'sum'}).reset_index().sort_values(by='berat', ascending=False).head(10))
+    tangkapan_dominan = summary['tangkapan_dominan']
     fig_tangkapan_dominan = px.bar(
         tangkapan_dominan,
         x='berat', 
@@ -307,33 +634,82 @@ if menu == 'Dashboard':
         paper_bgcolor= 'rgba(0,0,0,0)',
         xaxis=dict(showgrid=True, gridcolor='#cecdcd'),
         )
+
+    # Pie chart
+    alat_tangkap_dominan = summary['alat_tangkap_dominan']
+    fig_alat_tangkap = px.pie(alat_tangkap_dominan, names='jenis_api', values='berat', title='ALAT TANGKAP DOMINAN')
+    fig_alat_tangkap.update_layout(legend_title='Alat Tangkap', legend_y=0.9)
+    fig_alat_tangkap.update_traces(textposition='inside', textinfo='percent+label')
+    trace.lap('plotly_figures')
     
     left,right,center=st.columns(3)
     left.plotly_chart(fig_tangkapan,use_container_width=True)
     right.plotly_chart(fig_tangkapan_dominan, use_container_width=True)
    
     with center:
-    # Pie chart
-        alat_tangkap_dominan = filtered_data.groupby('jenis_api').agg({'berat':'sum'}).reset_index().sort_values(by='berat', ascending=False).head(10)
-        fig_alat_tangkap = px.pie(alat_tangkap_dominan, names='jenis_api', values='berat', title='ALAT TANGKAP DOMINAN')
-        fig_alat_tangkap.update_layout(legend_title='Alat Tangkap', legend_y=0.9)
-        fig_alat_tangkap.update_traces(textposition='inside', textinfo='percent+label')
         st.plotly_chart(fig_alat_tangkap, use_container_width=True)
+    trace.lap('st_plotly_chart')
+
+    # Mode perbandingan: KPI, tren tahunan, CPUE dan jenis ikan teratas per grup
+    if compare_mode and (compare_ports or compare_gears):
+        st.subheader('Perbandingan')
+        comparison = get_comparison(cube, cache_version, compare_ports, compare_gears, jenis_ikan, start_year, end_year)
+        st.dataframe(comparison['totals'].rename(columns={
+            'grup': 'Grup',
+            'berat': 'Total Tangkapan (Kg)',
+            'nilai_produksi': 'Nilai Produksi (IDR)',
+            'jumlah_hari': 'Total Hari',
+            'trip': 'Trip',
+            'jenis_ikan': 'Jenis Ikan',
+            'CPUE': 'CPUE (Kg/Hari)',
+        }), use_container_width=True, hide_index=True)
+        left, right = st.columns(2)
+        left.plotly_chart(comparison['fig_tahunan'], use_container_width=True)
+        right.plotly_chart(comparison['fig_cpue'], use_container_width=True)
+        st.plotly_chart(comparison['fig_jenis_ikan'], use_container_width=True)
+        trace.lap('comparison', rows=len(comparison['totals']))
+    elif compare_mode:
+        st.info('Pilih pelabuhan dan/atau alat tangkap yang dibandingkan di sidebar.')
+
+    # Prakiraan bulanan (batch per versi data, lihat sistok_forecast) untuk pilihan filter
+    forecast = get_forecast(data_version, pelabuhan, jenis_ikan, start_year)
+    if not forecast['forecast'].empty:
+        st.plotly_chart(forecast['fig'], use_container_width=True)
+        models = forecast['models']['model'].value_counts()
+        st.caption(
+            f"Prakiraan {sistok_forecast.HORIZON} bulan ke depan, jumlah dari {len(forecast['models'])} deret pelabuhan × jenis ikan "
+            f"(model terpilih per deret dari backtest {sistok_forecast.HOLDOUT} bulan terakhir: "
+            + ', '.join(f'{name} {count}' for name, count in models.items() if count) + '). '
+            'Band = jumlah MAE backtest.'
+        )
+    trace.lap('forecast', rows=len(forecast['forecast']))
+
+    # Stream jawaban assistant ke sidebar tanpa menahan render Dashboard
+    if pending_question:
+        with pending_answer:
+            st.markdown("**Assistant:**")
+            bot_response = st.write_stream(get_openai_response(pending_question, summary))
+            st.markdown("---")
+        # Add bot response to history
+        st.session_state.chat_history.append({'role': 'assistant', 'content': bot_response})
+        trace.lap('assistant')
+
+    # Catat metrik rerun; panel Debug menampilkan tahap-tahap rerun ini
+    load_metrics().record(trace)
+    if st.sidebar.checkbox('Debug: waktu per tahap', key='debug_panel'):
+        with st.sidebar.expander('Debug', expanded=True):
+            st.caption(f"Total {trace.total_ms():,.1f} ms")
+            st.dataframe(pd.DataFrame(trace.spans), hide_index=True, use_container_width=True)
           
 
 elif menu == 'Analysis':
+    import plotly.express as px
+
     st.title('Analysis')
    
     # Display Upload Button
-   
-    df_sample = pd.read_csv('./data/data_kembung_karangantu.csv')
-
-    
-
-    
     try:
-        with open('./data/data_kembung_karangantu.csv', 'r') as file:
-            sample_csv_content = file.read()
+        sample_csv_content = load_sample_csv()
         st.download_button(
             label='Download Sample CSV',
             data=sample_csv_content,
@@ -352,41 +728,32 @@ elif menu == 'Analysis':
 
     # Proses jika file diupload
     if uploaded_file is not None:
-        # Membaca file yang diupload
-        user_data = pd.read_csv(uploaded_file)
+        # Membaca file yang diupload (sekali per isi file, lihat load_upload)
+        content_hash = sistok_analysis.upload_hash(uploaded_file)
+        upload = load_upload(content_hash, uploaded_file)
+        user_data = upload['data']
+        aggregates = upload['aggregates']
         st.success('File uploaded succesfully!')
         with st.expander('Your Dataset:'):
             st.dataframe(user_data)
 
+        # Hasil validasi per baris (lihat sistok_clean.ISSUES); baris tidak dibuang
+        quality = {issue: count for issue, count in upload['quality'].items() if count}
+        if quality:
+            flagged = user_data[user_data['kualitas'] > 0]
+            with st.expander(f'⚠ Kualitas Data ({len(flagged):,} baris bermasalah)'):
+                st.dataframe(pd.DataFrame({'Masalah': list(quality), 'Jumlah Baris': list(quality.values())}), hide_index=True)
+                st.dataframe(flagged.assign(masalah=sistok_clean.issue_names(flagged['kualitas'])).head(1000))
+
         # Analisis: Data Tangkapan per Tahun
-        if 'tahun' in user_data.columns:
+        if sistok_analysis.has_columns(aggregates, 'tahun', 'jenis_api', 'berat'):
 
-            if 'Nilai Produksi' in user_data.columns:
-            
             # Grafik 1: Data Tangkapan per Tahun
-            # Mengelompokkan data berdasarkan tahun dan menjumlahkan berat
-                data_per_year = user_data.groupby('tahun').agg({'berat': 'sum', 'Nilai Produksi': 'sum'}).reset_index()
-
-            # Menghitung rata-rata nilai produksi dan nilai produksi
-                data_per_year['Harga rata-rata nilai produksi'] = data_per_year['Nilai Produksi'] / data_per_year['berat']
-                data_per_year['Produksi (Ton)'] = data_per_year['berat'] / 1000
-                data_per_year['Nilai Produksi'] = data_per_year['Produksi (Ton)'] * data_per_year['Harga rata-rata nilai produksi'] 
-            else:
-                data_per_year = user_data.groupby('tahun').agg({'berat': 'sum'}).reset_index()
-                data_per_year['Produksi (Ton)'] = data_per_year['berat'] / 1000
-                data_per_year['Harga rata-rata nilai produksi'] = None
-                data_per_year['Nilai Produksi'] = None
+            data_per_year = sistok_analysis.yearly_production(aggregates)
             
             
-            # Membuat grafik garis menggunakan plotly
-            fig_data_per_year = px.line(
-                data_per_year, 
-                x='tahun', 
-                y='berat', 
-                orientation='v',
-                title='TOTAL BERAT TANGKAPAN PER TAHUN', 
-                template='plotly_dark'
-            )
+            # Membuat grafik garis (lapisan grafik yang sama dengan Dashboard)
+            fig_data_per_year = sistok_charts.line_chart(data_per_year, 'tahun', 'berat', title='TOTAL BERAT TANGKAPAN PER TAHUN')
             
             # Memperbarui layout grafik
             fig_data_per_year.update_layout(
@@ -396,7 +763,7 @@ elif menu == 'Analysis':
             )
 
             # Grafik 2: 
-            api_dominan = user_data.groupby('jenis_api').agg({'berat':'sum'}).reset_index().sort_values(by='berat', ascending=False).head(10)
+            api_dominan = sistok_analysis.dominant_gears(aggregates)
             fig_api_dominan = px.bar(
                 api_dominan,
                 x='berat', 
@@ -463,19 +830,8 @@ elif menu == 'Analysis':
 
         # Hasil Tangkapan per Alat Tangkap 
         with st.expander('⬇ Hasil Tangkapan per Alat Tangkap'):	
-            if {'jenis_api', 'tahun', 'berat'}.issubset(user_data.columns):
-                tangkapan_per_tahun = user_data.groupby(['jenis_api', 'tahun']).agg({'berat': 'sum'}).reset_index()
-                
-                tangkapan_pivot = tangkapan_per_tahun.pivot(index='jenis_api', columns='tahun', values='berat').fillna(0)
-
-                # Tambahkan kolom total untuk tiap alat tangkap
-                tangkapan_pivot['Total'] = tangkapan_pivot.sum(axis=1)
-
-                # Tambahkan baris jumlah total untuk tiap alat tangkap
-                tangkapan_pivot.loc['Jumlah'] = tangkapan_pivot.sum()
-
-                # Reset index untuk tampilkan tabel
-                tangkapan_pivot = tangkapan_pivot.reset_index()
+            if sistok_analysis.has_columns(aggregates, 'jenis_api', 'tahun', 'berat'):
+                tangkapan_pivot = sistok_analysis.gear_pivot(aggregates, 'berat')
 
                 # Tampilkan tabel
                 st.write('Hasil Tangkapan per Alat Tangkap')
@@ -500,19 +856,8 @@ elif menu == 'Analysis':
 
         # Jumlah Trip per Alat Tangkap
         with st.expander('⬇ Jumlah Trip per Alat Tangkap'):
-            if {'jenis_api', 'tahun', 'Jumlah Hari'}.issubset(user_data.columns):
-
-                effort_per_tahun = user_data.groupby(['jenis_api', 'tahun']).agg({'Jumlah Hari': 'sum'}).reset_index()
-                effort_pivot = effort_per_tahun.pivot(index='jenis_api', columns='tahun', values='Jumlah Hari').fillna(0)
-
-                # Tambahkan kolom total untuk tiap alat tangkap
-                effort_pivot['Total'] = effort_pivot.sum(axis=1)
-                # Tambahkan baris jumlah total untuk tiap alat tangkap
-                effort_pivot.loc['Jumlah'] = effort_pivot.sum()
-
-                # Reset index untuk tampilkan tabel
-                effort_pivot = effort_pivot.reset_index()
-                
+            if sistok_analysis.has_columns(aggregates, 'jenis_api', 'tahun', 'Jumlah Hari'):
+                effort_pivot = sistok_analysis.gear_pivot(aggregates, 'Jumlah Hari')
 
                 # Tampilkan tabel
                 st.write('Jumlah Trip per Alat Tangkap')
@@ -541,31 +886,9 @@ elif menu == 'Analysis':
             # st.write('CPUE (Catch Per Unit Effort) adalah rasio antara jumlah tangkapan ikan dengan upaya penangkapan yang dilakukan.')
 
         
-            if 'jenis_api' in user_data.columns and 'berat' in user_data.columns and 'Jumlah Hari' in user_data.columns:
-                user_data.rename(columns={'jenis_api' : 'Alat Tangkap', 'berat': 'catch (ton)', 'Jumlah Hari': 'effort (hari)'}, inplace=True)
-
-                # Konversi tangkapan ke ton
-                user_data['catch (ton)'] = user_data['catch (ton)'] / 1000 
-                # Kelompokkan data berdasarkan jenis alat tangkap
-                alat_tangkap_group = user_data.groupby('Alat Tangkap').agg({'catch (ton)': 'sum', 'effort (hari)': 'sum'}).reset_index()
-
-                # Menambah kolom CPUE
-                alat_tangkap_group['CPUE'] = alat_tangkap_group['catch (ton)'] / alat_tangkap_group['effort (hari)']
-
-
-                # Urutkan data berdasarkan berat
-                alat_tangkap_group = alat_tangkap_group.sort_values(by='catch (ton)', ascending=False)
-
-                # Pilih 2 alat tangkap dominan
-                alat_tangkap_dominan = alat_tangkap_group.head(2)
-
-                # Cari CPUE tertinggi
-                cpue_max = alat_tangkap_dominan['CPUE'].max()
-
-                # Kolom FPI
-                alat_tangkap_dominan['FPI'] = alat_tangkap_dominan['CPUE'] / cpue_max
-
-                alat_tangkap_dominan.loc[alat_tangkap_dominan['CPUE'] == cpue_max, 'FPI'] = 1
+            if sistok_analysis.has_columns(aggregates, 'jenis_api', 'berat', 'Jumlah Hari'):
+                # CPUE dan FPI 2 alat tangkap dominan
+                alat_tangkap_dominan = sistok_analysis.cpue_table(aggregates)
 
                 # Tampilkan data dalam tabel
                 st.write('Data CPUE per Alat Tangkap:')
@@ -586,6 +909,59 @@ elif menu == 'Analysis':
                 fig_cpue.update_layout(showlegend=False)
 
                 st.plotly_chart(fig_cpue, use_container_width=True)
+
+        # Model produksi surplus (Schaefer/Fox) dengan effort standar FPI
+        with st.expander('⬇ Model Produksi Surplus'):
+            if sistok_analysis.has_columns(aggregates, 'jenis_api', 'tahun', 'berat', 'Jumlah Hari'):
+                series, models = load_surplus(content_hash, aggregates)
+
+                st.write('Catch dan effort standar per tahun:')
+                st.table(series.rename(columns={'catch': 'catch (ton)', 'effort_std': 'effort standar (hari)'}))
+
+                st.write('Hasil model (MSY dalam ton, E_MSY dalam hari; interval kepercayaan bootstrap 95%):')
+                st.table(models[[
+                    'model', 'msy', 'msy_lo', 'msy_hi', 'e_msy', 'e_msy_lo', 'e_msy_hi', 'r2', 'konvergen', 'boot_valid',
+                ]].rename(columns={
+                    'msy': 'MSY', 'msy_lo': 'MSY (bawah)', 'msy_hi': 'MSY (atas)',
+                    'e_msy': 'E_MSY', 'e_msy_lo': 'E_MSY (bawah)', 'e_msy_hi': 'E_MSY (atas)', 'r2': 'R²',
+                    'konvergen': 'Konvergen', 'boot_valid': 'Replikasi Valid',
+                }))
+                st.caption(
+                    'MSY kosong jika kurva tidak punya puncak (b ≥ 0) atau fit tidak konvergen. Interval kosong jika '
+                    f'kurang dari {sistok_surplus.MIN_VALID_BOOT:.0%} replikasi bootstrap menghasilkan MSY valid.'
+                )
+
+                # Titik catch vs effort + kurva tiap model
+                fig_surplus = px.scatter(
+                    series,
+                    x='effort_std',
+                    y='catch',
+                    text='tahun',
+                    title='Catch vs Effort Standar',
+                    labels={'effort_std': 'Effort standar (hari)', 'catch': 'Catch (ton)'},
+                    template='plotly_dark'
+                )
+                fig_surplus.update_traces(textposition='top center')
+                effort_grid = np.linspace(0, series['effort_std'].max() * 1.5, 100)
+                for row in models.itertuples():
+                    if np.isfinite(row.msy):
+                        fig_surplus.add_scatter(x=effort_grid, y=sistok_surplus.predict_catch(row.model, row.a, row.b, effort_grid), mode='lines', name=row.model)
+                st.plotly_chart(fig_surplus, use_container_width=True)
+
+        # Ekspor tabel dan grafik Analysis ke XLSX/PDF di background (lihat sistok_report)
+        with st.expander('⬇ Ekspor Laporan (XLSX/PDF)'):
+            report_tables = sistok_analysis.analysis_tables(aggregates)
+            available = [name for name in sistok_report.REPORT_TABLES if name in report_tables]
+            chosen = st.multiselect('Tabel', available, default=available, format_func=sistok_report.REPORT_TABLES.get)
+            formats = st.multiselect('Format', sistok_report.FORMATS, default=sistok_report.FORMATS, format_func=str.upper)
+            charts = st.checkbox('Sertakan grafik', value=True)
+            report_options = sistok_report.report_options(chosen, formats, charts)
+            report_key = sistok_report.report_key(content_hash, report_options)
+            if st.button('Buat Laporan', disabled=not (chosen and formats)):
+                load_report_jobs().submit(report_key, report_options, {name: report_tables[name] for name in chosen})
+            job = load_report_jobs().status(report_key, report_options)
+            polling = job is not None and not job['done']
+            st.fragment(run_every=1 if polling else None)(show_report_status)(report_key, report_options, polling)
            	
         
             
@@ -632,6 +1008,23 @@ elif menu == 'About':
     st.title('About this App')
     st.write('Sistok adalah Aplikasi berbasis web untuk analisis data stok ikan')
 
+    meta = sistok_data.read_meta(sistok_data.source_version())
+    memory = meta.get('memory_bytes')
+    st.caption(f'Backend query Dashboard: {DATA_BACKEND}')
+    if memory:
+        st.caption(f"Memori dataset: {memory['after'] / 1e6:,.1f} MB (tanpa skema: {memory['before'] / 1e6:,.1f} MB)")
+    manifest = sistok_data.read_manifest()
+    if manifest.get('refresh'):
+        st.caption(
+            f"Refresh terakhir: {manifest['refresh']['mode']}, {manifest['refresh']['parsed_rows']:,} baris di-parse, "
+            f"partisi berubah: {', '.join(manifest['changed_partitions']) or '-'}; watermark tanggal kedatangan {manifest['watermark']}"
+        )
+        quality = {issue: count for issue, count in manifest['refresh'].get('kualitas', {}).items() if count}
+        if quality:
+            st.caption('Baris bermasalah di refresh terakhir (tetap dipakai): ' + ', '.join(f'{issue} {count:,}' for issue, count in quality.items()))
+    cache_stats = load_result_cache().stats()
+    st.caption(f"Cache hasil Dashboard: {cache_stats['entries']} entri, {cache_stats['hits']} hit / {cache_stats['misses']} miss")
+
 else:
     st.error('Data tidak tersedia. Silahkan periksa kembali file Anda.')
 
@@ -0,0 +1,112 @@
+import hashlib
+import time
+from types import SimpleNamespace
+
+from sistok_query import ResultCache
+
+MODEL = 'gpt-3.5-turbo'
+MAX_TOKENS = 500
+TEMPERATURE = 0.7
+
+# Cache jawaban per (pertanyaan, hash konteks data), kadaluarsa setelah 1 jam
+response_cache = ResultCache(max_entries=512, max_bytes=8 * 2**20, ttl=3600)
+
+
+# System prompt dari ringkasan Dashboard (lihat sistok_query.dashboard_summary)
+def build_system_prompt(summary):
+    totals = summary['totals']
+    data_context = {
+        'total_tangkapan' : f"{totals['berat']:,.2f} Kg",
+        'nilai_produksi' : f"{totals['nilai_produksi']:,.2f} IDR",
+        'periode': f"{summary['tahun_min']} to {summary['tahun_max']}",
+        'jenis_ikan_dominan': summary['tangkapan_dominan']['nama_ikan_id'].head(3).astype(str).tolist(),
+        'alat_tangkap_dominan': summary['alat_tangkap_dominan']['jenis_api'].head(3).astype(str).tolist(),
+    }
+    return f"""You are an expert fishing data analyst assistant. Analyzie the fishing data dashboard and provide insights based on the following context:
+
+Current Dashboard Data:
+- Total Tangkapan: {data_context['total_tangkapan']}
+- Nilai Produksi: {data_context['nilai_produksi']}
+- Time Period: {data_context['periode']}
+- Top 3 Jenis Ikan: {', '.join(data_context['jenis_ikan_dominan'])}
+- Top 3 Alat Tangkap: {', '.join(data_context['alat_tangkap_dominan'])}
+
+Provide concise, data-driven answers in Bahasa Indonesia. Focus on trends, patterns, and insights from the data"""
+
+
+def cache_key(query, system_prompt):
+    context_hash = hashlib.sha256(system_prompt.encode('utf-8')).hexdigest()
+    return (' '.join(query.lower().split()), context_hash)
+
+
+# Pengganti OpenAI lokal untuk uji latensi offline. Meniru bentuk respons
+# chat.completions.create (termasuk stream=True), tanpa jaringan.
+class MockClient:
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _reply(self, messages):
+        question = messages[-1]['content']
+        context = [line for line in messages[0]['content'].splitlines() if line.startswith('- ')]
+        return f"[mock] Pertanyaan: {question}\n" + '\n'.join(context)
+
+    def _create(self, model, messages, stream=False, **kwargs):
+        text = self._reply(messages)
+        if not stream:
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text))])
+        return self._stream(text)
+
+    def _stream(self, text):
+        for word in text.split(' '):
+            time.sleep(self.delay)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word + ' '))])
+
+
+# Buat client chat. backend 'openai' memakai OpenAI API atau server lokal yang
+# kompatibel (base_url); backend 'mock' memakai MockClient. Client OpenAI
+# menyimpan pool koneksi HTTP sendiri, jadi buat sekali lalu pakai ulang.
+def create_client(backend='openai', api_key=None, base_url=None, mock_delay=0.02):
+    if backend == 'mock':
+        return MockClient(delay=mock_delay)
+    if backend != 'openai':
+        raise ValueError(f'Backend assistant tidak dikenal: {backend}')
+    from openai import OpenAI
+
+    return OpenAI(api_key=api_key, base_url=base_url)
+
+
+# Jawaban assistant sebagai generator teks (token demi token). Jawaban yang
+# sudah pernah dibuat untuk konteks yang sama diambil dari cache.
+def stream_response(client, query, summary, history=()):
+    system_prompt = build_system_prompt(summary)
+    key = cache_key(query, system_prompt)
+    cached = response_cache.get(key)
+    if cached is not None:
+        yield cached
+        return
+
+    parts = []
+    try:
+        stream = client.chat.completions.create(
+            model=MODEL,
+            messages=[
+                {'role': 'system', 'content': system_prompt},
+                *[{'role': msg['role'], 'content': msg['content']} for msg in history],
+                {'role': 'user', 'content': query}
+            ],
+            temperature=TEMPERATURE,
+            max_tokens=MAX_TOKENS,
+            stream=True,
+        )
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            text = chunk.choices[0].delta.content
+            if text:
+                parts.append(text)
+                yield text
+    except Exception as e:
+        yield f"Error: {str(e)}"
+        return
+    response_cache.put(key, ''.join(parts))
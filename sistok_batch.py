@@ -0,0 +1,101 @@
+import argparse
+import glob
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+import sistok_analysis
+
+FORMATS = ['csv', 'parquet']
+BACKENDS = ['pandas', 'duckdb']
+
+
+# Parquet butuh nama kolom string (kolom tahun pada pivot berupa integer)
+def _write_table(table, path_prefix, formats):
+    table = table.rename(columns=str)
+    if 'csv' in formats:
+        table.to_csv(path_prefix + '.csv', index=False)
+    if 'parquet' in formats:
+        table.to_parquet(path_prefix + '.parquet', index=False)
+
+
+# Dijalankan di worker: hitung tabel satu file dan tulis laporan per file
+def process_file(path, output_dir, formats, chunksize=sistok_analysis.CHUNK_SIZE, backend='pandas'):
+    name = os.path.splitext(os.path.basename(path))[0]
+    tables = sistok_analysis.run_pipeline(path, chunksize=chunksize, backend=backend)
+    if not tables:
+        raise ValueError('kolom jenis_api/tahun/berat tidak ditemukan')
+    file_dir = os.path.join(output_dir, name)
+    os.makedirs(file_dir, exist_ok=True)
+    for table_name, table in tables.items():
+        _write_table(table, os.path.join(file_dir, table_name), formats)
+    return name, tables
+
+
+# Gabungkan tabel yang sama dari semua file, dengan kolom 'file' di depan.
+# Kolom tahun (pivot) diurutkan; tahun yang tidak ada di satu file diisi 0.
+def combine_tables(results):
+    combined = {}
+    for name, tables in sorted(results.items()):
+        for table_name, table in tables.items():
+            combined.setdefault(table_name, []).append(table.assign(file=name))
+
+    for table_name, frames in combined.items():
+        table = pd.concat(frames, ignore_index=True)
+        years = sorted(c for c in table.columns if not isinstance(c, str))
+        if years:
+            table[years] = table[years].fillna(0)
+        others = [c for c in table.columns if isinstance(c, str) and c not in ('file', 'Total')]
+        total = ['Total'] if 'Total' in table.columns else []
+        combined[table_name] = table[['file'] + others + years + total]
+    return combined
+
+
+# Jalankan pipeline untuk semua file di process pool. Return (hasil per file,
+# error per file); satu file yang gagal tidak menghentikan file lain.
+def run_batch(paths, output_dir, formats=FORMATS, workers=None, chunksize=sistok_analysis.CHUNK_SIZE, backend='pandas'):
+    os.makedirs(output_dir, exist_ok=True)
+    results, errors = {}, {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(process_file, path, output_dir, formats, chunksize, backend): path for path in paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                name, tables = future.result()
+            except Exception as e:
+                errors[path] = str(e)
+                print(f'GAGAL {path}: {e}', file=sys.stderr)
+                continue
+            results[name] = tables
+            print(f'OK    {path}')
+
+    for table_name, table in combine_tables(results).items():
+        _write_table(table, os.path.join(output_dir, f'gabungan_{table_name}'), formats)
+    return results, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Jalankan pipeline tab Analysis untuk banyak file CSV sekaligus')
+    parser.add_argument('input_dir', help='folder berisi file CSV (format data_kembung_*.csv)')
+    parser.add_argument('--pattern', default='data_kembung_*.csv')
+    parser.add_argument('--output', default='laporan', help='folder laporan (default: laporan)')
+    parser.add_argument('--format', choices=FORMATS + ['all'], default='all')
+    parser.add_argument('--workers', type=int, default=None, help='jumlah proses (default: jumlah CPU)')
+    parser.add_argument('--chunksize', type=int, default=sistok_analysis.CHUNK_SIZE)
+    parser.add_argument('--backend', choices=BACKENDS, default='pandas', help='duckdb: agregasi langsung dari CSV (file besar)')
+    args = parser.parse_args(argv)
+
+    paths = sorted(glob.glob(os.path.join(args.input_dir, args.pattern)))
+    if not paths:
+        parser.error(f'tidak ada file {args.pattern} di {args.input_dir}')
+    formats = FORMATS if args.format == 'all' else [args.format]
+
+    results, errors = run_batch(paths, args.output, formats, args.workers, args.chunksize, args.backend)
+    print(f'{len(results)} file diproses, {len(errors)} gagal; laporan di {args.output}')
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
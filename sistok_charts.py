@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+import sistok_data
+
+# Jumlah titik maksimum per garis yang dikirim ke browser; di atas ini deret
+# di-downsample dengan LTTB
+MAX_POINTS = 1000
+# Mulai jumlah titik ini trace memakai WebGL (scattergl) alih-alih SVG
+WEBGL_THRESHOLD = 500
+
+
+# Largest-Triangle-Three-Buckets: pilih n_out titik yang mempertahankan bentuk
+# deret (puncak dan lembah tetap ada). Return posisi titik terpilih (urut naik).
+def lttb(x, y, n_out):
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Titik pertama dan terakhir selalu dipakai; sisanya dibagi n_out - 2 bucket
+    edges = (np.arange(n_out - 1) * (n - 2) / (n_out - 2)).astype(np.intp) + 1
+    edges[-1] = n - 1
+    selected = np.empty(n_out, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Rata-rata bucket berikutnya (untuk bucket terakhir: titik terakhir)
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+# Total berat per periode time frame untuk baris hasil filter (bincount atas
+# kunci periode integer, tanpa groupby). Hanya periode yang ada datanya.
+def period_series(index, rows, time_frame, measure='berat'):
+    data = index['data']
+    column = sistok_data.PERIOD_KEYS.get(time_frame, 'tahun')
+    keys = data[column].take(rows).to_numpy(dtype='float64', na_value=np.nan)
+    values = data[measure].take(rows).to_numpy(dtype='float64', na_value=0)
+    valid = ~np.isnan(keys)
+    if not valid.any():
+        return pd.DataFrame({'periode': [], measure: []})
+
+    keys = keys[valid].astype('int64')
+    offset = keys.min()
+    sums = np.bincount(keys - offset, weights=values[valid])
+    present = np.flatnonzero(np.bincount(keys - offset))
+    return pd.DataFrame({
+        'periode': sistok_data.period_start(present + offset, time_frame),
+        measure: sums[present],
+    })
+
+
+# Grafik garis untuk deret panjang: di-downsample ke max_points (LTTB) dan
+# memakai WebGL jika titiknya banyak, jadi ukuran payload tetap kecil
+# seberapa pun lebar rentang tanggalnya
+def line_chart(df, x, y, title=None, color=None, max_points=MAX_POINTS, webgl_threshold=WEBGL_THRESHOLD, template='plotly_dark'):
+    import plotly.graph_objects as go
+
+    x_values = df[x].to_numpy()
+    y_values = df[y].to_numpy(dtype='float64')
+    if len(df) > max_points:
+        numeric_x = x_values.astype('datetime64[D]').astype('int64') if np.issubdtype(x_values.dtype, np.datetime64) else x_values
+        keep = lttb(numeric_x, y_values, max_points)
+        x_values, y_values = x_values[keep], y_values[keep]
+
+    trace = go.Scattergl if len(x_values) >= webgl_threshold else go.Scatter
+    fig = go.Figure(trace(x=x_values, y=y_values, mode='lines', name=y, line=dict(color=color)))
+    fig.update_layout(title=title, template=template, xaxis_title=x, yaxis_title=y)
+    return fig
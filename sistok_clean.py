@@ -0,0 +1,267 @@
+import argparse
+import io
+import os
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+# Bit masalah kualitas per baris; kolom 'kualitas' = gabungan bit (0 = bersih)
+ISSUES = {
+    'tanggal_berangkat_tidak_valid': 1,
+    'tanggal_kedatangan_tidak_valid': 2,
+    'tanggal_terbalik': 4,
+    'durasi_tidak_cocok': 8,
+    'jumlah_hari_tidak_valid': 16,
+    'berat_tidak_positif': 32,
+    'nilai_tidak_positif': 64,
+}
+
+# Jumlah Hari dihitung inklusif (berangkat dan datang di hari yang sama = 1
+# hari); selisih sampai toleransi ini dengan tanggal masih dianggap cocok
+DURATION_TOLERANCE = 1
+
+# Nama kolom data_bersih -> nama kolom di file format upload (data_kembung_*.csv)
+UPLOAD_COLUMNS = {
+    'nilai_produksi': 'Nilai Produksi',
+    'jumlah_hari': 'Jumlah Hari',
+    'tanggal_berangkat': 'Tanggal Berangkat',
+    'tanggal_kedatangan': 'Tanggal Kedatangan',
+}
+
+CHUNK_BYTES = 64 * 2**20
+
+
+# Label jenis ikan yang dinormalisasi, dihitung per label unik (bukan per baris):
+# kode dalam kurung siku dibuang ("Kembung Perempuan [RAB]" -> "Kembung
+# Perempuan"), spasi dirapikan, label yang seluruhnya huruf kecil/besar dijadikan Title Case
+def normalize_species(series):
+    codes, uniques = pd.factorize(series)
+    labels = (
+        pd.Series(uniques, dtype='object').astype(str)
+        .str.replace(r'\[[^\]]*\]', '', regex=True)
+        .str.replace(r'\s+', ' ', regex=True)
+        .str.strip()
+    )
+    single_case = (labels == labels.str.lower()) | (labels == labels.str.upper())
+    labels = labels.where(~single_case, labels.str.title())
+    # Beberapa label mentah bisa jadi satu label baku; kode -1 = nilai kosong
+    categories = pd.Index(labels.unique())
+    mapped = np.where(codes >= 0, categories.get_indexer(labels)[codes], -1)
+    return pd.Series(pd.Categorical.from_codes(mapped, categories=categories), index=series.index, name=series.name)
+
+
+def _to_datetime(series):
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    return pd.to_datetime(series, errors='coerce')
+
+
+# Bit kualitas per baris. columns: nama kolom data_bersih -> nama kolom di df
+# (mis. UPLOAD_COLUMNS); pemeriksaan yang kolomnya tidak ada dilewati.
+# Return (array uint16, durasi menurut tanggal dalam hari inklusif).
+def quality_flags(df, columns=None):
+    names = {key: (columns or {}).get(key, key) for key in ['berat', 'nilai_produksi', 'jumlah_hari', 'tanggal_berangkat', 'tanggal_kedatangan']}
+    flags = np.zeros(len(df), dtype='uint16')
+    duration = pd.Series(np.nan, index=df.index)
+
+    def flag(issue, mask):
+        flags[np.asarray(mask, dtype=bool)] |= ISSUES[issue]
+
+    dates = {}
+    for key in ['tanggal_berangkat', 'tanggal_kedatangan']:
+        if names[key] in df.columns:
+            dates[key] = _to_datetime(df[names[key]])
+            flag(f'{key}_tidak_valid', dates[key].isna())
+    if len(dates) == 2:
+        duration = (dates['tanggal_kedatangan'] - dates['tanggal_berangkat']).dt.days + 1
+        flag('tanggal_terbalik', duration < 1)
+        if names['jumlah_hari'] in df.columns:
+            days = pd.to_numeric(df[names['jumlah_hari']], errors='coerce')
+            flag('durasi_tidak_cocok', ((days - duration).abs() > DURATION_TOLERANCE).fillna(False))
+    if names['jumlah_hari'] in df.columns:
+        days = pd.to_numeric(df[names['jumlah_hari']], errors='coerce')
+        flag('jumlah_hari_tidak_valid', ~(days > 0))
+    if names['berat'] in df.columns:
+        flag('berat_tidak_positif', ~(pd.to_numeric(df[names['berat']], errors='coerce') > 0))
+    if names['nilai_produksi'] in df.columns:
+        flag('nilai_tidak_positif', ~(pd.to_numeric(df[names['nilai_produksi']], errors='coerce') > 0))
+    return flags, duration
+
+
+# Nama masalah per baris dari bit kualitas (diterjemahkan per kombinasi unik)
+def issue_names(flags):
+    codes, uniques = pd.factorize(np.asarray(flags))
+    labels = [';'.join(name for name, bit in ISSUES.items() if value & bit) for value in uniques]
+    return np.asarray(labels, dtype=object)[codes]
+
+
+# Jumlah baris per masalah
+def summarize(flags):
+    flags = np.asarray(flags)
+    return {name: int(np.count_nonzero(flags & bit)) for name, bit in ISSUES.items()}
+
+
+# Bersihkan satu potongan data (format data_bersih atau upload): nama kolom
+# diseragamkan ke data_bersih, tanggal di-parse, label jenis ikan
+# dinormalisasi, lalu ditambah harga_per_kg (hanya untuk berat dan nilai
+# positif) dan kualitas. Baris tidak dibuang; baris bermasalah ditandai.
+def clean_frame(df):
+    df = df.rename(columns={v: k for k, v in UPLOAD_COLUMNS.items()})
+    for column in ['tanggal_berangkat', 'tanggal_kedatangan']:
+        if column in df.columns:
+            df[column] = _to_datetime(df[column])
+    if 'nama_ikan_id' in df.columns:
+        df['nama_ikan_id'] = normalize_species(df['nama_ikan_id'])
+
+    flags, _ = quality_flags(df)
+    if 'berat' in df.columns and 'nilai_produksi' in df.columns:
+        valid = (flags & (ISSUES['berat_tidak_positif'] | ISSUES['nilai_tidak_positif'])) == 0
+        df['harga_per_kg'] = (pd.to_numeric(df['nilai_produksi'], errors='coerce') / pd.to_numeric(df['berat'], errors='coerce')).where(valid)
+    df['kualitas'] = flags
+    return df
+
+
+# Laporan kualitas per baris: hanya baris bermasalah, dengan nomor baris data
+# (1 = baris pertama setelah header) dan kolom yang diperiksa
+def quality_report(df, first_row=1):
+    flags, duration = quality_flags(df)
+    bad = np.flatnonzero(flags)
+    report = df.iloc[bad][[c for c in ['tanggal_berangkat', 'tanggal_kedatangan', 'jumlah_hari', 'berat', 'nilai_produksi'] if c in df.columns]]
+    report.insert(0, 'baris', bad + first_row)
+    report.insert(1, 'masalah', issue_names(flags[bad]))
+    report['durasi_tanggal'] = duration.iloc[bad].to_numpy()
+    return report.reset_index(drop=True)
+
+
+# Potong file CSV jadi rentang byte per baris utuh (tanpa header), supaya
+# setiap worker mem-parse bagiannya sendiri. Mengasumsikan tidak ada baris
+# baru di dalam field ber-quote (berlaku untuk ekspor data_bersih).
+def line_ranges(path, chunk_bytes=CHUNK_BYTES):
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, 'rb') as file:
+        file.readline()
+        start = file.tell()
+        while start < size:
+            file.seek(min(start + chunk_bytes, size))
+            file.readline()
+            end = min(file.tell(), size)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def _read_range(path, start, end):
+    with open(path, 'rb') as file:
+        header = file.readline()
+        file.seek(start)
+        body = file.read(end - start)
+    return pd.read_csv(io.BytesIO(header + body), low_memory=False)
+
+
+def _write_part(df, path):
+    # Kategori disimpan sebagai teks supaya skema semua bagian sama
+    df = df.astype({c: 'object' for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)})
+    if path.endswith('.parquet'):
+        # Kolom yang kosong di bagian ini ditulis bertipe null (bukan float
+        # NaN) supaya bisa disatukan dengan tipe bagian lain (_merge_parts)
+        empty = [c for c in df.columns if df[c].isna().all()]
+        df = df.assign(**{c: pd.Series([None] * len(df), index=df.index, dtype='object') for c in empty})
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False, date_format='%Y-%m-%dT%H:%M:%S.000')
+
+
+# Dijalankan di worker: parse, bersihkan dan tulis satu rentang file.
+# Return (jumlah baris, laporan kualitas dengan nomor baris lokal).
+def clean_range(path, start, end, part_path):
+    df = clean_frame(_read_range(path, start, end))
+    _write_part(df, part_path)
+    return len(df), quality_report(df)
+
+
+# Gabungkan bagian hasil worker berurutan. Tipe kolom Parquet bisa berbeda
+# antar bagian (mis. int64 vs float64 karena NaN, null vs string untuk kolom
+# yang kosong di satu bagian), jadi skemanya disatukan dulu.
+def _merge_parts(parts, output):
+    if output.endswith('.parquet'):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.unify_schemas([pq.read_schema(part) for part in parts], promote_options='permissive')
+        with pq.ParquetWriter(output + '.tmp', schema) as writer:
+            for part in parts:
+                writer.write_table(pq.read_table(part).select(schema.names).cast(schema))
+    else:
+        with open(output + '.tmp', 'wb') as sink:
+            for i, part in enumerate(parts):
+                with open(part, 'rb') as source:
+                    if i:
+                        source.readline()
+                    shutil.copyfileobj(source, sink)
+    os.replace(output + '.tmp', output)
+
+
+def report_path(output):
+    return os.path.splitext(output)[0] + '_kualitas.csv'
+
+
+# Bersihkan file mentah di process pool: file dipotong per rentang byte,
+# tiap worker mem-parse dan membersihkan bagiannya, lalu hasil digabung
+# berurutan ke output (CSV atau .parquet) plus laporan kualitas per baris.
+def clean_file(path, output, workers=None, chunk_bytes=CHUNK_BYTES):
+    parts_dir = output + '.parts'
+    os.makedirs(parts_dir, exist_ok=True)
+    extension = '.parquet' if output.endswith('.parquet') else '.csv'
+    ranges = line_ranges(path, chunk_bytes)
+    parts = [os.path.join(parts_dir, f'part-{i:05d}{extension}') for i in range(len(ranges))]
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(clean_range, [path] * len(ranges), *zip(*ranges), parts)) if ranges else []
+        if not results:
+            raise ValueError(f'{path} tidak berisi baris data')
+
+        # Nomor baris lokal -> nomor baris di file
+        reports, offset = [], 0
+        for rows, report in results:
+            reports.append(report.assign(baris=report['baris'] + offset))
+            offset += rows
+        report = pd.concat(reports, ignore_index=True)
+        _merge_parts(parts, output)
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+    report.to_csv(report_path(output), index=False)
+    return offset, report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Validasi dan bersihkan data trip mentah menjadi data_bersih')
+    parser.add_argument('input', help='CSV mentah (format data_bersih atau data_kembung_*.csv)')
+    parser.add_argument('--output', required=True, help='CSV atau .parquet')
+    parser.add_argument('--workers', type=int, default=None, help='jumlah proses (default: jumlah CPU)')
+    parser.add_argument('--chunk-mb', type=int, default=CHUNK_BYTES // 2**20)
+    args = parser.parse_args(argv)
+
+    if os.path.abspath(args.input) == os.path.abspath(args.output):
+        parser.error('input dan output harus file berbeda')
+    # data/data_bersih.csv adalah pointer Git LFS yang menentukan versi dataset
+    # (sistok_data.source_version); menimpanya mengubah kunci snapshot
+    import sistok_data
+
+    if os.path.abspath(args.output) == os.path.abspath(sistok_data.SOURCE_PATH):
+        parser.error(f'{args.output} adalah sumber dataset (pointer Git LFS); pilih file output lain')
+    rows, report = clean_file(args.input, args.output, args.workers, args.chunk_mb * 2**20)
+    print(f'{rows:,} baris ditulis ke {args.output}; {len(report):,} baris bermasalah (laporan: {report_path(args.output)})')
+    for name, count in summarize(report['masalah'].map(
+        lambda names: sum(ISSUES[n] for n in names.split(';') if n)
+    ).to_numpy(dtype='uint16')).items():
+        if count:
+            print(f'  {name}: {count:,}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+
+import sistok_query
+
+# Sel kelengkapan = pelabuhan x jenis ikan x bulan (tahun, bulan)
+PAIR_KEYS = ['pelabuhan_kedatangan_id', 'nama_ikan_id']
+MEASURES = ['trip', 'berat']
+# Sel dengan trip atau berat di bawah rasio ini terhadap baseline ditandai 'rendah'
+LOW_RATIO = 0.5
+STATUS_ORDER = ['kosong', 'rendah', 'lengkap']
+
+
+# Median tiap elemen terhadap elemen lain di grupnya (elemen itu sendiri tidak
+# ikut). Grup diurutkan sekali; untuk elemen di peringkat r dari k nilai, median
+# k - 1 nilai sisanya diambil dari posisi terurut dengan melompati r. NaN jika
+# grup hanya berisi elemen itu.
+def _leave_one_out_median(values, groups):
+    n = len(values)
+    order = np.lexsort((values, groups))
+    sorted_values = values[order]
+    sorted_groups = groups[order]
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    sizes = np.diff(np.r_[starts, n])
+    first = np.repeat(starts, sizes)
+    size = np.repeat(sizes, sizes)
+    rank = np.arange(n) - first
+
+    def pick(j):
+        return sorted_values[np.clip(first + j + (j >= rank), 0, n - 1)]
+
+    median = np.where(size > 1, (pick((size - 2) // 2) + pick((size - 1) // 2)) / 2, np.nan)
+    result = np.empty(n, dtype='float64')
+    result[order] = median
+    return result
+
+
+# Matriks kelengkapan dari kubus, sekali per versi data. Setiap pasangan
+# pelabuhan x jenis ikan mendapat deret bulanan lengkap mulai bulan pertama
+# ada laporan sampai bulan terakhir data (bulan tanpa laporan = 0), lalu
+# baseline tiap sel = median bulan yang sama di tahun-tahun lain pasangan itu
+# (menangkap musim: bulan yang memang tidak pernah ada tangkapan baseline-nya 0).
+# Sel tidak ikut baseline-nya sendiri, jadi bulan yang hilang tidak tertutupi
+# nol-nya sendiri; pasangan yang baru punya satu tahun baseline-nya NaN.
+def completeness_matrix(cube):
+    cells = (
+        cube.dropna(subset=PAIR_KEYS + ['tahun', 'bulan'])
+        .groupby(PAIR_KEYS + ['tahun', 'bulan'], observed=True)[MEASURES].sum()
+        .reset_index()
+    )
+    columns = PAIR_KEYS + ['tahun', 'bulan'] + MEASURES + [f'{m}_baseline' for m in MEASURES]
+    if cells.empty:
+        return pd.DataFrame(columns=columns)
+
+    # Periode = bulan sejak Januari tahun pertama; pair = kode pasangan pelabuhan x jenis ikan
+    first_year = int(cells['tahun'].min())
+    period = ((cells['tahun'].astype('int64') - first_year) * 12 + cells['bulan'].astype('int64') - 1).to_numpy()
+    pair = cells.groupby(PAIR_KEYS, observed=True, sort=False).ngroup().to_numpy()
+    n_pairs, n_periods = pair.max() + 1, period.max() + 1
+
+    # Grid: pasangan p punya periode start[p] .. n_periods - 1
+    start = np.full(n_pairs, n_periods, dtype='int64')
+    np.minimum.at(start, pair, period)
+    length = n_periods - start
+    offset = np.concatenate([[0], np.cumsum(length)[:-1]])
+    grid_pair = np.repeat(np.arange(n_pairs), length)
+    grid_period = np.arange(length.sum()) - np.repeat(offset, length) + np.repeat(start, length)
+
+    position = offset[pair] + period - start[pair]
+    matrix = {}
+    for measure in MEASURES:
+        values = np.zeros(len(grid_pair), dtype='float64')
+        values[position] = cells[measure].to_numpy(dtype='float64')
+        matrix[measure] = values
+
+    # Baseline: median per (pasangan, bulan dalam tahun) tanpa tahun sel itu
+    season = grid_pair * 12 + grid_period % 12
+    for measure in MEASURES:
+        matrix[f'{measure}_baseline'] = _leave_one_out_median(matrix[measure], season)
+
+    # Baris pertama tiap pasangan, untuk nama pelabuhan/jenis ikan (tetap kategori)
+    first_row = np.unique(pair, return_index=True)[1][grid_pair]
+    return pd.DataFrame({
+        'pelabuhan_kedatangan_id': cells['pelabuhan_kedatangan_id'].iloc[first_row].reset_index(drop=True),
+        'nama_ikan_id': cells['nama_ikan_id'].iloc[first_row].reset_index(drop=True),
+        'tahun': (first_year + grid_period // 12).astype('int16'),
+        'bulan': (grid_period % 12 + 1).astype('int8'),
+        'trip': matrix['trip'].astype('int32'),
+        'berat': matrix['berat'],
+        'trip_baseline': matrix['trip_baseline'].astype('float32'),
+        'berat_baseline': matrix['berat_baseline'],
+    })[columns]
+
+
+# Kelengkapan untuk filter sidebar, dijumlahkan per pelabuhan x bulan (atau
+# per kolom di by). Baseline juga dijumlahkan, jadi rasio untuk beberapa jenis
+# ikan sekaligus tetap sebanding. status: 'kosong' (tidak ada trip padahal
+# baseline > 0), 'rendah' (trip atau berat < LOW_RATIO x baseline), 'lengkap'.
+# Sel tanpa baseline (belum ada tahun lain) rasionya NaN dan tidak ditandai.
+def completeness_view(matrix, pelabuhan_kedatangan_id, nama_ikan_id, start_year, end_year, by=('pelabuhan_kedatangan_id',)):
+    keys = list(by) + ['tahun', 'bulan']
+    sliced = sistok_query.slice_cube(matrix, pelabuhan_kedatangan_id, nama_ikan_id, start_year, end_year)
+    view = sliced.groupby(keys, observed=True)[MEASURES + [f'{m}_baseline' for m in MEASURES]].sum(min_count=1).reset_index()
+    view = view[(view['trip'] > 0) | (view['trip_baseline'] > 0)].reset_index(drop=True)
+
+    for measure in MEASURES:
+        baseline = view[f'{measure}_baseline']
+        view[f'rasio_{measure}'] = (view[measure] / baseline).where(baseline > 0)
+    ratio = view[[f'rasio_{m}' for m in MEASURES]].min(axis=1)
+    view['status'] = pd.Categorical(
+        np.select([view['trip'] == 0, ratio < LOW_RATIO], STATUS_ORDER[:2], STATUS_ORDER[2]),
+        categories=STATUS_ORDER,
+    )
+    view['periode'] = view['tahun'].astype(str) + '-' + view['bulan'].astype(int).map('{:02d}'.format)
+    return view
+
+
+# Sel yang tidak lengkap, dari kekurangan trip terbesar
+def completeness_flags(view):
+    flags = view[view['status'] != 'lengkap']
+    shortfall = flags['trip_baseline'] - flags['trip']
+    return flags.assign(kekurangan_trip=shortfall).sort_values(['kekurangan_trip', 'periode'], ascending=[False, False])
+
+
+# Heatmap rasio trip terhadap baseline (pelabuhan x bulan); rasio dipotong di
+# 1,5 supaya skala warna fokus pada kekurangan
+def completeness_heatmap(view, title='KELENGKAPAN DATA (TRIP / BASELINE)'):
+    import plotly.graph_objects as go
+
+    pivot = view.pivot_table(index='pelabuhan_kedatangan_id', columns='periode', values='rasio_trip', observed=True)
+    fig = go.Figure(go.Heatmap(
+        z=pivot.clip(upper=1.5).to_numpy(),
+        x=pivot.columns.tolist(),
+        y=pivot.index.astype(str).tolist(),
+        zmin=0, zmax=1.5,
+        colorscale=[[0, '#b2182b'], [LOW_RATIO / 1.5, '#fddbc7'], [1 / 1.5, '#f7f7f7'], [1, '#2166ac']],
+        colorbar=dict(title='rasio'),
+        hovertemplate='%{y}<br>%{x}<br>rasio %{z:.2f}<extra></extra>',
+    ))
+    fig.update_layout(title=title, template='plotly_dark', height=max(300, 22 * len(pivot) + 120))
+    return fig
@@ -0,0 +1,562 @@
+import hashlib
+import io
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+import sistok_anomaly
+import sistok_clean
+
+logger = logging.getLogger(__name__)
+
+# Lokasi data (SOURCE_PATH dan CACHE_DIR dibaca saat fungsi dipanggil, jadi
+# bisa diarahkan ke folder lain, mis. oleh benchmarks/bench_data.py)
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+SOURCE_PATH = os.path.join(DATA_DIR, 'data_bersih.csv')
+CACHE_DIR = os.path.join(DATA_DIR, 'cache')
+
+# ID file Googel Drive
+file_id = '1eACQIHOn3oS96V8rHzN6VlMuKtNX5raz'
+
+# URL Google drive untuk diunduh
+drive_url = f'https://drive.google.com/uc?id={file_id}'
+
+LFS_HEADER = 'version https://git-lfs.github.com/spec/v1'
+
+# Skema dataset trip. Kolom kode/nama disimpan sebagai kategori; berat dan
+# jumlah_hari di-downcast ke integer terkecil jika semua nilainya bulat (selain
+# itu pakai tipe cadangan). Jumlah per grup atas kolom integer kecil tetap aman:
+# pandas dan DuckDB menjumlahkan dengan akumulator int64/HUGEINT.
+# nilai_produksi selalu float64 supaya nilai dan total IDR tidak kehilangan presisi.
+SCHEMA = {
+    'pelabuhan_kedatangan_id': 'category',
+    'pelabuhan_keberangkatan_id': 'category',
+    'nama_ikan_id': 'category',
+    'jenis_api': 'category',
+    'provinsi': 'category',
+    'kelas_pelabuhan': 'category',
+    'berat': ('integer', 'float32'),
+    'nilai_produksi': 'float64',
+    'jumlah_hari': ('integer', 'float32'),
+    'tahun': 'Int16',
+    'harga_per_kg': 'float32',
+    'kualitas': 'uint16',
+    'anomali': 'bool',
+}
+
+# Kunci periode (integer) per time frame. periode_hari = hari sejak 1970-01-01,
+# periode_minggu = minggu ISO (Senin) sejak 1970, periode_bulan = bulan sejak 1970-01
+PERIOD_KEYS = {
+    'Daily': 'periode_hari',
+    'Weekly': 'periode_minggu',
+    'Monthly': 'periode_bulan',
+    'Yearly': 'tahun',
+}
+
+# Naikkan jika skema/isi snapshot berubah supaya snapshot lama dibangun ulang
+SNAPSHOT_FORMAT = 8
+
+# Ukuran row group file Parquet partisi (sama dengan default DuckDB), supaya
+# satu partisi besar bisa di-scan paralel dan statistik per row group cukup rinci
+ROW_GROUP_SIZE = 122_880
+
+
+# Baca pointer Git LFS (oid sha256 dan ukuran file), None jika bukan pointer
+def read_lfs_pointer(path=None):
+    path = path or SOURCE_PATH
+    if not os.path.exists(path) or os.path.getsize(path) > 1024:
+        return None
+    with open(path, 'r', encoding='utf-8', errors='ignore') as file:
+        lines = file.read().splitlines()
+    if not lines or lines[0].strip() != LFS_HEADER:
+        return None
+    pointer = {}
+    for line in lines[1:]:
+        key, _, value = line.partition(' ')
+        if key == 'oid' and value.startswith('sha256:'):
+            pointer['sha256'] = value[len('sha256:'):].strip()
+        elif key == 'size':
+            pointer['size'] = int(value)
+    return pointer if 'sha256' in pointer else None
+
+
+# sha256 file (atau hanya limit byte pertama)
+def sha256_file(path, chunk_size=1 << 20, limit=None):
+    digest = hashlib.sha256()
+    remaining = limit
+    with open(path, 'rb') as file:
+        while remaining is None or remaining > 0:
+            chunk = file.read(chunk_size if remaining is None else min(chunk_size, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+    return digest.hexdigest()
+
+
+# Hash file CSV asli, di-cache per (path, mtime, ukuran) supaya tidak dihitung ulang
+_sha256_cache = {}
+
+
+# Versi data = sha256 file sumber. Diambil dari pointer LFS jika ada,
+# atau dihitung langsung jika file CSV asli sudah ada di ./data/
+def source_version(path=None):
+    path = path or SOURCE_PATH
+    pointer = read_lfs_pointer(path)
+    if pointer is not None:
+        return pointer['sha256']
+    if os.path.exists(path):
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        if key not in _sha256_cache:
+            _sha256_cache[key] = sha256_file(path)
+        return _sha256_cache[key]
+    return None
+
+
+def snapshot_path(version):
+    return os.path.join(CACHE_DIR, f'data_bersih-{version[:16]}-v{SNAPSHOT_FORMAT}.arrow')
+
+
+def meta_path(version):
+    return os.path.join(CACHE_DIR, f'data_bersih-{version[:16]}-v{SNAPSHOT_FORMAT}.json')
+
+
+# Baca CSV mentah, konversi tanggal dan turunkan kolom tahun
+def parse_csv(csv_path):
+    df = pd.read_csv(csv_path, low_memory=False)
+    # Konversi tanggal ke tipe datetime
+    df['tanggal_berangkat'] = pd.to_datetime(df['tanggal_berangkat'], errors='coerce')
+    df['tanggal_kedatangan'] = pd.to_datetime(df['tanggal_kedatangan'], errors='coerce')
+    df['tahun'] = df['tanggal_kedatangan'].dt.year
+    return df
+
+
+def downcast_numeric(series, fallback):
+    series = pd.to_numeric(series, errors='coerce')
+    if series.notna().all() and (series % 1 == 0).all():
+        return pd.to_numeric(series, downcast='integer')
+    return series.astype(fallback)
+
+
+# Terapkan SCHEMA ke DataFrame (kolom yang tidak ada di-skip)
+def apply_schema(df):
+    for column, dtype in SCHEMA.items():
+        if column not in df.columns:
+            continue
+        if isinstance(dtype, tuple):
+            df[column] = downcast_numeric(df[column], dtype[1])
+        elif dtype.startswith('float'):
+            df[column] = pd.to_numeric(df[column], errors='coerce').astype(dtype)
+        else:
+            df[column] = df[column].astype(dtype)
+    return df
+
+
+# Hitung kunci periode sekali saat ingest (pengganti to_period().astype(str) per rerun)
+def add_period_keys(df):
+    tanggal = df['tanggal_kedatangan']
+    hari = (tanggal - pd.Timestamp('1970-01-01')).dt.days
+    df['periode_hari'] = hari.astype('Int32')
+    # 1970-01-01 adalah hari Kamis, +3 supaya minggu dimulai hari Senin
+    df['periode_minggu'] = ((hari + 3) // 7).astype('Int16')
+    df['periode_bulan'] = ((tanggal.dt.year - 1970) * 12 + tanggal.dt.month - 1).astype('Int16')
+    return df
+
+
+# Label periode hanya untuk kunci yang unik (bukan per baris)
+def period_labels(keys, time_frame):
+    keys = np.asarray(keys, dtype='int64')
+    if time_frame == 'Daily':
+        return pd.to_datetime(keys, unit='D').strftime('%Y-%m-%d').tolist()
+    if time_frame == 'Weekly':
+        start = pd.to_datetime(keys * 7 - 3, unit='D')
+        end = start + pd.Timedelta(days=6)
+        return [f'{a}/{b}' for a, b in zip(start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d'))]
+    if time_frame == 'Monthly':
+        return [f'{1970 + key // 12}-{key % 12 + 1:02d}' for key in keys]
+    return [str(key) for key in keys]
+
+
+# Awal periode (tanggal) untuk sumbu x grafik; Yearly tetap angka tahun
+def period_start(keys, time_frame):
+    keys = np.asarray(keys, dtype='int64')
+    if time_frame == 'Daily':
+        return keys.astype('datetime64[D]')
+    if time_frame == 'Weekly':
+        return (keys * 7 - 3).astype('datetime64[D]')
+    if time_frame == 'Monthly':
+        return keys.astype('datetime64[M]').astype('datetime64[D]')
+    return keys
+
+
+# Kolom periode sebagai Categorical: kode integer per baris, label per periode unik
+def label_periods(keys, time_frame):
+    codes, uniques = pd.factorize(keys, sort=True)
+    return pd.Categorical.from_codes(codes, categories=period_labels(uniques, time_frame))
+
+
+def memory_footprint(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+# Gabungkan beberapa DataFrame berskema sama; kolom kategori digabung dengan
+# union_categoricals supaya tetap kategori (pd.concat menjadikannya object)
+def concat_frames(frames):
+    frames = [frame for frame in frames if len(frame)] or frames[:1]
+    columns = {}
+    for column in frames[0].columns:
+        parts = [frame[column] for frame in frames]
+        if all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            columns[column] = pd.api.types.union_categoricals(parts, ignore_order=True)
+        else:
+            columns[column] = pd.concat(parts, ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+# Download file CSV dari Google Drive dan cek sha256-nya
+def download_source(expected_sha256=None):
+    import gdown
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    csv_path = os.path.join(CACHE_DIR, 'data_bersih.csv')
+    gdown.download(drive_url, csv_path, quiet=False)
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(csv_path)
+    actual = sha256_file(csv_path)
+    if expected_sha256 is not None and actual != expected_sha256:
+        os.remove(csv_path)
+        raise ValueError(
+            f'Checksum data_bersih.csv tidak cocok: diharapkan {expected_sha256}, didapat {actual}'
+        )
+    return csv_path, actual
+
+
+def write_snapshot(df, version, meta=None):
+    import pyarrow as pa
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = snapshot_path(version)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # Tulis ke file sementara dulu supaya snapshot tidak pernah setengah jadi
+    tmp_path = path + '.tmp'
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+    with open(meta_path(version), 'w') as file:
+        json.dump({'sha256': version, 'rows': len(df), **(meta or {})}, file)
+
+    # Hapus snapshot versi lama
+    keep = {os.path.basename(path), os.path.basename(meta_path(version))}
+    for name in os.listdir(CACHE_DIR):
+        if name.startswith('data_bersih-') and name not in keep:
+            os.remove(os.path.join(CACHE_DIR, name))
+    return path
+
+
+# Partisi per tahun di data/cache/partisi: satu file Parquet per tahun
+# (tahun=2018.parquet, ..., tahun=NA.parquet) plus manifest.json berisi sumber
+# terakhir (sha256, ukuran), watermark tanggal_kedatangan dan ringkasan isi
+# tiap partisi. Snapshot gabungan (Arrow, memory map tanpa copy) dibangun dari
+# partisi untuk backend pandas; backend DuckDB (sistok_sql) membaca partisi
+# langsung.
+def partition_dir():
+    return os.path.join(CACHE_DIR, 'partisi')
+
+
+def partition_path(key):
+    return os.path.join(partition_dir(), f'tahun={key}.parquet')
+
+
+def manifest_path():
+    return os.path.join(partition_dir(), 'manifest.json')
+
+
+def read_manifest():
+    if not os.path.exists(manifest_path()):
+        return {}
+    with open(manifest_path()) as file:
+        manifest = json.load(file)
+    return manifest if manifest.get('format') == SNAPSHOT_FORMAT else {}
+
+
+def write_manifest(manifest):
+    tmp_path = manifest_path() + '.tmp'
+    with open(tmp_path, 'w') as file:
+        json.dump(manifest, file, indent=1)
+    os.replace(tmp_path, manifest_path())
+
+
+# Urutan partisi di snapshot: tahun naik, tahun kosong terakhir, supaya satu
+# rentang tahun jadi potongan baris berurutan
+def partition_keys(manifest):
+    keys = manifest.get('partitions', {})
+    return sorted((k for k in keys if k != 'NA'), key=int) + (['NA'] if 'NA' in keys else [])
+
+
+# Hash isi per partisi {key: hash} (urut seperti partition_keys)
+def partition_hashes(manifest):
+    return {key: manifest['partitions'][key]['hash'] for key in partition_keys(manifest)}
+
+
+# Hash per baris dari isi mentah. Angka dibandingkan sebagai float64 dan teks
+# sebagai string, supaya tipe hasil inferensi CSV (mis. int vs float pada
+# potongan file yang berbeda) tidak mengubah hash.
+def row_hashes(df):
+    columns = {}
+    for column in sorted(c for c in df.columns if c != 'tahun'):
+        series = df[column]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            columns[column] = series
+        elif pd.api.types.is_numeric_dtype(series):
+            columns[column] = series.astype('float64')
+        else:
+            columns[column] = series.astype(str)
+    return pd.util.hash_pandas_object(pd.DataFrame(columns), index=False).to_numpy()
+
+
+# Posisi baris per partisi: {key: array posisi}
+def partition_groups(df):
+    tahun = df['tahun'].to_numpy(dtype='float64', na_value=np.nan)
+    groups = {}
+    missing = np.isnan(tahun)
+    if missing.any():
+        groups['NA'] = np.flatnonzero(missing)
+    for year in np.unique(tahun[~missing]):
+        groups[str(int(year))] = np.flatnonzero(tahun == year)
+    return groups
+
+
+# Ringkasan isi partisi: jumlah baris + jumlah hash baris (mod 2^64). Tidak
+# bergantung urutan baris, dan ringkasan baris tambahan cukup dijumlahkan.
+def combine_digest(digest, rows, hashes):
+    total = np.uint64(int(digest['hash'], 16)) if digest else np.uint64(0)
+    with np.errstate(over='ignore'):
+        total = total + hashes.sum(dtype=np.uint64)
+    return {'rows': (digest['rows'] if digest else 0) + rows, 'hash': f'{int(total):016x}'}
+
+
+def write_partition(key, df):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path = partition_path(key)
+    tmp_path = path + '.tmp'
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), tmp_path, row_group_size=ROW_GROUP_SIZE)
+    os.replace(tmp_path, path)
+
+
+def read_partition(key):
+    import pyarrow.parquet as pq
+
+    return pq.read_table(partition_path(key)).to_pandas()
+
+
+# Baris satu partisi di snapshot (snapshot urut per tahun, jadi potongan berurutan)
+def partition_slice(df, key):
+    tahun = df['tahun'].to_numpy(dtype='float64', na_value=np.nan)
+    if key == 'NA':
+        return df.iloc[np.searchsorted(tahun, np.nan, side='left'):]
+    year = int(key)
+    return df.iloc[np.searchsorted(tahun, year, side='left'):np.searchsorted(tahun, year, side='right')]
+
+
+# Versi data untuk rentang tahun: gabungan hash partisi di rentang itu, jadi
+# hasil cache untuk rentang tahun yang tidak berubah tetap valid setelah
+# refresh. partitions: {key: hash} dari read_meta; None jika tidak ada partisi.
+def range_version(partitions, start_year=None, end_year=None):
+    if not partitions:
+        return None
+    keys = [
+        key for key in partitions
+        if key != 'NA' and (not start_year or int(key) >= start_year) and (not end_year or int(key) <= end_year)
+    ]
+    if not start_year and not end_year and 'NA' in partitions:
+        keys.append('NA')
+    content = '|'.join(f'{key}:{partitions[key]}' for key in keys)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+# Apakah file sumber sama dengan sumber terakhir ditambah baris baru di akhir
+# (isi lama = awalan file baru, berakhir di batas baris)
+def is_append(csv_path, source):
+    size = os.path.getsize(csv_path)
+    if not source or size <= source['size']:
+        return False
+    with open(csv_path, 'rb') as file:
+        file.seek(source['size'] - 1)
+        if file.read(1) != b'\n':
+            return False
+    return sha256_file(csv_path, limit=source['size']) == source['sha256']
+
+
+# Baca hanya bagian file setelah offset (baris baru), dengan header file
+def parse_tail(csv_path, offset):
+    with open(csv_path, 'rb') as file:
+        header = file.readline()
+        file.seek(offset)
+        tail = file.read()
+    return parse_csv(io.BytesIO(header + tail))
+
+
+def _watermark(df, current=None):
+    latest = df['tanggal_kedatangan'].max()
+    if pd.isna(latest):
+        return current
+    latest = latest.isoformat()
+    return max(latest, current) if current else latest
+
+
+# Perbarui partisi dari file sumber. Jika file lama hanya ditambah baris di
+# akhir, hanya baris baru yang di-parse dan hanya partisi tahun baris baru
+# yang ditulis ulang. Selain itu seluruh file di-parse, tapi hanya partisi
+# yang isinya berubah (ringkasan hash berbeda) yang ditulis ulang. Flag
+# anomali dihitung ulang untuk seluruh partisi yang ditulis (grupnya per bulan,
+# jadi tidak pernah melewati batas partisi tahun).
+# Return (manifest baru, daftar partisi yang berubah, statistik refresh).
+def refresh_partitions(csv_path, version):
+    os.makedirs(partition_dir(), exist_ok=True)
+    manifest = read_manifest()
+    source = manifest.get('source')
+    digests = dict(manifest.get('partitions', {}))
+    watermark = manifest.get('watermark')
+    memory_before = manifest.get('memory_before', 0)
+    changed = []
+
+    if is_append(csv_path, source) and all(os.path.exists(partition_path(k)) for k in digests):
+        new = parse_tail(csv_path, source['size'])
+        hashes = row_hashes(new)
+        new = add_period_keys(sistok_clean.clean_frame(new))
+        late = 0 if watermark is None else int((new['tanggal_kedatangan'] < pd.Timestamp(watermark)).sum())
+        memory_before += memory_footprint(new)
+        for key, positions in partition_groups(new).items():
+            rows = apply_schema(new.iloc[positions].reset_index(drop=True))
+            if key in digests:
+                # Flag anomali lama ikut dihitung ulang bersama baris baru
+                rows = concat_frames([read_partition(key).drop(columns=['anomali']), rows])
+            write_partition(key, sistok_anomaly.add_anomaly_flags(rows))
+            digests[key] = combine_digest(digests.get(key), len(positions), hashes[positions])
+            changed.append(key)
+        stats = {'mode': 'append', 'parsed_rows': len(new), 'late_rows': late, 'kualitas': sistok_clean.summarize(new['kualitas'])}
+    else:
+        new = parse_csv(csv_path)
+        hashes = row_hashes(new)
+        new = add_period_keys(sistok_clean.clean_frame(new))
+        memory_before = memory_footprint(new)
+        groups = partition_groups(new)
+        for key, positions in groups.items():
+            digest = combine_digest(None, len(positions), hashes[positions])
+            if digests.get(key) != digest or not os.path.exists(partition_path(key)):
+                rows = apply_schema(new.iloc[positions].reset_index(drop=True))
+                write_partition(key, sistok_anomaly.add_anomaly_flags(rows))
+                changed.append(key)
+            digests[key] = digest
+        for key in set(digests) - set(groups):
+            os.remove(partition_path(key))
+            digests.pop(key)
+            changed.append(key)
+        watermark = None
+        stats = {'mode': 'rebuild', 'parsed_rows': len(new), 'late_rows': 0, 'kualitas': sistok_clean.summarize(new['kualitas'])}
+
+    manifest = {
+        'format': SNAPSHOT_FORMAT,
+        'source': {'sha256': version, 'size': os.path.getsize(csv_path)},
+        'watermark': _watermark(new, watermark),
+        'memory_before': memory_before,
+        'changed_partitions': sorted(changed),
+        'refresh': stats,
+        'partitions': digests,
+    }
+    write_manifest(manifest)
+    return manifest, sorted(changed), stats
+
+
+# Metadata snapshot (jumlah baris, memory footprint sebelum/sesudah skema)
+def read_meta(version):
+    if version is None or not os.path.exists(meta_path(version)):
+        return {}
+    with open(meta_path(version)) as file:
+        return json.load(file)
+
+
+# Buka snapshot Arrow lewat memory map (tanpa parsing ulang, tanpa copy)
+def read_table(path):
+    import pyarrow as pa
+
+    with pa.memory_map(path, 'r') as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+# DataFrame di atas buffer memory map. Kolom kategori, angka dan tanggal tidak
+# di-copy (read-only, dipakai bersama oleh semua sesi), jadi jangan diubah
+# in-place; turunkan dulu (take/copy) sebelum menambah kolom.
+def read_snapshot(path):
+    return read_table(path).to_pandas(split_blocks=True)
+
+
+# Perbarui partisi ke versi sumber terbaru tanpa membangun snapshot gabungan
+# (cukup untuk backend DuckDB). Partisi tidak disentuh jika manifest sudah
+# versi ini. Return (versi, manifest).
+def refresh_dataset(version=None):
+    version = version or source_version()
+    manifest = read_manifest()
+    if version is not None and manifest.get('source', {}).get('sha256') == version:
+        return version, manifest
+
+    if version is not None and read_lfs_pointer() is None:
+        # File CSV asli sudah ada di ./data/, tidak perlu download
+        csv_path, downloaded = SOURCE_PATH, False
+    else:
+        csv_path, version = download_source(version)
+        downloaded = True
+        if manifest.get('source', {}).get('sha256') == version:
+            os.remove(csv_path)
+            return version, manifest
+
+    logger.info('Memperbarui partisi data_bersih (%s)', version[:16])
+    manifest, changed, stats = refresh_partitions(csv_path, version)
+    logger.info(
+        'Refresh %s: %d baris di-parse, partisi berubah: %s',
+        stats['mode'], stats['parsed_rows'], ', '.join(changed) or '-',
+    )
+    if downloaded:
+        os.remove(csv_path)
+    return version, manifest
+
+
+# Fungsi untuk memuat dataset: pakai snapshot lokal jika versinya sama dengan
+# sumber, kalau tidak perbarui partisi yang berubah saja (refresh_dataset)
+# dan simpan snapshot baru
+def load_dataset():
+    version = source_version()
+    if version is not None and os.path.exists(snapshot_path(version)):
+        return read_snapshot(snapshot_path(version))
+
+    version, manifest = refresh_dataset(version)
+    if os.path.exists(snapshot_path(version)):
+        return read_snapshot(snapshot_path(version))
+
+    # Snapshot gabungan (urut per tahun) dari semua partisi
+    df = concat_frames([read_partition(key) for key in partition_keys(manifest)])
+    memory_after = memory_footprint(df)
+    path = write_snapshot(df, version, {
+        'memory_bytes': {'before': manifest['memory_before'], 'after': memory_after},
+        'partitions': partition_hashes(manifest),
+        'changed_partitions': manifest['changed_partitions'],
+        'watermark': manifest['watermark'],
+        'refresh': manifest['refresh'],
+    })
+    return read_snapshot(path)
+
+
+# Refresh harian (mis. dari cron): perbarui partisi dan snapshot lalu tampilkan ringkasannya
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    df = load_dataset()
+    meta = read_meta(source_version())
+    print(f"{len(df):,} baris, watermark {meta.get('watermark')}, refresh {meta.get('refresh')}")
@@ -0,0 +1,180 @@
+import numpy as np
+import pandas as pd
+
+import sistok_completeness
+import sistok_query
+
+# Prakiraan berat tangkapan bulanan per pelabuhan x jenis ikan. Semua deret
+# di-fit sekaligus dalam satu batch numpy (deret = baris array, kombinasi
+# parameter = sumbu kedua), sekali per versi data, dari matriks kelengkapan
+# (sistok_completeness.completeness_matrix: deret bulanan lengkap per pasangan).
+
+HORIZON = 12
+SEASON = 12
+# Bulan terakhir yang disisihkan untuk memilih model per deret (backtest)
+HOLDOUT = 12
+# Grid parameter Holt-Winters aditif dengan trend teredam (phi)
+ALPHAS = [0.1, 0.3, 0.5]
+BETAS = [0.0, 0.05]
+GAMMAS = [0.05, 0.2]
+PHI = 0.9
+MODELS = ['rata_rata', 'musiman_naif', 'holt_winters']
+
+
+# Matriks kelengkapan -> array (pasangan x periode), periode = bulan sejak
+# Januari tahun pertama. Semua deret berakhir di periode terakhir data; sel
+# sebelum bulan pertama pasangan itu NaN. Return (kunci pasangan, Y, start, tahun pertama).
+def series_matrix(matrix, measure='berat'):
+    first_year = int(matrix['tahun'].min())
+    period = ((matrix['tahun'].astype('int64') - first_year) * 12 + matrix['bulan'].astype('int64') - 1).to_numpy()
+    pair = matrix.groupby(sistok_completeness.PAIR_KEYS, observed=True, sort=False).ngroup().to_numpy()
+    first_row = np.unique(pair, return_index=True)[1]
+    keys = matrix[sistok_completeness.PAIR_KEYS].iloc[first_row].reset_index(drop=True)
+
+    Y = np.full((len(first_row), period.max() + 1), np.nan)
+    Y[pair, period] = matrix[measure].to_numpy(dtype='float64')
+    start = np.full(len(first_row), Y.shape[1], dtype='int64')
+    np.minimum.at(start, pair, period)
+    return keys, Y, start, first_year
+
+
+# Holt-Winters aditif untuk semua deret (n) x kombinasi parameter (c) dalam
+# satu loop waktu. Musiman per bulan kalender, diinisialisasi dari 12 bulan
+# pertama tiap deret. Return state (level, trend, musiman) setelah observasi
+# ke-(T - HOLDOUT - 1) dan setelah observasi terakhir.
+def _holt_winters(Y, start, alpha, beta, gamma, phi=PHI):
+    n, T = Y.shape
+    c = len(alpha)
+    init = start[:, None] + np.arange(SEASON)
+    first = Y[np.arange(n)[:, None], np.minimum(init, T - 1)]
+    level = np.repeat(first.mean(axis=1)[:, None], c, axis=1)
+    trend = np.zeros((n, c))
+    seasonal = np.zeros((n, c, SEASON))
+    seasonal[np.arange(n)[:, None], :, init % SEASON] = (first - level[:, :1])[:, :, None]
+
+    states = {}
+    for t in range(T):
+        active = (t >= start + SEASON)[:, None] & ~np.isnan(Y[:, t])[:, None]
+        if active.any():
+            y = Y[:, t][:, None]
+            slot = t % SEASON
+            s = seasonal[:, :, slot]
+            new_level = alpha * (y - s) + (1 - alpha) * (level + phi * trend)
+            new_trend = beta * (new_level - level) + (1 - beta) * phi * trend
+            seasonal[:, :, slot] = np.where(active, gamma * (y - new_level) + (1 - gamma) * s, s)
+            level = np.where(active, new_level, level)
+            trend = np.where(active, new_trend, trend)
+        if t == T - HOLDOUT - 1:
+            states['backtest'] = (level.copy(), trend.copy(), seasonal.copy())
+    states['final'] = (level, trend, seasonal)
+    return states
+
+
+# Prakiraan h = 1..horizon dari state setelah observasi ke-last: (n, c, horizon)
+def _hw_forecast(state, last, horizon, phi=PHI):
+    level, trend, seasonal = state
+    steps = np.arange(1, horizon + 1)
+    damping = np.cumsum(phi ** steps)
+    slots = (last + steps) % SEASON
+    return level[:, :, None] + trend[:, :, None] * damping + seasonal[:, :, slots]
+
+
+# Rata-rata dan musiman naif dari 12 bulan sebelum periode end: (n, horizon)
+def _baselines(Y, end, horizon):
+    window = Y[:, max(end - SEASON, 0):end]
+    count = (~np.isnan(window)).sum(axis=1)
+    mean = np.where(count > 0, np.nansum(window, axis=1) / np.maximum(count, 1), np.nan)
+    steps = np.arange(horizon)
+    naive = window[:, steps % SEASON] if window.shape[1] == SEASON else np.full((len(Y), horizon), np.nan)
+    return np.repeat(mean[:, None], horizon, axis=1), naive
+
+
+# Fit semua deret sekaligus. Setiap deret memilih model (rata-rata 12 bulan
+# terakhir, musiman naif, atau Holt-Winters dengan parameter terbaik dari grid)
+# dengan MAE terkecil pada HOLDOUT bulan terakhir, lalu diprakirakan horizon
+# bulan ke depan dengan state dari seluruh data. Deret yang terlalu pendek
+# untuk suatu model tidak ikut memilih model itu.
+# Return {'forecast': pasangan x bulan prakiraan, 'models': model per pasangan}.
+def fit_forecasts(matrix, horizon=HORIZON, measure='berat'):
+    model_columns = sistok_completeness.PAIR_KEYS + ['model', 'alpha', 'beta', 'gamma', 'mae', 'panjang']
+    if matrix.empty:
+        return {
+            'forecast': pd.DataFrame(columns=sistok_completeness.PAIR_KEYS + ['tahun', 'bulan', measure]),
+            'models': pd.DataFrame(columns=model_columns),
+        }
+
+    keys, Y, start, first_year = series_matrix(matrix, measure)
+    n, T = Y.shape
+    length = T - start
+    grid = np.array([(a, b, g) for a in ALPHAS for b in BETAS for g in GAMMAS])
+    alpha, beta, gamma = grid[:, 0], grid[:, 1], grid[:, 2]
+
+    # Kandidat: [rata_rata, musiman_naif, holt_winters x grid]; kolom = kandidat
+    states = _holt_winters(Y, start, alpha, beta, gamma)
+    mean_bt, naive_bt = _baselines(Y, T - HOLDOUT, HOLDOUT)
+    mean_fc, naive_fc = _baselines(Y, T, horizon)
+    hw_bt = _hw_forecast(states['backtest'], T - HOLDOUT - 1, HOLDOUT) if T > HOLDOUT else np.full((n, len(grid), HOLDOUT), np.nan)
+    hw_fc = _hw_forecast(states['final'], T - 1, horizon)
+    backtest = np.concatenate([mean_bt[:, None], naive_bt[:, None], hw_bt], axis=1).clip(min=0)
+    forecast = np.concatenate([mean_fc[:, None], naive_fc[:, None], hw_fc], axis=1).clip(min=0)
+
+    actual = Y[:, T - HOLDOUT:] if T > HOLDOUT else np.full((n, HOLDOUT), np.nan)
+    with np.errstate(all='ignore'):
+        mae = np.abs(backtest - actual[:, None, :]).mean(axis=2)
+    eligible = np.column_stack(
+        [length >= HOLDOUT + 1, length >= SEASON + HOLDOUT] + [length >= 2 * SEASON + HOLDOUT] * len(grid)
+    )
+    score = np.where(eligible & ~np.isnan(mae), mae, np.inf)
+    # Deret yang belum bisa di-backtest memakai rata-rata bulan yang ada
+    best = np.where(np.isfinite(score).any(axis=1), score.argmin(axis=1), 0)
+    chosen = forecast[np.arange(n), best]
+
+    months = T + np.arange(horizon)
+    result = keys.iloc[np.repeat(np.arange(n), horizon)].reset_index(drop=True)
+    result['tahun'] = np.tile(first_year + months // 12, n).astype('int16')
+    result['bulan'] = np.tile(months % 12 + 1, n).astype('int8')
+    result[measure] = chosen.reshape(-1)
+
+    model_index = np.minimum(best, 2)
+    parameters = np.where((best >= 2)[:, None], grid[np.maximum(best - 2, 0)], np.nan)
+    models = keys.assign(
+        model=pd.Categorical(np.asarray(MODELS)[model_index], categories=MODELS),
+        alpha=parameters[:, 0], beta=parameters[:, 1], gamma=parameters[:, 2],
+        mae=np.where(np.isfinite(score[np.arange(n), best]), score[np.arange(n), best], np.nan),
+        panjang=length.astype('int32'),
+    )
+    return {'forecast': result, 'models': models[model_columns]}
+
+
+# Riwayat bulanan dan prakiraan untuk filter sidebar, dijumlahkan atas semua
+# pasangan terpilih. Riwayat dimulai dari start_year sampai data terakhir
+# supaya prakiraan menyambung; band = prakiraan +- jumlah MAE backtest pasangan.
+def forecast_view(matrix, forecasts, pelabuhan_kedatangan_id, nama_ikan_id, start_year, measure='berat'):
+    def monthly(df):
+        series = df.groupby(['tahun', 'bulan'], observed=True)[measure].sum().reset_index()
+        series['periode'] = pd.to_datetime(dict(year=series['tahun'], month=series['bulan'], day=1))
+        return series[['periode', measure]]
+
+    history = monthly(sistok_query.slice_cube(matrix, pelabuhan_kedatangan_id, nama_ikan_id, start_year, None))
+    forecast = monthly(sistok_query.slice_cube(forecasts['forecast'], pelabuhan_kedatangan_id, nama_ikan_id, None, None))
+    models = sistok_query.slice_cube(forecasts['models'], pelabuhan_kedatangan_id, nama_ikan_id, None, None)
+    error = float(models['mae'].sum())
+    forecast['bawah'] = (forecast[measure] - error).clip(lower=0)
+    forecast['atas'] = forecast[measure] + error
+    return {'history': history, 'forecast': forecast, 'models': models}
+
+
+def forecast_figure(view, measure='berat', title='PRAKIRAAN TANGKAPAN BULANAN'):
+    import plotly.graph_objects as go
+
+    history, forecast = view['history'], view['forecast']
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=pd.concat([forecast['periode'], forecast['periode'][::-1]]),
+        y=pd.concat([forecast['atas'], forecast['bawah'][::-1]]),
+        fill='toself', fillcolor='rgba(255,165,0,0.2)', line=dict(width=0), hoverinfo='skip', name='rentang galat backtest',
+    ))
+    fig.add_trace(go.Scatter(x=history['periode'], y=history[measure], mode='lines', name='data', line=dict(color='#0083b8')))
+    fig.add_trace(go.Scatter(x=forecast['periode'], y=forecast[measure], mode='lines', name='prakiraan', line=dict(color='orange', dash='dash')))
+    fig.update_layout(title=title, template='plotly_dark', xaxis_title='periode', yaxis_title=measure, plot_bgcolor='rgba(0,0,0,0)')
+    return fig
@@ -0,0 +1,121 @@
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger('sistok.metrics')
+
+# Batas bucket histogram durasi tahap (detik)
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _process():
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process()
+
+
+_PROCESS = _process()
+
+
+# RSS proses (byte); None jika psutil tidak terpasang
+def rss_bytes():
+    return _PROCESS.memory_info().rss if _PROCESS is not None else None
+
+
+# Pencatat waktu satu rerun. lap(nama) menutup tahap yang berjalan sejak lap
+# sebelumnya, jadi cukup satu panggilan setelah tiap tahap di script tanpa
+# mengubah indentasi. Biaya per lap: perf_counter + satu baca RSS (mikrodetik).
+class RerunTrace:
+    def __init__(self, page):
+        self.page = page
+        self.started = time.time()
+        self.spans = []
+        self._last = time.perf_counter()
+        self._rss = rss_bytes()
+
+    def lap(self, stage, rows=None):
+        now = time.perf_counter()
+        rss = rss_bytes()
+        self.spans.append({
+            'stage': stage,
+            'ms': (now - self._last) * 1000,
+            'rows': None if rows is None else int(rows),
+            'rss_mb': None if rss is None else rss / 2**20,
+            'rss_delta_mb': None if rss is None or self._rss is None else (rss - self._rss) / 2**20,
+        })
+        self._rss = rss
+        # Waktu pencatatan sendiri tidak dihitung ke tahap berikutnya
+        self._last = time.perf_counter()
+
+    def total_ms(self):
+        return sum(span['ms'] for span in self.spans)
+
+    def to_dict(self):
+        return {
+            'page': self.page,
+            'started': self.started,
+            'total_ms': self.total_ms(),
+            'spans': self.spans,
+        }
+
+
+# Metrik Prometheus bersama semua sesi: histogram durasi per tahap, jumlah
+# baris dan RSS terakhir. Bisa di-scrape lewat HTTP (port) dan/atau ditulis
+# ke file teks untuk node_exporter textfile collector.
+class MetricsExporter:
+    def __init__(self, textfile=None, port=None, log_path=None, min_interval=10):
+        from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram
+
+        self.registry = CollectorRegistry()
+        self.reruns = Counter('sistok_reruns', 'Jumlah rerun per halaman', ['page'], registry=self.registry)
+        self.duration = Histogram(
+            'sistok_stage_duration_seconds', 'Durasi tahap per rerun', ['page', 'stage'],
+            buckets=DURATION_BUCKETS, registry=self.registry,
+        )
+        self.rows = Gauge('sistok_stage_rows', 'Jumlah baris tahap pada rerun terakhir', ['page', 'stage'], registry=self.registry)
+        self.rss = Gauge('sistok_process_rss_bytes', 'RSS proses setelah rerun terakhir', registry=self.registry)
+        self.textfile = textfile
+        self.min_interval = min_interval
+        self._written = 0
+        self._lock = threading.Lock()
+
+        if port:
+            from prometheus_client import start_http_server
+
+            start_http_server(int(port), registry=self.registry)
+        if log_path:
+            os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+            handler = logging.FileHandler(log_path)
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+
+    def record(self, trace):
+        self.reruns.labels(trace.page).inc()
+        for span in trace.spans:
+            self.duration.labels(trace.page, span['stage']).observe(span['ms'] / 1000)
+            if span['rows'] is not None:
+                self.rows.labels(trace.page, span['stage']).set(span['rows'])
+        rss = rss_bytes()
+        if rss is not None:
+            self.rss.set(rss)
+
+        # Log JSON satu baris per rerun
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(trace.to_dict()))
+
+        # File teks ditulis paling sering sekali per min_interval detik
+        if self.textfile and time.monotonic() - self._written >= self.min_interval:
+            with self._lock:
+                self._written = time.monotonic()
+                self.write_textfile(self.textfile)
+
+    def write_textfile(self, path):
+        from prometheus_client import write_to_textfile
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        write_to_textfile(path, self.registry)
@@ -0,0 +1,393 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import sistok_data
+
+# Dimensi dan ukuran pada kubus agregat tangkapan. anomali (flag trip dari
+# sistok_anomaly) ikut jadi dimensi supaya Dashboard bisa mengecualikan trip
+# anomali cukup dengan memotong kubus, tanpa menghitung ulang.
+CUBE_KEYS = ['tahun', 'bulan', 'pelabuhan_kedatangan_id', 'nama_ikan_id', 'jenis_api', 'anomali']
+CUBE_MEASURES = ['berat', 'nilai_produksi', 'jumlah_hari', 'trip']
+
+
+# Bangun kubus agregat (tahun x bulan x pelabuhan x jenis ikan x alat tangkap).
+# Cukup sekali per versi data; semua angka Dashboard diambil dari kubus ini.
+def build_cube(df):
+    if df.empty:
+        return pd.DataFrame(columns=CUBE_KEYS + CUBE_MEASURES)
+
+    frame = pd.DataFrame({
+        'tahun': df['tahun'],
+        'bulan': df['tanggal_kedatangan'].dt.month.astype('Int8'),
+        'pelabuhan_kedatangan_id': df['pelabuhan_kedatangan_id'],
+        'nama_ikan_id': df['nama_ikan_id'],
+        'jenis_api': df['jenis_api'],
+        'anomali': df['anomali'] if 'anomali' in df.columns else False,
+        'berat': df['berat'].astype('float64'),
+        'nilai_produksi': df['nilai_produksi'].astype('float64'),
+        'jumlah_hari': df['jumlah_hari'],
+    })
+    cube = frame.groupby(CUBE_KEYS, observed=True, dropna=False).agg(
+        berat=('berat', 'sum'),
+        nilai_produksi=('nilai_produksi', 'sum'),
+        jumlah_hari=('jumlah_hari', 'sum'),
+        trip=('berat', 'size'),
+    )
+    return cube.reset_index()
+
+
+# Ambil potongan kubus (atau tabel lain dengan kolom yang sama, mis. gear_cpue)
+# sesuai filter sidebar (sama seperti filter_data)
+def slice_cube(cube, pelabuhan_kedatangan_id, nama_ikan_id, start_year, end_year):
+    mask = pd.Series(True, index=cube.index)
+    if pelabuhan_kedatangan_id:
+        mask &= cube['pelabuhan_kedatangan_id'] == pelabuhan_kedatangan_id
+    if nama_ikan_id:
+        mask &= cube['nama_ikan_id'].isin(nama_ikan_id)
+    if start_year:
+        mask &= cube['tahun'] >= start_year
+    if end_year:
+        mask &= cube['tahun'] <= end_year
+    return cube[mask.fillna(False)]
+
+
+# Angka ringkasan untuk metric box
+def cube_totals(cube_slice):
+    if cube_slice.empty:
+        return {'berat': 0, 'nilai_produksi': 0, 'jumlah_hari': 0, 'jenis_ikan': 0, 'trip': 0}
+    return {
+        'berat': float(cube_slice['berat'].sum()),
+        'nilai_produksi': float(cube_slice['nilai_produksi'].sum()),
+        'jumlah_hari': cube_slice['jumlah_hari'].sum(),
+        'jenis_ikan': cube_slice['nama_ikan_id'].nunique(),
+        'trip': int(cube_slice['trip'].sum()),
+    }
+
+
+# Jumlahkan ukuran per satu dimensi, urut dari berat terbesar
+def cube_group(cube_slice, column, measure='berat', n=None):
+    grouped = (
+        cube_slice.groupby(column, observed=True)
+        .agg({measure: 'sum'})
+        .reset_index()
+    )
+    if column == 'tahun':
+        return grouped.sort_values(by='tahun')
+    grouped = grouped.sort_values(by=measure, ascending=False)
+    return grouped.head(n) if n else grouped
+
+
+# Semua angka dan tabel grafik Dashboard untuk satu potongan kubus
+def dashboard_summary(cube_slice):
+    return {
+        'totals': cube_totals(cube_slice),
+        'tahun_min': cube_slice['tahun'].min() if not cube_slice.empty else None,
+        'tahun_max': cube_slice['tahun'].max() if not cube_slice.empty else None,
+        'tangkapan_tahunan': cube_group(cube_slice, 'tahun'),
+        'tangkapan_dominan': cube_group(cube_slice, 'nama_ikan_id', n=10),
+        'alat_tangkap_dominan': cube_group(cube_slice, 'jenis_api', n=10),
+    }
+
+
+# Satu stok = pelabuhan x jenis ikan x tahun
+STOCK_KEYS = ['pelabuhan_kedatangan_id', 'nama_ikan_id', 'tahun']
+
+
+# CPUE dan FPI semua alat tangkap di setiap stok, dalam satu groupby di kubus.
+# FPI = CPUE alat / CPUE tertinggi di stok yang sama; effort standar = effort x
+# FPI. Tangkapan dalam ton. Dihitung sekali per versi data, lalu dipotong per
+# filter dengan slice_cube (FPI tidak dihitung ulang per filter).
+def gear_cpue(cube):
+    table = (
+        cube.groupby(STOCK_KEYS + ['jenis_api'], observed=True)[['berat', 'jumlah_hari']].sum()
+        .reset_index()
+        .rename(columns={'berat': 'catch', 'jumlah_hari': 'effort'})
+    )
+    table['catch'] = table['catch'] / 1000
+    table['effort'] = table['effort'].astype('float64')
+    table['CPUE'] = (table['catch'] / table['effort']).where(table['effort'] > 0)
+    table['FPI'] = table['CPUE'] / table.groupby(STOCK_KEYS, observed=True)['CPUE'].transform('max')
+    table['effort_std'] = table['effort'] * table['FPI']
+    return table
+
+
+# Dimensi yang bisa dibandingkan di mode perbandingan Dashboard
+COMPARE_KEYS = ['pelabuhan_kedatangan_id', 'jenis_api']
+
+
+# Perbandingan beberapa pelabuhan dan/atau alat tangkap. selections: {kolom:
+# daftar nilai} untuk kolom di COMPARE_KEYS; setiap kombinasi nilai = satu grup.
+# Kubus cukup di-groupby sekali per (grup, tahun, jenis ikan); KPI, tren
+# tahunan, jenis ikan teratas dan CPUE (kg per hari trip) diturunkan dari
+# tabel kecil itu, jadi biayanya tumbuh dengan jumlah grup, bukan jumlah pass.
+def compare_groups(cube, selections, nama_ikan_id, start_year, end_year, n=5):
+    keys = [key for key in COMPARE_KEYS if selections.get(key)]
+    mask = pd.Series(True, index=cube.index)
+    for key in keys:
+        mask &= cube[key].isin(selections[key])
+    sliced = slice_cube(cube[mask.fillna(False)], None, nama_ikan_id, start_year, end_year)
+    base = (
+        sliced.groupby(keys + ['tahun', 'nama_ikan_id'], observed=True)[CUBE_MEASURES].sum()
+        .reset_index()
+    )
+    # Label grup urut sesuai pilihan (pelabuhan / alat tangkap)
+    labels = pd.MultiIndex.from_product([selections[key] for key in keys]).map(lambda values: ' / '.join(map(str, values)))
+    grup = base[keys].astype(str).agg(' / '.join, axis=1) if len(base) else pd.Series([], dtype='object')
+    base.insert(0, 'grup', pd.Categorical(grup, categories=labels))
+    base['jumlah_hari'] = base['jumlah_hari'].astype('float64')
+
+    def with_cpue(table):
+        table['CPUE'] = (table['berat'] / table['jumlah_hari']).where(table['jumlah_hari'] > 0)
+        return table
+
+    totals = with_cpue(base.groupby('grup', observed=True).agg(
+        berat=('berat', 'sum'),
+        nilai_produksi=('nilai_produksi', 'sum'),
+        jumlah_hari=('jumlah_hari', 'sum'),
+        trip=('trip', 'sum'),
+        jenis_ikan=('nama_ikan_id', 'nunique'),
+    ).reset_index())
+    yearly = with_cpue(base.groupby(['grup', 'tahun'], observed=True)[['berat', 'jumlah_hari']].sum().reset_index())
+    species = (
+        base.groupby(['grup', 'nama_ikan_id'], observed=True)['berat'].sum().reset_index()
+        .sort_values(['grup', 'berat'], ascending=[True, False])
+        .groupby('grup', observed=True).head(n)
+    )
+    return {'totals': totals, 'yearly': yearly, 'top_species': species}
+
+
+# Pilihan filter sidebar (pelabuhan, jenis ikan, alat tangkap, rentang tahun) dari kubus
+def filter_options(cube):
+    return {
+        'pelabuhan_kedatangan_id': cube['pelabuhan_kedatangan_id'].dropna().unique().tolist(),
+        'nama_ikan_id': cube['nama_ikan_id'].dropna().unique().tolist(),
+        'jenis_api': cube['jenis_api'].dropna().unique().tolist(),
+        'tahun_min': int(cube['tahun'].min()),
+        'tahun_max': int(cube['tahun'].max()),
+    }
+
+
+# Kunci cache yang dinormalisasi: urutan jenis ikan tidak berpengaruh
+def filter_key(data_version, pelabuhan_kedatangan_id, nama_ikan_id, start_year, end_year, time_frame):
+    return (
+        data_version,
+        pelabuhan_kedatangan_id or None,
+        tuple(sorted(nama_ikan_id or ())),
+        int(start_year) if start_year else None,
+        int(end_year) if end_year else None,
+        time_frame,
+    )
+
+
+def _size_of(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_size_of(item) for item in value.values())
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    if hasattr(value, 'to_plotly_json'):
+        # Figure Plotly: array x/y tiap trace + perkiraan layout
+        return 4096 + sum(np.asarray(v).nbytes for trace in value.data for v in (trace.x, trace.y) if v is not None)
+    return 64
+
+
+# Cache LRU hasil agregasi per filter, dibatasi jumlah entri dan ukuran (byte),
+# opsional dengan TTL (detik). Thread-safe supaya bisa dipakai bersama semua sesi Streamlit.
+class ResultCache:
+    def __init__(self, max_entries=256, max_bytes=64 * 2**20, ttl=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] is not None and entry[2] < time.monotonic():
+                self._entries.pop(key)
+                self._bytes -= entry[1]
+                self.evictions += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        size = _size_of(value)
+        if size > self.max_bytes:
+            return
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size, expires)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    # Ambil dari cache, atau hitung lalu simpan. Hasil dipakai bersama antar
+    # sesi, jadi jangan diubah oleh pemanggil.
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+# Kelompokkan posisi baris per nilai kategori: {nilai: array posisi (urut naik)}
+def _row_positions(column):
+    codes, uniques = pd.factorize(column, sort=False)
+    order = np.argsort(codes, kind='stable')
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    start = int((codes < 0).sum())
+    positions = {}
+    for value, count in zip(uniques, counts):
+        positions[value] = order[start:start + count]
+        start += count
+    return positions
+
+
+# Index untuk filter_data: data diurutkan per tahun (rentang tahun jadi satu
+# potongan berurutan) plus posisi baris per pelabuhan dan per jenis ikan
+def build_filter_index(df):
+    tahun = df['tahun'].to_numpy(dtype='float64', na_value=np.nan)
+    order = np.argsort(tahun, kind='stable')
+    if np.array_equal(order, np.arange(len(order))):
+        # Snapshot sudah urut per tahun: pakai data bersama tanpa copy
+        data = df
+    else:
+        data = df.take(order).reset_index(drop=True)
+    return {
+        'data': data,
+        'tahun': tahun[order],
+        'pelabuhan_kedatangan_id': _row_positions(data['pelabuhan_kedatangan_id']),
+        'nama_ikan_id': _row_positions(data['nama_ikan_id']),
+    }
+
+
+# Ubah filter sidebar jadi posisi baris (urut naik) dengan irisan index
+def select_rows(index, pelabuhan_kedatangan_id, nama_ikan_id, start_year, end_year):
+    tahun = index['tahun']
+    lo = np.searchsorted(tahun, start_year, side='left') if start_year else 0
+    hi = np.searchsorted(tahun, end_year, side='right') if end_year else len(tahun)
+
+    rows = None
+    if pelabuhan_kedatangan_id:
+        rows = index['pelabuhan_kedatangan_id'].get(pelabuhan_kedatangan_id, np.empty(0, dtype=np.intp))
+    if nama_ikan_id:
+        species = index['nama_ikan_id']
+        parts = [species[name] for name in nama_ikan_id if name in species]
+        species_rows = np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.intp)
+        rows = species_rows if rows is None else np.intersect1d(rows, species_rows, assume_unique=True)
+
+    if rows is None:
+        return np.arange(lo, hi)
+    return rows[np.searchsorted(rows, lo):np.searchsorted(rows, hi)]
+
+
+def count_rows(index, rows):
+    return len(rows)
+
+
+# Posisi baris yang flag anomalinya sama dengan anomali (True = hanya trip
+# anomali, False = tanpa trip anomali)
+def anomaly_rows(index, rows, anomali):
+    data = index['data']
+    if 'anomali' not in data.columns:
+        return rows if not anomali else rows[:0]
+    return rows[data['anomali'].to_numpy(dtype=bool)[rows] == anomali]
+
+
+# Fungsi filter data: baris hasil filter sebagai DataFrame (satu kali copy)
+def filter_data(index, pelabuhan_kedatangan_id, nama_ikan_id, start_year, end_year, time_frame):
+
+    # Filter pelabuhan, nama ikan dan tahun lewat index, lalu copy sekali
+    rows = select_rows(index, pelabuhan_kedatangan_id, nama_ikan_id, start_year, end_year)
+    df = index['data'].take(rows)
+
+    # Filter berdasarkan time frame (kunci periode integer dari load_data)
+    if time_frame in sistok_data.PERIOD_KEYS:
+        df['time_period'] = sistok_data.label_periods(df[sistok_data.PERIOD_KEYS[time_frame]], time_frame)
+
+    return df
+
+
+# Kolom yang bisa ditampilkan di VIEW DATASET (kunci periode internal disembunyikan)
+def view_columns(index):
+    hidden = set(sistok_data.PERIOD_KEYS.values()) - {'tahun'}
+    return [c for c in index['data'].columns if c not in hidden] + ['time_period']
+
+
+# Cari teks (tanpa beda huruf besar/kecil) di kolom teks/kategori; untuk kolom
+# kategori yang dicocokkan cukup daftar kategorinya, lalu dipetakan ke kode baris
+def search_rows(index, rows, columns, text):
+    data = index['data']
+    text = text.strip().lower()
+    mask = np.zeros(len(rows), dtype=bool)
+    for column in columns:
+        if column not in data.columns:
+            continue
+        series = data[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            labels = series.cat.categories.astype(str).str.lower()
+            matched = np.flatnonzero(labels.str.contains(text, regex=False))
+            if len(matched):
+                mask |= np.isin(series.cat.codes.to_numpy()[rows], matched)
+        elif series.dtype == object:
+            mask |= series.iloc[rows].astype(str).str.lower().str.contains(text, regex=False).to_numpy()
+    return rows[mask]
+
+
+# Urutkan posisi baris berdasarkan satu kolom (time_period diurutkan lewat kunci periodenya)
+def sort_rows(index, rows, column, time_frame, ascending=True):
+    if column == 'time_period':
+        column = sistok_data.PERIOD_KEYS.get(time_frame, 'tahun')
+    values = index['data'][column].iloc[rows]
+    values = values.sort_values(ascending=ascending, kind='stable', na_position='last')
+    return values.index.to_numpy()
+
+
+# Satu halaman data: hanya baris dan kolom yang ditampilkan yang di-copy
+def page_data(index, rows, columns, time_frame, page, page_size):
+    page_rows = rows[(page - 1) * page_size:page * page_size]
+    data = index['data']
+    df = data.take(page_rows)[[c for c in columns if c in data.columns]]
+    if 'time_period' in columns and time_frame in sistok_data.PERIOD_KEYS:
+        keys = data[sistok_data.PERIOD_KEYS[time_frame]].take(page_rows)
+        df['time_period'] = sistok_data.label_periods(keys, time_frame)
+    return df[[c for c in columns if c in df.columns]]
@@ -0,0 +1,273 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+# Tabel tab Analysis yang bisa diekspor (nama di sistok_analysis.analysis_tables -> judul)
+REPORT_TABLES = {
+    'produksi_tahunan': 'Produksi dan Nilai Produksi per Tahun',
+    'tangkapan_per_alat': 'Hasil Tangkapan per Alat Tangkap',
+    'trip_per_alat': 'Jumlah Trip per Alat Tangkap',
+    'cpue': 'CPUE dan FPI per Alat Tangkap',
+}
+FORMATS = ['xlsx', 'pdf']
+MIME_TYPES = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'pdf': 'application/pdf',
+}
+
+# Grafik per tabel (kolom x, kolom y, jenis), sama dengan grafik di tab Analysis
+CHARTS = {
+    'produksi_tahunan': ('tahun', 'Produksi (Ton)', 'line'),
+    'tangkapan_per_alat': ('jenis_api', 'Total', 'bar'),
+    'trip_per_alat': ('jenis_api', 'Total', 'bar'),
+    'cpue': ('Alat Tangkap', 'CPUE', 'bar'),
+}
+
+# Baris tabel per halaman PDF
+PDF_ROWS = 30
+# Jumlah laporan (per format) yang disimpan di folder output
+MAX_REPORTS = 20
+
+
+# Opsi ekspor yang dinormalisasi (urutan pilihan tidak berpengaruh pada kunci)
+def report_options(tables=None, formats=None, charts=True):
+    return {
+        'tables': sorted(tables if tables is not None else REPORT_TABLES, key=list(REPORT_TABLES).index),
+        'formats': sorted(formats if formats is not None else FORMATS, key=FORMATS.index),
+        'charts': bool(charts),
+    }
+
+
+# Kunci laporan dari hash isi file upload dan opsi ekspor
+def report_key(content_hash, options):
+    content = json.dumps({'upload': content_hash, **options}, sort_keys=True)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()[:16]
+
+
+# Data grafik satu tabel; baris Jumlah pada pivot alat tangkap tidak ikut
+def chart_data(name, table):
+    x, y, kind = CHARTS[name]
+    if 'jenis_api' in table.columns:
+        table = table[table['jenis_api'] != 'Jumlah']
+    return table[x].astype(str).tolist(), table[y].astype('float64').tolist(), kind
+
+
+def _sheet_name(name):
+    return name[:31]
+
+
+# Workbook XLSX: satu sheet per tabel, grafik sebagai chart Excel asli di
+# samping tabel (tetap bisa diedit di Excel)
+def write_xlsx(tables, path, charts=True, progress=None):
+    with pd.ExcelWriter(path, engine='xlsxwriter') as writer:
+        title_format = writer.book.add_format({'bold': True, 'font_size': 13})
+        for name, table in tables.items():
+            sheet_name = _sheet_name(name)
+            table.to_excel(writer, sheet_name=sheet_name, index=False, startrow=2)
+            sheet = writer.sheets[sheet_name]
+            sheet.write(0, 0, REPORT_TABLES.get(name, name), title_format)
+            sheet.set_column(0, len(table.columns) - 1, 16)
+
+            if charts and name in CHARTS:
+                x, y, kind = CHARTS[name]
+                # Baris data mulai di baris ke-4 (judul, kosong, header); baris Jumlah tidak ikut
+                last_row = 2 + len(table) - (1 if 'jenis_api' in table.columns else 0)
+                x_col, y_col = table.columns.get_loc(x), table.columns.get_loc(y)
+                chart = writer.book.add_chart({'type': 'line' if kind == 'line' else 'bar'})
+                chart.add_series({
+                    'name': str(y),
+                    'categories': [sheet_name, 3, x_col, last_row, x_col],
+                    'values': [sheet_name, 3, y_col, last_row, y_col],
+                    'marker': {'type': 'circle'} if kind == 'line' else None,
+                })
+                chart.set_title({'name': REPORT_TABLES.get(name, name)})
+                chart.set_legend({'none': True})
+                # Chart 'bar' Excel horizontal: sumbu kategori = sumbu y
+                chart.set_x_axis({'name': x if kind == 'line' else str(y)})
+                chart.set_y_axis({'name': str(y) if kind == 'line' else x})
+                sheet.insert_chart(2, len(table.columns) + 1, chart, {'x_scale': 1.4, 'y_scale': 1.2})
+            if progress:
+                progress(f'XLSX: {REPORT_TABLES.get(name, name)}')
+
+
+def _format_cell(value):
+    if isinstance(value, float):
+        if pd.isna(value):
+            return ''
+        if value == 0 or (value == int(value) and abs(value) >= 1):
+            return f'{value:,.0f}'
+        return f'{value:,.4f}' if abs(value) < 1 else f'{value:,.2f}'
+    return str(value)
+
+
+# Halaman tabel PDF (A4 landscape), dipecah per PDF_ROWS baris
+def _table_pages(title, table):
+    from matplotlib.figure import Figure
+
+    columns = [str(c) for c in table.columns]
+    cells = [[_format_cell(v) for v in row] for row in table.itertuples(index=False)]
+    pages = [cells[i:i + PDF_ROWS] for i in range(0, len(cells), PDF_ROWS)] or [[]]
+    for number, rows in enumerate(pages, start=1):
+        fig = Figure(figsize=(11.69, 8.27))
+        ax = fig.add_subplot()
+        ax.axis('off')
+        suffix = f' ({number}/{len(pages)})' if len(pages) > 1 else ''
+        ax.set_title(title + suffix, fontsize=13, fontweight='bold', loc='left')
+        if rows:
+            # Kolom pertama (nama alat tangkap/tahun) lebih lebar dari kolom angka
+            first = 0.36 if len(columns) > 2 else 1 / len(columns)
+            widths = [first] + [(1 - first) / max(len(columns) - 1, 1)] * (len(columns) - 1)
+            grid = ax.table(cellText=rows, colLabels=columns, colWidths=widths, loc='upper center', cellLoc='right', colLoc='center')
+            grid.auto_set_font_size(False)
+            grid.set_fontsize(8 if len(columns) > 8 else 9)
+            grid.scale(1, 1.3)
+            for (row, col), cell in grid.get_celld().items():
+                if col == 0 and row > 0:
+                    cell.set_text_props(ha='left')
+        yield fig
+
+
+def _chart_page(name, table):
+    from matplotlib.figure import Figure
+
+    labels, values, kind = chart_data(name, table)
+    fig = Figure(figsize=(11.69, 8.27))
+    ax = fig.add_subplot()
+    x, y, _ = CHARTS[name]
+    if kind == 'line':
+        ax.plot(labels, values, marker='o', color='#0083b8')
+        ax.set_xlabel(x)
+        ax.set_ylabel(str(y))
+        ax.grid(axis='y', color='#cecdcd')
+    else:
+        # Batang horizontal, terbesar di atas (nama alat tangkap panjang)
+        order = sorted(range(len(values)), key=values.__getitem__)
+        ax.barh([labels[i] for i in order], [values[i] for i in order], color='#0083b8')
+        ax.tick_params(axis='y', labelsize=8)
+        ax.set_xlabel(str(y))
+        ax.grid(axis='x', color='#cecdcd')
+    ax.set_title(REPORT_TABLES.get(name, name), fontsize=13, fontweight='bold')
+    fig.tight_layout()
+    return fig
+
+
+# Laporan PDF: halaman tabel lalu grafiknya, per tabel. Grafik digambar ulang
+# dengan matplotlib (API objek, aman dipakai dari thread) dari data yang sama
+# dengan grafik Plotly di tab Analysis.
+def write_pdf(tables, path, charts=True, title='Laporan Analisis Sistok', progress=None):
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    with PdfPages(path, metadata={'Title': title, 'Creator': 'Sistok'}) as pdf:
+        for name, table in tables.items():
+            for page in _table_pages(REPORT_TABLES.get(name, name), table):
+                pdf.savefig(page)
+            if charts and name in CHARTS:
+                pdf.savefig(_chart_page(name, table))
+            if progress:
+                progress(f'PDF: {REPORT_TABLES.get(name, name)}')
+
+
+WRITERS = {'xlsx': write_xlsx, 'pdf': write_pdf}
+
+
+# Ekspor laporan di thread pool terpisah dari rerun Streamlit. Satu job per
+# kunci (hash upload, opsi): job yang sedang/sudah jalan tidak dibuat ulang,
+# dan file hasil disimpan di output_dir sehingga rerun (atau restart app)
+# cukup memakai file yang sudah ada. Progress job dibaca lewat status().
+class ReportJobs:
+    def __init__(self, output_dir, workers=2):
+        self.output_dir = output_dir
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='sistok-report')
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._prune_lock = threading.Lock()
+
+    def paths(self, key, options):
+        return {fmt: os.path.join(self.output_dir, f'laporan-{key}.{fmt}') for fmt in options['formats']}
+
+    def _finished(self, key, options):
+        paths = self.paths(key, options)
+        if all(os.path.exists(path) for path in paths.values()):
+            return {'key': key, 'paths': paths, 'progress': 1.0, 'stage': 'Selesai', 'error': None, 'done': True}
+        return None
+
+    # Job yang masih berlaku: job selesai yang filenya sudah dihapus (_prune) dibuang
+    def _job(self, key):
+        job = self._jobs.get(key)
+        if job and job['done'] and not job['error'] and not all(os.path.exists(p) for p in job['paths'].values()):
+            self._jobs.pop(key)
+            return None
+        return job
+
+    # Job untuk kunci ini (None jika belum pernah dibuat)
+    def status(self, key, options):
+        with self._lock:
+            job = self._job(key)
+        return job or self._finished(key, options)
+
+    # Mulai ekspor tables ({nama: DataFrame}) jika belum ada; return job
+    def submit(self, key, options, tables):
+        with self._lock:
+            job = self._job(key)
+            if job and not job['error']:
+                return job
+            finished = self._finished(key, options)
+            if finished:
+                return finished
+            job = {'key': key, 'paths': self.paths(key, options), 'progress': 0.0, 'stage': 'Menunggu antrian...', 'error': None, 'done': False}
+            self._jobs[key] = job
+        self._executor.submit(self._run, job, options, tables)
+        return job
+
+    def _run(self, job, options, tables):
+        tables = {name: tables[name] for name in options['tables'] if name in tables}
+        steps = max(1, len(tables) * len(options['formats']))
+        finished = 0
+
+        def progress(stage):
+            nonlocal finished
+            finished += 1
+            job['progress'] = min(finished / steps, 1.0)
+            job['stage'] = stage
+
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            for fmt, path in job['paths'].items():
+                # Tulis ke file sementara dulu supaya file laporan tidak pernah setengah jadi
+                tmp_path = f'{path}.tmp.{fmt}'
+                WRITERS[fmt](tables, tmp_path, charts=options['charts'], progress=progress)
+                os.replace(tmp_path, path)
+            job['stage'] = 'Selesai'
+        except Exception as error:
+            job['error'] = f'{type(error).__name__}: {error}'
+            job['stage'] = 'Gagal'
+        finally:
+            job['done'] = True
+        # Di luar try: gagal merapikan folder tidak membuat laporan ini 'Gagal'
+        if not job['error']:
+            self._prune()
+
+    # Hapus laporan terlama di luar MAX_REPORTS per format. Satu worker saja
+    # yang merapikan pada satu waktu; file yang sudah hilang (dihapus proses
+    # lain atau manual) dilewati.
+    def _prune(self):
+        with self._prune_lock:
+            for fmt in FORMATS:
+                files = []
+                for name in os.listdir(self.output_dir):
+                    if name.startswith('laporan-') and name.endswith(f'.{fmt}') and '.tmp.' not in name:
+                        path = os.path.join(self.output_dir, name)
+                        try:
+                            files.append((os.path.getmtime(path), path))
+                        except FileNotFoundError:
+                            continue
+                files.sort(reverse=True)
+                for _, path in files[MAX_REPORTS:]:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
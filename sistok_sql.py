@@ -0,0 +1,207 @@
+import pandas as pd
+
+import sistok_analysis
+import sistok_data
+import sistok_query
+
+# Backend query DuckDB di atas partisi Parquet per tahun (lihat
+# sistok_data.refresh_partitions). Fungsinya bernama dan berargumen sama
+# dengan sistok_query (select_rows, search_rows, sort_rows, page_data, ...):
+# "index" di sini adalah source dari open_source dan "rows" adalah seleksi
+# (predikat SQL), bukan posisi baris. Filter di-push ke scan Parquet, rentang
+# tahun memilih file partisi, dan query berjalan multi-thread tanpa memuat
+# seluruh data ke memori.
+
+# Kolom kunci kubus yang disimpan sebagai kategori (sama dengan build_cube pandas)
+CUBE_CATEGORIES = ['pelabuhan_kedatangan_id', 'nama_ikan_id', 'jenis_api']
+INTEGER_TYPES = {'TINYINT', 'SMALLINT', 'INTEGER', 'BIGINT', 'UTINYINT', 'USMALLINT', 'UINTEGER', 'UBIGINT'}
+
+
+# Koneksi DuckDB in-memory. threads=None memakai semua core; memory_limit
+# (mis. '4GB') dan temp_directory membatasi memori, sisanya di-spill ke disk.
+def connect(threads=None, memory_limit=None, temp_directory=None):
+    import duckdb
+
+    con = duckdb.connect()
+    if threads:
+        con.execute(f'SET threads = {int(threads)}')
+    if memory_limit:
+        con.execute('SET memory_limit = ?', [memory_limit])
+    if temp_directory:
+        con.execute('SET temp_directory = ?', [temp_directory])
+    return con
+
+
+def _literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _column(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _scan(paths):
+    return f"read_parquet([{', '.join(_literal(path) for path in paths)}], union_by_name = true)"
+
+
+# Jalankan query di cursor sendiri: satu koneksi dipakai bersama semua sesi
+# Streamlit, dan cursor DuckDB aman dipakai paralel dari thread berbeda
+def _query(source, sql, params=None):
+    return source['con'].cursor().execute(sql, params or []).df()
+
+
+# Source query untuk satu versi partisi (manifest dari sistok_data.refresh_dataset)
+def open_source(manifest, threads=None, memory_limit=None, temp_directory=None):
+    files = {key: sistok_data.partition_path(key) for key in sistok_data.partition_keys(manifest)}
+    source = {
+        'con': connect(threads, memory_limit, temp_directory),
+        'files': files,
+        'rows': sum(manifest['partitions'][key]['rows'] for key in files),
+        'types': {},
+    }
+    if files:
+        schema = _query(source, f'DESCRIBE SELECT * FROM {_scan(files.values())}')
+        source['types'] = dict(zip(schema['column_name'], schema['column_type']))
+    return source
+
+
+# Seleksi baris untuk filter sidebar (padanan sistok_query.select_rows).
+# Rentang tahun cukup memilih file partisi (satu file = satu tahun); baris
+# tanpa tahun ikut jika end_year kosong, sama seperti versi pandas.
+def select_rows(index, pelabuhan_kedatangan_id, nama_ikan_id, start_year, end_year):
+    keys = [
+        key for key in index['files']
+        if (key == 'NA' and not end_year)
+        or (key != 'NA' and (not start_year or int(key) >= start_year) and (not end_year or int(key) <= end_year))
+    ]
+    where, params = [], []
+    if pelabuhan_kedatangan_id:
+        where.append('pelabuhan_kedatangan_id = ?')
+        params.append(str(pelabuhan_kedatangan_id))
+    if nama_ikan_id:
+        where.append(f"nama_ikan_id IN ({', '.join('?' * len(nama_ikan_id))})")
+        params.extend(str(name) for name in nama_ikan_id)
+    return {'keys': keys, 'where': where, 'params': params, 'order': None}
+
+
+def _from(index, rows):
+    sql = f"FROM {_scan(index['files'][key] for key in rows['keys'])}"
+    if rows['where']:
+        sql += ' WHERE ' + ' AND '.join(rows['where'])
+    return sql
+
+
+def count_rows(index, rows):
+    if not rows['keys']:
+        return 0
+    return int(_query(index, f'SELECT count(*) AS n {_from(index, rows)}', rows['params'])['n'].iloc[0])
+
+
+# Seleksi trip anomali (anomali=True) atau tanpa trip anomali (False)
+def anomaly_rows(index, rows, anomali):
+    clause = 'coalesce(anomali, false)' if anomali else 'NOT coalesce(anomali, false)'
+    return {**rows, 'where': rows['where'] + [clause]}
+
+
+# Kolom yang bisa ditampilkan di VIEW DATASET (kunci periode internal disembunyikan)
+def view_columns(index):
+    hidden = set(sistok_data.PERIOD_KEYS.values()) - {'tahun'}
+    return [c for c in index['types'] if c not in hidden] + ['time_period']
+
+
+# Cari teks (tanpa beda huruf besar/kecil) di kolom teks
+def search_rows(index, rows, columns, text):
+    text = text.strip().lower()
+    columns = [c for c in columns if index['types'].get(c) == 'VARCHAR']
+    if not columns:
+        return {**rows, 'keys': []}
+    clause = ' OR '.join(f'contains(lower({_column(c)}), ?)' for c in columns)
+    return {**rows, 'where': rows['where'] + [f'({clause})'], 'params': rows['params'] + [text] * len(columns)}
+
+
+def sort_rows(index, rows, column, time_frame, ascending=True):
+    if column == 'time_period':
+        column = sistok_data.PERIOD_KEYS.get(time_frame, 'tahun')
+    return {**rows, 'order': f"{_column(column)} {'ASC' if ascending else 'DESC'} NULLS LAST"}
+
+
+# Satu halaman data: LIMIT/OFFSET di query, hanya kolom yang ditampilkan
+def page_data(index, rows, columns, time_frame, page, page_size):
+    selected = [c for c in columns if c in index['types']]
+    period = sistok_data.PERIOD_KEYS.get(time_frame) if 'time_period' in columns else None
+    if not rows['keys'] or not (selected or period):
+        return pd.DataFrame(columns=[c for c in columns if c in selected or c == 'time_period'])
+
+    fields = [_column(c) for c in selected] + ([f'{_column(period)} AS __periode'] if period else [])
+    sql = f"SELECT {', '.join(fields)} {_from(index, rows)}"
+    if rows['order']:
+        sql += f" ORDER BY {rows['order']}"
+    df = _query(index, sql + ' LIMIT ? OFFSET ?', rows['params'] + [page_size, (page - 1) * page_size])
+    if period:
+        df['time_period'] = sistok_data.label_periods(df.pop('__periode').astype('Int64'), time_frame)
+    return df[[c for c in columns if c in df.columns]]
+
+
+# Total berat per periode time frame (padanan sistok_charts.period_series)
+def period_series(index, rows, time_frame, measure='berat'):
+    column = _column(sistok_data.PERIOD_KEYS.get(time_frame, 'tahun'))
+    if not rows['keys']:
+        return pd.DataFrame({'periode': [], measure: []})
+    where = f"{'AND' if rows['where'] else 'WHERE'} {column} IS NOT NULL"
+    df = _query(index, (
+        f'SELECT {column} AS periode, coalesce(sum(CAST({_column(measure)} AS DOUBLE)), 0) AS {_column(measure)} '
+        f'{_from(index, rows)} {where} GROUP BY 1 ORDER BY 1'
+    ), rows['params'])
+    df['periode'] = sistok_data.period_start(df['periode'].to_numpy(dtype='int64'), time_frame)
+    return df
+
+
+# Kubus agregat (padanan sistok_query.build_cube) dihitung oleh DuckDB, untuk
+# semua partisi atau satu partisi (key). Tipe kolom disamakan dengan versi
+# pandas; kolom kategori di-dictionary-encode di Arrow (lebih cepat dari astype).
+def build_cube(index, key=None):
+    import pyarrow.compute as pc
+
+    keys = [key] if key is not None else list(index['files'])
+    if not keys:
+        return pd.DataFrame(columns=sistok_query.CUBE_KEYS + sistok_query.CUBE_MEASURES)
+
+    integer_days = index['types'].get('jumlah_hari') in INTEGER_TYPES
+    jumlah_hari = 'CAST(coalesce(sum(jumlah_hari), 0) AS BIGINT)' if integer_days else 'coalesce(sum(CAST(jumlah_hari AS DOUBLE)), 0)'
+    rows = {'keys': keys, 'where': [], 'params': [], 'order': None}
+    table = index['con'].cursor().execute(f"""
+        SELECT tahun, month(tanggal_kedatangan) AS bulan, pelabuhan_kedatangan_id, nama_ikan_id, jenis_api,
+               coalesce(anomali, false) AS anomali,
+               coalesce(sum(CAST(berat AS DOUBLE)), 0) AS berat,
+               coalesce(sum(CAST(nilai_produksi AS DOUBLE)), 0) AS nilai_produksi,
+               {jumlah_hari} AS jumlah_hari,
+               count(*) AS trip
+        {_from(index, rows)}
+        GROUP BY ALL
+    """).to_arrow_table()
+    for column in CUBE_CATEGORIES:
+        table = table.set_column(table.schema.get_field_index(column), column, pc.dictionary_encode(table[column]))
+    cube = table.to_pandas()
+    cube['tahun'] = cube['tahun'].astype('Int16')
+    cube['bulan'] = cube['bulan'].astype('Int8')
+    return cube
+
+
+# Agregat file upload (padanan sistok_analysis.ingest_upload(...)['aggregates'])
+# langsung dari CSV: satu GROUP BY multi-thread, tanpa membaca baris ke pandas
+def upload_aggregates(path, threads=None, memory_limit=None):
+    source = {'con': connect(threads, memory_limit)}
+    scan = f'read_csv({_literal(path)}, header = true)'
+    columns = set(_query(source, f'DESCRIBE SELECT * FROM {scan}')['column_name'])
+    keys = [k for k in sistok_analysis.AGG_KEYS if k in columns]
+    measures = [m for m in sistok_analysis.AGG_MEASURES if m in columns]
+    if not keys or not measures:
+        return None
+
+    # TRY_CAST: sel yang bukan angka menjadi NULL (sama dengan ingest_upload)
+    fields = [f"TRY_CAST({_column(k)} AS {'SMALLINT' if k == 'tahun' else 'VARCHAR'}) AS {_column(k)}" for k in keys]
+    fields += [f'coalesce(sum(TRY_CAST({_column(m)} AS DOUBLE)), 0) AS {_column(m)}' for m in measures]
+    aggregates = _query(source, f"SELECT {', '.join(fields)}, count(*) AS trip FROM {scan} GROUP BY ALL ORDER BY ALL")
+    for key in keys:
+        aggregates[key] = aggregates[key].astype(sistok_analysis.UPLOAD_DTYPES[key])
+    return aggregates
@@ -0,0 +1,296 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Model produksi surplus yang di-fit:
+# - Schaefer          : CPUE = a + b*E                (regresi linear)
+# - Fox               : ln(CPUE) = a + b*E            (regresi linear)
+# - Schaefer nonlinear: C = a*E + b*E^2               (kuadrat terkecil di ruang tangkapan)
+# - Fox nonlinear     : C = E * exp(a + b*E)          (Levenberg-Marquardt di ruang tangkapan)
+# Semua fungsi bekerja pada array (..., tahun) sehingga ribuan stok dan replikasi
+# bootstrap di-fit sekaligus tanpa loop Python per stok.
+MODELS = ['Schaefer', 'Fox', 'Schaefer nonlinear', 'Fox nonlinear']
+
+MIN_YEARS = 3
+
+# Levenberg-Marquardt Fox nonlinear: maksimum iterasi dan batas konvergensi
+# (perubahan relatif SSE dan perubahan relatif parameter)
+LM_MAX_STEPS = 200
+LM_FTOL = 1e-10
+LM_XTOL = 1e-8
+
+# Interval kepercayaan hanya dilaporkan jika porsi replikasi bootstrap yang
+# menghasilkan MSY valid minimal sebesar ini
+MIN_VALID_BOOT = 0.8
+
+
+# Standarisasi effort dengan FPI: per stok, n alat tangkap dengan tangkapan
+# terbesar dipakai; FPI = CPUE alat / CPUE tertinggi. Effort standar per tahun
+# = jumlah (effort alat x FPI alat). Tangkapan dalam ton.
+def standardize_effort(df, keys, gear='jenis_api', catch='berat', effort='jumlah_hari', n_gears=2):
+    keys = list(keys)
+    data = df[keys + [gear, 'tahun', catch, effort]].rename(columns={gear: 'gear', catch: 'catch', effort: 'effort'})
+    data['catch'] = data['catch'].astype('float64') / 1000
+    data['effort'] = data['effort'].astype('float64')
+
+    per_gear = data.groupby(keys + ['gear'], observed=True, sort=False)[['catch', 'effort']].sum().reset_index()
+    per_gear['CPUE'] = per_gear['catch'] / per_gear['effort']
+    per_gear['rank'] = per_gear.groupby(keys, observed=True, sort=False)['catch'].rank(method='first', ascending=False)
+    per_gear = per_gear[per_gear['rank'] <= n_gears]
+    per_gear['FPI'] = per_gear['CPUE'] / per_gear.groupby(keys, observed=True, sort=False)['CPUE'].transform('max')
+
+    data = data.merge(per_gear[keys + ['gear', 'FPI']], on=keys + ['gear'], how='inner')
+    data['effort_std'] = data['effort'] * data['FPI']
+    series = data.groupby(keys + ['tahun'], observed=True)[['catch', 'effort_std']].sum().reset_index()
+    series['CPUE'] = series['catch'] / series['effort_std']
+    return series
+
+
+# Ubah deret panjang (stok, tahun) jadi matriks (stok x tahun); tahun kosong = NaN
+def to_matrix(series, keys):
+    keys = list(keys)
+    catch = series.pivot_table(index=keys, columns='tahun', values='catch', aggfunc='sum', observed=True)
+    effort = series.pivot_table(index=keys, columns='tahun', values='effort_std', aggfunc='sum', observed=True)
+    effort = effort.reindex(index=catch.index, columns=catch.columns)
+    return catch.index, catch.to_numpy(dtype='float64'), effort.to_numpy(dtype='float64')
+
+
+def _wsum(w, *arrays):
+    product = w
+    for array in arrays:
+        product = product * array
+    return product.sum(axis=-1)
+
+
+# Regresi linear berbobot per baris (axis terakhir = tahun)
+def _ols(x, y, w):
+    sw, sx, sy = _wsum(w), _wsum(w, x), _wsum(w, y)
+    sxx, sxy = _wsum(w, x, x), _wsum(w, x, y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (sw * sxy - sx * sy) / (sw * sxx - sx ** 2)
+        intercept = (sy - slope * sx) / sw
+    return intercept, slope
+
+
+def _r2(y, fitted, w):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = _wsum(w, y) / _wsum(w)
+        ss_res = _wsum(w, (y - fitted) ** 2)
+        ss_tot = _wsum(w, (y - mean[..., None]) ** 2)
+        return 1 - ss_res / ss_tot
+
+
+# Selesaikan sistem 2x2 [[p, q], [q, r]] [a, b] = [u, v] per baris
+def _solve2(p, q, r, u, v):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        det = p * r - q * q
+        return (r * u - q * v) / det, (p * v - q * u) / det
+
+
+# Fit keempat model. catch/effort: array (..., tahun), w: bobot per titik
+# (0 = tidak dipakai). Effort di-skala dengan rata-rata per stok supaya
+# sistem normal tetap stabil; parameter a, b dan E_MSY dikembalikan ke satuan
+# asli (MSY tidak bergantung pada skala).
+def fit_models(catch, effort, w):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scale = _wsum(w, effort) / _wsum(w)
+    E = effort / scale[..., None]
+    C = catch
+    cpue = C / E
+    log_cpue = np.log(cpue)
+    results = {}
+
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        a, b = _ols(E, cpue, w)
+        valid = (a > 0) & (b < 0)
+        results['Schaefer'] = {
+            'a': a / scale, 'b': b / scale ** 2,
+            'msy': np.where(valid, -a ** 2 / (4 * b), np.nan),
+            'e_msy': np.where(valid, -a / (2 * b) * scale, np.nan),
+            'r2': _r2(cpue, a[..., None] + b[..., None] * E, w),
+        }
+
+        c, d = _ols(E, log_cpue, w)
+        fox_c, fox_d = c, d
+        valid = d < 0
+        results['Fox'] = {
+            'a': c - np.log(scale), 'b': d / scale,
+            'msy': np.where(valid, -np.exp(c - 1) / d, np.nan),
+            'e_msy': np.where(valid, -1 / d * scale, np.nan),
+            'r2': _r2(log_cpue, c[..., None] + d[..., None] * E, w),
+        }
+
+        a, b = _solve2(_wsum(w, E, E), _wsum(w, E, E, E), _wsum(w, E, E, E, E), _wsum(w, E, C), _wsum(w, E, E, C))
+        valid = (a > 0) & (b < 0)
+        results['Schaefer nonlinear'] = {
+            'a': a / scale, 'b': b / scale ** 2,
+            'msy': np.where(valid, -a ** 2 / (4 * b), np.nan),
+            'e_msy': np.where(valid, -a / (2 * b) * scale, np.nan),
+            'r2': _r2(C, a[..., None] * E + b[..., None] * E ** 2, w),
+        }
+
+        c, d, converged = _fox_levenberg_marquardt(C, E, w, fox_c, fox_d)
+        # MSY hanya ada jika optimum konvergen dan b < 0
+        valid = converged & (d < 0)
+        results['Fox nonlinear'] = {
+            'a': c - np.log(scale), 'b': d / scale,
+            'msy': np.where(valid, -np.exp(c - 1) / d, np.nan),
+            'e_msy': np.where(valid, -1 / d * scale, np.nan),
+            'r2': _r2(C, E * np.exp(c[..., None] + d[..., None] * E), w),
+            'konvergen': converged,
+        }
+    # Model lain diselesaikan langsung (tanpa iterasi)
+    for name in ['Schaefer', 'Fox', 'Schaefer nonlinear']:
+        results[name]['konvergen'] = np.isfinite(results[name]['a']) & np.isfinite(results[name]['b'])
+    return results
+
+
+def _fox_sse(C, E, w, c, d):
+    with np.errstate(over='ignore', invalid='ignore'):
+        return _wsum(w, (C - E * np.exp(c[..., None] + d[..., None] * E)) ** 2)
+
+
+# C = E * exp(c + d*E) dengan Levenberg-Marquardt per baris, mulai dari hasil
+# regresi Fox. Langkah yang tidak menurunkan SSE ditolak dan redamannya
+# dinaikkan (langkah makin pendek ke arah gradien); langkah yang diterima
+# menurunkan redaman. Baris konvergen jika perubahan relatif SSE atau
+# parameter di bawah LM_FTOL/LM_XTOL. Return (c, d, konvergen).
+def _fox_levenberg_marquardt(C, E, w, c, d):
+    c = np.where(np.isfinite(c), c, 0.0)
+    d = np.where(np.isfinite(d), d, 0.0)
+    current = _fox_sse(C, E, w, c, d)
+    damping = np.full(np.shape(c), 1e-3)
+    converged = np.zeros(np.shape(c), dtype=bool)
+    done = ~np.isfinite(current)
+
+    for _ in range(LM_MAX_STEPS):
+        if done.all():
+            break
+        with np.errstate(over='ignore', invalid='ignore'):
+            f = E * np.exp(c[..., None] + d[..., None] * E)
+            r = C - f
+            jc, jd = f, E * f
+            p, q, s = _wsum(w, jc, jc), _wsum(w, jc, jd), _wsum(w, jd, jd)
+            dc, dd = _solve2(p * (1 + damping), q, s * (1 + damping), _wsum(w, jc, r), _wsum(w, jd, r))
+            new = _fox_sse(C, E, w, c + dc, d + dd)
+            step = np.hypot(dc, dd) <= LM_XTOL * (np.hypot(c, d) + LM_XTOL)
+            better = ~done & np.isfinite(new) & (new < current)
+            gain = (current - new) <= LM_FTOL * current
+
+        # Di optimum langkah Gauss-Newton (redaman kecil) sudah hampir nol,
+        # jadi langkah kecil yang ditolak juga berarti konvergen
+        converged |= ~done & ((better & (gain | step)) | (~better & step & (damping <= 1)))
+        c = np.where(better, c + dc, c)
+        d = np.where(better, d + dd, d)
+        current = np.where(better, new, current)
+        damping = np.where(better, np.maximum(damping / 10, 1e-12), damping * 10)
+        done |= converged | (damping > 1e12)
+    return c, d, converged
+
+
+def _valid_points(catch, effort):
+    return np.isfinite(catch) & np.isfinite(effort) & (catch > 0) & (effort > 0)
+
+
+# Fit semua stok sekaligus + interval kepercayaan bootstrap (resampling tahun
+# dengan pengembalian, sebagai bobot multinomial). Replikasi diproses per batch
+# supaya memori tetap terbatas. boot_valid = porsi replikasi dengan MSY valid;
+# interval dikosongkan jika estimasi titiknya NaN atau boot_valid < MIN_VALID_BOOT.
+def fit_batch(catch, effort, n_boot=1000, ci=95, seed=0, batch_size=250):
+    valid = _valid_points(catch, effort)
+    n_years = valid.sum(axis=-1)
+    enough = n_years >= MIN_YEARS
+    C = np.where(valid, catch, 1.0)
+    E = np.where(valid, effort, 1.0)
+    w = valid.astype('float64')
+
+    results = fit_models(C, E, w)
+    for model in results.values():
+        for key in model:
+            model[key] = enough & model[key] if key == 'konvergen' else np.where(enough, model[key], np.nan)
+
+    if n_boot:
+        rng = np.random.default_rng(seed)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            p = w / n_years[:, None]
+        p = np.where(enough[:, None], p, 1.0 / w.shape[-1])
+        draws = {name: {'msy': [], 'e_msy': []} for name in results}
+        for start in range(0, n_boot, batch_size):
+            size = min(batch_size, n_boot - start)
+            weights = rng.multinomial(np.maximum(n_years, 1), p, size=(size, len(n_years))).astype('float64')
+            boot = fit_models(C, E, weights)
+            for name, model in boot.items():
+                draws[name]['msy'].append(model['msy'])
+                draws[name]['e_msy'].append(model['e_msy'])
+
+        lo, hi = (100 - ci) / 2, 100 - (100 - ci) / 2
+        for name, model in results.items():
+            msy = np.concatenate(draws[name]['msy'], axis=0)
+            model['boot_valid'] = np.where(enough, np.isfinite(msy).mean(axis=0), np.nan)
+            reliable = (model['boot_valid'] >= MIN_VALID_BOOT)
+            for key in ('msy', 'e_msy'):
+                samples = np.where(enough, np.concatenate(draws[name][key], axis=0), np.nan)
+                with warnings.catch_warnings():
+                    # Stok tanpa replikasi valid menghasilkan NaN
+                    warnings.simplefilter('ignore', RuntimeWarning)
+                    bounds = np.nanpercentile(samples, [lo, hi], axis=0)
+                keep = reliable & np.isfinite(model[key])
+                model[f'{key}_lo'], model[f'{key}_hi'] = np.where(keep, bounds, np.nan)
+    return results, n_years
+
+
+# Tangkapan hasil model untuk effort tertentu (a, b dalam satuan asli)
+def predict_catch(model, a, b, effort):
+    effort = np.asarray(effort, dtype='float64')
+    if model.startswith('Schaefer'):
+        return a * effort + b * effort ** 2
+    return effort * np.exp(a + b * effort)
+
+
+# Hasil fit sebagai tabel: satu baris per (stok, model)
+def results_frame(index, results, n_years):
+    frames = []
+    for name, model in results.items():
+        frame = pd.DataFrame(model, index=index)
+        frame.insert(0, 'model', name)
+        frame['n_tahun'] = n_years
+        frames.append(frame)
+    return pd.concat(frames).reset_index()
+
+
+# Fit model untuk satu file upload (agregat per jenis_api x tahun dari
+# sistok_analysis.ingest_upload)
+def assess_upload(aggregates, n_boot=1000, n_gears=2, seed=0):
+    keys = ['stok']
+    series = standardize_effort(aggregates.assign(stok='upload'), keys, effort='Jumlah Hari', n_gears=n_gears)
+    index, catch, effort = to_matrix(series, keys)
+    results, n_years = fit_batch(catch, effort, n_boot=n_boot, seed=seed)
+    return series.drop(columns=keys), results_frame(index, results, n_years).drop(columns=keys)
+
+
+# Fit model untuk semua stok pelabuhan x jenis ikan dari kubus agregat
+# (sistok_query.build_cube) dalam satu batch
+def assess_stocks(cube, n_boot=1000, n_gears=2, seed=0):
+    keys = ['pelabuhan_kedatangan_id', 'nama_ikan_id']
+    series = standardize_effort(cube, keys, n_gears=n_gears)
+    index, catch, effort = to_matrix(series, keys)
+    results, n_years = fit_batch(catch, effort, n_boot=n_boot, seed=seed)
+    return results_frame(index, results, n_years)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    import sistok_data
+    import sistok_query
+
+    parser = argparse.ArgumentParser(description='Fit model produksi surplus untuk semua stok pelabuhan x jenis ikan')
+    parser.add_argument('--bootstrap', type=int, default=1000)
+    parser.add_argument('--gears', type=int, default=2)
+    parser.add_argument('--output', default='surplus_production.csv')
+    args = parser.parse_args()
+
+    cube = sistok_query.build_cube(sistok_data.load_dataset())
+    assess_stocks(cube, n_boot=args.bootstrap, n_gears=args.gears).to_csv(args.output, index=False)
+    print('Hasil disimpan di', args.output)
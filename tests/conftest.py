@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modul sistok_* ada di root repo; supaya `pytest` juga jalan tanpa `python -m`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,38 @@
+import io
+
+import pandas as pd
+
+import sistok_analysis
+
+CSV = """tahun,jenis_api,nama_ikan_id,berat,Nilai Produksi,Jumlah Hari,Tanggal Berangkat,Tanggal Kedatangan
+2020,Payang,Kembung,10,100000,2,2020-01-01,2020-01-02
+2020,Payang,Kembung,abc,50000,1,2020-01-05,2020-01-05
+2021,Payang,Kembung,5,40000,1,2021-03-01,2021-03-01
+dua ribu,Bubu,Kembung,7,70000,1,2021-03-01,2021-03-01
+"""
+
+
+def test_ingest_upload_coerces_malformed_cells():
+    result = sistok_analysis.ingest_upload(io.BytesIO(CSV.encode()), chunksize=2)
+    data, aggregates = result['data'], result['aggregates']
+    assert str(data['tahun'].dtype) == 'Int16'
+    assert data['berat'].dtype == 'float64'
+    assert data['berat'].isna().sum() == 1
+    assert data['tahun'].isna().sum() == 1
+    assert result['quality']['berat_tidak_positif'] == 1
+
+    payang = aggregates[aggregates['jenis_api'] == 'Payang'].set_index('tahun')
+    assert payang.loc[2020, 'berat'] == 10
+    assert payang.loc[2020, 'trip'] == 2
+    assert payang.loc[2021, 'berat'] == 5
+    # Baris dengan tahun rusak tetap ikut dihitung (tahun kosong)
+    assert aggregates['trip'].sum() == 4
+    assert aggregates['tahun'].isna().sum() == 1
+
+
+def test_ingest_upload_matches_untyped_read():
+    clean = CSV.replace('abc', '3').replace('dua ribu', '2022').encode()
+    df = pd.read_csv(io.BytesIO(clean))
+    aggregates = sistok_analysis.ingest_upload(io.BytesIO(clean))['aggregates']
+    expected = df.groupby(['jenis_api', 'tahun'])['berat'].sum()
+    assert aggregates.set_index(['jenis_api', 'tahun'])['berat'].astype(float).to_dict() == expected.astype(float).to_dict()
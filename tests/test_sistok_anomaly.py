@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+import sistok_anomaly
+
+BERAT = [100.0, 110.0, 90.0, 105.0, 95.0, 102.0, 98.0, 108.0, 92.0]
+
+
+# Trip satu hari dengan harga 10.000/kg; semua di satu grup kecuali diubah
+def trips(berat, jenis_api='Payang', periode_bulan=600):
+    n = len(berat)
+    berat = np.asarray(berat, dtype='float64')
+    return pd.DataFrame({
+        'pelabuhan_kedatangan_id': ['A'] * n,
+        'nama_ikan_id': ['Tongkol'] * n,
+        'jenis_api': jenis_api if isinstance(jenis_api, list) else [jenis_api] * n,
+        'periode_bulan': periode_bulan if isinstance(periode_bulan, list) else [periode_bulan] * n,
+        'berat': berat,
+        'jumlah_hari': [1] * n,
+        'nilai_produksi': berat * 10000,
+    })
+
+
+def test_extra_zero_is_flagged():
+    df = trips(BERAT + [1000.0])
+    flags = sistok_anomaly.anomaly_flags(df)
+    assert flags.tolist() == [False] * 9 + [True]
+    scores = sistok_anomaly.robust_scores(df)
+    assert scores['berat_per_hari'].iloc[-1] > sistok_anomaly.THRESHOLD
+    # Harga per kg sama di semua trip: MAD 0, skor NaN
+    assert scores['harga_per_kg'].isna().all()
+
+
+def test_price_typo_is_flagged():
+    # Harga 9.000-11.000/kg, trip terakhir 100.000/kg (kelebihan satu nol)
+    df = trips(BERAT + [100.0])
+    df['nilai_produksi'] = df['berat'] * [9000, 11000, 10000, 9500, 10500, 9800, 10200, 9200, 10800, 100000]
+    assert np.flatnonzero(sistok_anomaly.anomaly_flags(df)).tolist() == [9]
+
+
+def test_zero_mad_and_small_group_not_flagged():
+    # MAD 0: sembilan trip identik, trip kesepuluh tidak bisa diberi skor
+    assert not sistok_anomaly.anomaly_flags(trips([100.0] * 9 + [1000.0])).any()
+    # Kurang dari MIN_GROUP trip di semua tingkat grup
+    assert not sistok_anomaly.anomaly_flags(trips(BERAT[:6] + [1000.0])).any()
+    assert sistok_anomaly.robust_scores(trips(BERAT[:6] + [1000.0])).isna().all().all()
+
+
+def test_fallback_groups():
+    # Per alat tangkap hanya 5 trip: dinilai di pelabuhan x jenis ikan x bulan
+    gear = ['Payang', 'Rawai'] * 5
+    assert sistok_anomaly.anomaly_flags(trips(BERAT + [1000.0], jenis_api=gear)).tolist() == [False] * 9 + [True]
+    # Tiap bulan hanya 2 trip: dinilai di pelabuhan x jenis ikan sepanjang partisi
+    months = [600, 601, 602, 603, 604] * 2
+    assert sistok_anomaly.anomaly_flags(trips(BERAT + [1000.0], periode_bulan=months)).tolist() == [False] * 9 + [True]
+
+
+def test_invalid_measures_and_empty():
+    df = trips(BERAT + [0.0])
+    assert not sistok_anomaly.anomaly_flags(df)[-1]
+    assert np.isnan(sistok_anomaly.robust_scores(df)['berat_per_hari'].iloc[-1])
+    assert sistok_anomaly.anomaly_flags(df.iloc[:0]).tolist() == []
+    assert 'anomali' in sistok_anomaly.add_anomaly_flags(trips(BERAT)).columns
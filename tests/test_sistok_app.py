@@ -0,0 +1,24 @@
+import subprocess
+import sys
+
+from benchmarks.bench_startup import ROOT, app_imports
+
+# Paket berat yang hanya boleh di-import di dalam fungsi/tab yang memakainya
+HEAVY = ['plotly', 'matplotlib', 'gdown', 'openai', 'duckdb', 'xlsxwriter', 'scipy', 'prometheus_client']
+
+
+def test_app_defers_heavy_imports():
+    startup, per_tab = app_imports()
+    assert not [module for module in startup if module.split('.')[0] in HEAVY]
+    assert per_tab['Dashboard'] == ['plotly.express']
+    assert per_tab['About'] == []
+
+
+# Modul sistok_* yang di-import app saat startup tidak ikut memuat paket berat
+# (diukur di interpreter baru; streamlit sendiri tidak ikut dihitung)
+def test_project_modules_import_light():
+    startup, _ = app_imports()
+    modules = [module for module in startup if module.startswith('sistok_')]
+    code = f'import sys\nimport {", ".join(modules)}\nprint(",".join(m for m in {HEAVY!r} if m in sys.modules))'
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ''
@@ -0,0 +1,83 @@
+import pandas as pd
+import pytest
+
+import sistok_assistant
+import sistok_query
+
+
+def make_summary(berat=1500.0):
+    return {
+        'totals': {'berat': berat, 'nilai_produksi': 2.5e7, 'jumlah_hari': 40, 'jenis_ikan': 2, 'trip': 12},
+        'tahun_min': 2020,
+        'tahun_max': 2022,
+        'tangkapan_dominan': pd.DataFrame({'nama_ikan_id': ['Tongkol', 'Layang'], 'berat': [1000.0, 500.0]}),
+        'alat_tangkap_dominan': pd.DataFrame({'jenis_api': ['Payang'], 'berat': [1500.0]}),
+    }
+
+
+# MockClient yang menghitung panggilan ke "API"
+class CountingClient(sistok_assistant.MockClient):
+    def __init__(self):
+        super().__init__(delay=0)
+        self.calls = []
+
+    def _create(self, model, messages, stream=False, **kwargs):
+        self.calls.append(messages)
+        return super()._create(model, messages, stream=stream, **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    cache = sistok_query.ResultCache(max_entries=16, ttl=3600)
+    monkeypatch.setattr(sistok_assistant, 'response_cache', cache)
+    return cache
+
+
+def test_prompt_contains_dashboard_context():
+    prompt = sistok_assistant.build_system_prompt(make_summary())
+    assert '- Total Tangkapan: 1,500.00 Kg' in prompt
+    assert '- Time Period: 2020 to 2022' in prompt
+    assert '- Top 3 Jenis Ikan: Tongkol, Layang' in prompt
+
+
+def test_stream_then_cached(fresh_cache):
+    client = CountingClient()
+    history = [{'role': 'user', 'content': 'halo'}, {'role': 'assistant', 'content': 'hai'}]
+    chunks = list(sistok_assistant.stream_response(client, 'Apa tren tangkapan?', make_summary(), history))
+    answer = ''.join(chunks)
+    assert len(chunks) > 1
+    assert answer.startswith('[mock] Pertanyaan: Apa tren tangkapan?')
+    assert [m['role'] for m in client.calls[0]] == ['system', 'user', 'assistant', 'user']
+
+    # Pertanyaan sama (beda spasi/huruf besar) dan konteks sama: dari cache, satu potong
+    cached = list(sistok_assistant.stream_response(client, '  apa TREN   tangkapan? ', make_summary()))
+    assert cached == [answer]
+    assert len(client.calls) == 1
+    assert fresh_cache.stats()['hits'] == 1
+
+    # Konteks data berubah (filter lain): jawaban baru
+    list(sistok_assistant.stream_response(client, 'Apa tren tangkapan?', make_summary(berat=10.0)))
+    assert len(client.calls) == 2
+
+
+def test_errors_are_not_cached(fresh_cache):
+    class FailingClient(CountingClient):
+        def _create(self, model, messages, stream=False, **kwargs):
+            self.calls.append(messages)
+            raise ConnectionError('server tidak bisa dihubungi')
+
+    client = FailingClient()
+    for _ in range(2):
+        assert list(sistok_assistant.stream_response(client, 'Halo', make_summary())) == ['Error: server tidak bisa dihubungi']
+    assert len(client.calls) == 2
+    assert fresh_cache.stats()['entries'] == 0
+
+
+def test_create_client():
+    assert isinstance(sistok_assistant.create_client('mock'), sistok_assistant.MockClient)
+    with pytest.raises(ValueError):
+        sistok_assistant.create_client('lain')
+    reply = sistok_assistant.MockClient(delay=0).chat.completions.create(
+        model='x', messages=[{'role': 'system', 'content': '- a'}, {'role': 'user', 'content': 'b'}],
+    )
+    assert reply.choices[0].message.content == '[mock] Pertanyaan: b\n- a'
@@ -0,0 +1,90 @@
+import os
+
+import pandas as pd
+import pytest
+
+import sistok_analysis
+import sistok_batch
+
+HEADER = 'tahun,jenis_api,Nilai Produksi,Jumlah Hari,Tanggal Berangkat,Tanggal Kedatangan,nama_ikan_id,berat\n'
+FILES = {
+    'data_kembung_tegal.csv': [
+        (2020, 'Payang', 2), (2020, 'Payang', 3), (2020, 'Rawai', 1), (2021, 'Payang', 4), (2021, 'Bubu', 2),
+    ],
+    'data_kembung_brondong.csv': [
+        (2021, 'Rawai', 5), (2022, 'Rawai', 1), (2022, 'Payang', 2),
+    ],
+}
+
+
+def write_files(folder):
+    for name, trips in FILES.items():
+        lines = [
+            f'{year},{gear},{days * 90000},{days},{year}-03-01,{year}-03-{days + 1:02d},Kembung,{days * 11}\n'
+            for year, gear, days in trips
+        ]
+        (folder / name).write_text(HEADER + ''.join(lines))
+
+
+# Kolom kategori -> object dan nama kolom string, supaya sebanding dengan CSV
+def plain(table):
+    table = table.reset_index(drop=True).rename(columns=str).rename_axis(columns=None)
+    return table.astype({c: 'object' for c in table.columns if isinstance(table[c].dtype, pd.CategoricalDtype)})
+
+
+# Tabel yang sama seperti di tab Analysis untuk satu file upload
+def in_app_tables(path):
+    with open(path, 'rb') as file:
+        return sistok_analysis.analysis_tables(sistok_analysis.ingest_upload(file)['aggregates'])
+
+
+def test_cli_matches_in_app_tables(tmp_path):
+    write_files(tmp_path)
+    output = tmp_path / 'laporan'
+    code = sistok_batch.main([str(tmp_path), '--output', str(output), '--workers', '1', '--format', 'csv'])
+    assert code == 0
+
+    for name in FILES:
+        stem = os.path.splitext(name)[0]
+        expected = in_app_tables(tmp_path / name)
+        assert sorted(os.listdir(output / stem)) == sorted(f'{table}.csv' for table in expected)
+        for table_name, table in expected.items():
+            written = pd.read_csv(output / stem / f'{table_name}.csv')
+            assert written.columns.tolist() == [str(c) for c in table.columns]
+            pd.testing.assert_frame_equal(written, plain(table), check_dtype=False)
+
+    # Gabungan: satu blok per file, kolom tahun dari semua file (0 jika tidak ada)
+    combined = pd.read_csv(output / 'gabungan_tangkapan_per_alat.csv')
+    assert combined.columns.tolist() == ['file', 'jenis_api', '2020', '2021', '2022', 'Total']
+    assert combined['file'].unique().tolist() == ['data_kembung_brondong', 'data_kembung_tegal']
+    jumlah = combined[combined['jenis_api'] == 'Jumlah'].set_index('file')['Total']
+    assert jumlah.to_dict() == {'data_kembung_brondong': 88, 'data_kembung_tegal': 132}
+
+
+def test_failed_file_does_not_stop_batch(tmp_path):
+    write_files(tmp_path)
+    (tmp_path / 'data_kembung_rusak.csv').write_text('kolom,lain\n1,2\n')
+    output = tmp_path / 'laporan'
+    results, errors = sistok_batch.run_batch(
+        sorted(str(p) for p in tmp_path.glob('data_kembung_*.csv')), str(output), ['parquet'], workers=2,
+    )
+    assert sorted(results) == ['data_kembung_brondong', 'data_kembung_tegal']
+    assert list(errors) == [str(tmp_path / 'data_kembung_rusak.csv')]
+    assert (output / 'gabungan_cpue.parquet').exists()
+    assert sistok_batch.main([str(tmp_path), '--output', str(output), '--workers', '1']) == 1
+
+
+def test_duckdb_backend_matches_pandas(tmp_path):
+    pytest.importorskip('duckdb')
+    write_files(tmp_path)
+    path = str(tmp_path / 'data_kembung_tegal.csv')
+    expected = sistok_analysis.run_pipeline(path)
+    actual = sistok_analysis.run_pipeline(path, backend='duckdb')
+    assert sorted(actual) == sorted(expected)
+    for name, table in expected.items():
+        pd.testing.assert_frame_equal(plain(actual[name]), plain(table), check_dtype=False)
+
+
+def test_cli_without_files(tmp_path):
+    with pytest.raises(SystemExit):
+        sistok_batch.main([str(tmp_path)])
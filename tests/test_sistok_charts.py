@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+import sistok_charts
+
+
+def test_lttb_keeps_endpoints_and_count():
+    x = np.arange(100)
+    y = np.sin(x / 5.0)
+    selected = sistok_charts.lttb(x, y, 10)
+    assert len(selected) == 10
+    assert selected[0] == 0 and selected[-1] == 99
+    assert (np.diff(selected) > 0).all()
+
+
+def test_lttb_keeps_isolated_spike():
+    x = np.arange(50)
+    y = np.zeros(50)
+    y[23] = 100.0
+    assert 23 in sistok_charts.lttb(x, y, 5)
+
+
+def test_lttb_small_series_unchanged():
+    assert sistok_charts.lttb([0, 1, 2], [5, 6, 7], 10).tolist() == [0, 1, 2]
+    assert sistok_charts.lttb(np.arange(10), np.arange(10), 2).tolist() == list(range(10))
+
+
+def test_period_series_sums_selected_rows():
+    index = {'data': pd.DataFrame({
+        'tahun': pd.array([2020, 2020, 2021, 2023, None], dtype='Int16'),
+        'berat': [1.0, 2.0, 4.0, 8.0, 16.0],
+    })}
+    series = sistok_charts.period_series(index, np.array([0, 1, 2, 3, 4]), 'Yearly')
+    assert series['periode'].tolist() == [2020, 2021, 2023]
+    assert series['berat'].tolist() == [3.0, 4.0, 8.0]
+
+    series = sistok_charts.period_series(index, np.array([2]), 'Yearly')
+    assert series['berat'].tolist() == [4.0]
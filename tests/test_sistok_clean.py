@@ -0,0 +1,66 @@
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+import sistok_clean
+import sistok_data
+
+HEADER = 'tanggal_berangkat,tanggal_kedatangan,jumlah_hari,berat,nilai_produksi,nama_ikan_id,catatan\n'
+
+
+def test_quality_flags_known_rows():
+    df = pd.DataFrame({
+        'tanggal_berangkat': ['2020-01-01', '2020-01-05', 'bukan tanggal', '2020-01-01'],
+        'tanggal_kedatangan': ['2020-01-03', '2020-01-01', '2020-01-02', '2020-01-01'],
+        'jumlah_hari': [3, 1, 1, 9],
+        'berat': [10.0, 5.0, 0.0, 2.0],
+        'nilai_produksi': [1000, 500, 100, -1],
+    })
+    flags, duration = sistok_clean.quality_flags(df)
+    issues = sistok_clean.ISSUES
+    assert flags[0] == 0
+    assert flags[1] & issues['tanggal_terbalik']
+    assert flags[2] == issues['tanggal_berangkat_tidak_valid'] | issues['berat_tidak_positif']
+    assert flags[3] == issues['durasi_tidak_cocok'] | issues['nilai_tidak_positif']
+    assert duration.iloc[0] == 3
+
+
+def test_normalize_species():
+    series = pd.Series(['Kembung Perempuan [RAB]', 'KEMBUNG PEREMPUAN', 'tongkol  ', None])
+    result = sistok_clean.normalize_species(series)
+    assert result.tolist()[:3] == ['Kembung Perempuan', 'Kembung Perempuan', 'Tongkol']
+    assert pd.isna(result.iloc[3])
+
+
+# Bagian pertama berisi berat bulat (int64) dan kolom catatan kosong; bagian
+# kedua berisi berat pecahan/kosong (float64) dan teks: skema Parquet berbeda
+def test_clean_file_parquet_unifies_part_schemas(tmp_path):
+    first = ''.join(f'2020-01-0{i},2020-01-0{i},1,{i},{i * 1000},Tongkol,\n' for i in range(1, 6))
+    second = ''.join(f"2020-02-01,2020-02-01,1,{'' if i % 2 else 2.5},5000,Layang,rusak\n" for i in range(1, 6))
+    source = tmp_path / 'mentah.csv'
+    source.write_text(HEADER + first + second)
+    output = str(tmp_path / 'bersih.parquet')
+
+    rows, report = sistok_clean.clean_file(str(source), output, workers=1, chunk_bytes=len(first) - 10)
+    table = pq.read_table(output)
+    assert rows == 10 and table.num_rows == 10
+    df = table.to_pandas()
+    assert df['berat'].tolist()[:5] == [1, 2, 3, 4, 5]
+    assert df['berat'].isna().sum() == 3
+    assert df['catatan'].tolist() == [None] * 5 + ['rusak'] * 5
+    # Nomor baris laporan kualitas mengikuti posisi di file, bukan di bagian
+    assert report['baris'].tolist() == [6, 8, 10]
+
+
+def test_cli_requires_output_and_keeps_source(tmp_path, capsys):
+    source = tmp_path / 'mentah.csv'
+    source.write_text(HEADER + '2020-01-01,2020-01-01,1,5,5000,Tongkol,\n')
+    with pytest.raises(SystemExit):
+        sistok_clean.main([str(source)])
+    with pytest.raises(SystemExit):
+        sistok_clean.main([str(source), '--output', sistok_data.SOURCE_PATH])
+    assert 'pointer Git LFS' in capsys.readouterr().err
+
+    output = tmp_path / 'bersih' / 'data_bersih.csv'
+    assert sistok_clean.main([str(source), '--output', str(output), '--workers', '1']) == 0
+    assert pd.read_csv(output)['harga_per_kg'].tolist() == [1000.0]
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import sistok_completeness
+
+
+def make_cube(rows):
+    cube = pd.DataFrame(rows, columns=['pelabuhan_kedatangan_id', 'nama_ikan_id', 'tahun', 'bulan', 'trip', 'berat'])
+    return cube.astype({'pelabuhan_kedatangan_id': 'category', 'nama_ikan_id': 'category'})
+
+
+# Pelabuhan A / Tongkol melapor Januari dan Februari 2020-2021; Januari 2022
+# hanya 2 trip dan Februari 2022 kosong. B / Layang hanya punya Februari 2022
+# (bulan terakhir data).
+def small_cube():
+    return make_cube([
+        ('A', 'Tongkol', 2020, 1, 10, 100.0),
+        ('A', 'Tongkol', 2021, 1, 12, 120.0),
+        ('A', 'Tongkol', 2022, 1, 2, 20.0),
+        ('A', 'Tongkol', 2020, 2, 8, 80.0),
+        ('A', 'Tongkol', 2021, 2, 8, 80.0),
+        ('B', 'Layang', 2022, 2, 5, 50.0),
+    ])
+
+
+def test_leave_one_out_median():
+    values = np.array([10.0, 12.0, 2.0, 8.0, 8.0, 0.0, 5.0, 1.0, 3.0, 9.0, 4.0])
+    groups = np.array([0, 0, 0, 1, 1, 1, 2, 3, 3, 3, 3])
+    result = sistok_completeness._leave_one_out_median(values, groups)
+    expected = [7, 6, 11, 4, 4, 8, np.nan, 4, 4, 3, 3]
+    assert result == pytest.approx(expected, nan_ok=True)
+
+
+def test_matrix_fills_grid_and_monthly_median():
+    matrix = sistok_completeness.completeness_matrix(small_cube())
+    a = matrix[matrix['pelabuhan_kedatangan_id'] == 'A']
+    # Januari 2020 .. Februari 2022, bulan tanpa laporan = 0
+    assert len(a) == 26
+    assert (a[a['bulan'] > 2]['trip'] == 0).all()
+    assert (a[a['bulan'] > 2]['trip_baseline'] == 0).all()
+    # Median Januari tahun-tahun lain: (12, 2), (10, 2), (10, 12)
+    january = a[a['bulan'] == 1]
+    assert january['trip_baseline'].tolist() == [7, 6, 11]
+    assert january['berat_baseline'].tolist() == [70.0, 60.0, 110.0]
+    # Februari 2022 tanpa laporan (0) ikut baseline 2020 dan 2021
+    assert a[a['bulan'] == 2]['trip_baseline'].tolist() == [4, 4, 8]
+
+    # Satu-satunya tahun pasangan: tidak ada baseline
+    b = matrix[matrix['pelabuhan_kedatangan_id'] == 'B']
+    assert b[['tahun', 'bulan', 'trip']].values.tolist() == [[2022, 2, 5]]
+    assert b['trip_baseline'].isna().all() and b['berat_baseline'].isna().all()
+
+
+def test_view_status_and_flags():
+    matrix = sistok_completeness.completeness_matrix(small_cube())
+    view = sistok_completeness.completeness_view(matrix, None, [], None, None)
+    status = dict(zip(view['pelabuhan_kedatangan_id'].astype(str) + ' ' + view['periode'], view['status'].astype(str)))
+    assert status == {
+        'A 2020-01': 'lengkap', 'A 2020-02': 'lengkap',
+        'A 2021-01': 'lengkap', 'A 2021-02': 'lengkap',
+        'A 2022-01': 'rendah', 'A 2022-02': 'kosong',
+        'B 2022-02': 'lengkap',
+    }
+    assert view[view['pelabuhan_kedatangan_id'] == 'B']['rasio_trip'].isna().all()
+
+    flags = sistok_completeness.completeness_flags(view)
+    assert flags['periode'].tolist() == ['2022-01', '2022-02']
+    assert flags['kekurangan_trip'].tolist() == [9, 8]
+
+
+def test_view_filters_year_range():
+    matrix = sistok_completeness.completeness_matrix(small_cube())
+    view = sistok_completeness.completeness_view(matrix, 'A', ['Tongkol'], 2022, 2022)
+    assert view['periode'].tolist() == ['2022-01', '2022-02']
+    assert view['rasio_trip'].tolist() == pytest.approx([2 / 11, 0.0])
+
+
+def test_gap_not_hidden_by_own_year():
+    # C / Kembung melapor setiap bulan 2020-2021, kecuali Juni 2021 hilang dan
+    # Januari 2021 turun ke 4 trip. Dengan median termasuk tahun sel itu,
+    # Januari 2021 dapat baseline 7 (rasio 0,57, lengkap).
+    rows = [('C', 'Kembung', year, month, 10, 100.0) for year in (2020, 2021) for month in range(1, 13) if (year, month) != (2021, 6)]
+    rows[12] = ('C', 'Kembung', 2021, 1, 4, 40.0)
+    matrix = sistok_completeness.completeness_matrix(make_cube(rows))
+    view = sistok_completeness.completeness_view(matrix, None, [], None, None)
+
+    flags = sistok_completeness.completeness_flags(view)
+    assert flags[['periode', 'status']].astype(str).values.tolist() == [['2021-06', 'kosong'], ['2021-01', 'rendah']]
+    assert flags['trip_baseline'].tolist() == [10, 10]
+    assert (view[~view['periode'].isin(['2021-01', '2021-06'])]['status'] == 'lengkap').all()
@@ -0,0 +1,248 @@
+import os
+import shutil
+import sys
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import sistok_data
+import sistok_query
+
+HEADER = 'pelabuhan_kedatangan_id,pelabuhan_keberangkatan_id,nama_ikan_id,jenis_api,provinsi,kelas_pelabuhan,berat,nilai_produksi,jumlah_hari,tanggal_berangkat,tanggal_kedatangan\n'
+
+
+def trip(day, berat, port='PPN Tegal', ikan='Tongkol'):
+    return f'{port},{port},{ikan},Payang,Jawa Tengah,PPN,{berat},{berat * 20000},1,{day},{day}\n'
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(sistok_data, 'SOURCE_PATH', str(tmp_path / 'data_bersih.csv'))
+    monkeypatch.setattr(sistok_data, 'CACHE_DIR', str(tmp_path / 'cache'))
+    return tmp_path
+
+
+def load(cache_dir, monkeypatch):
+    monkeypatch.setattr(sistok_data, 'CACHE_DIR', str(cache_dir))
+    df = sistok_data.load_dataset()
+    return df, sistok_data.read_meta(sistok_data.source_version())
+
+
+def comparable(df):
+    return df.astype({c: 'object' for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)})
+
+
+def test_row_digest_ignores_order_and_adds_up():
+    df = pd.DataFrame({'a': [1.0, 2.0, 3.0], 'b': ['x', 'y', 'z']})
+    hashes = sistok_data.row_hashes(df)
+    shuffled = sistok_data.row_hashes(df.iloc[[2, 0, 1]])
+    whole = sistok_data.combine_digest(None, 3, hashes)
+    assert whole == sistok_data.combine_digest(None, 3, shuffled)
+    assert whole == sistok_data.combine_digest(sistok_data.combine_digest(None, 1, hashes[:1]), 2, hashes[1:])
+    # int vs float hasil inferensi CSV tidak mengubah hash
+    assert np.array_equal(hashes, sistok_data.row_hashes(df.astype({'a': 'int64'})))
+
+
+def test_range_version_only_depends_on_years_in_range():
+    before = {'2020': 'a', '2021': 'b', '2022': 'c'}
+    after = {**before, '2022': 'changed'}
+    assert sistok_data.range_version(before, 2020, 2021) == sistok_data.range_version(after, 2020, 2021)
+    assert sistok_data.range_version(before, 2020, 2022) != sistok_data.range_version(after, 2020, 2022)
+    assert sistok_data.range_version({}, 2020, 2021) is None
+
+
+def test_append_refresh_matches_full_rebuild(data_dir, monkeypatch):
+    source = data_dir / 'data_bersih.csv'
+    base = ''.join(trip(f'2020-01-{d:02d}', 10 + d) for d in range(1, 13)) + trip('2021-05-01', 7)
+    source.write_text(HEADER + base)
+    first, meta = load(data_dir / 'cache', monkeypatch)
+    assert meta['refresh']['mode'] == 'rebuild'
+    assert len(first) == 13
+
+    # Baris baru di akhir file (termasuk satu baris terlambat untuk 2020)
+    with open(source, 'a') as file:
+        file.write(trip('2021-06-01', 9) + trip('2020-02-01', 300))
+    appended, meta = load(data_dir / 'cache', monkeypatch)
+    assert meta['refresh']['mode'] == 'append'
+    assert meta['refresh']['parsed_rows'] == 2
+    assert meta['refresh']['late_rows'] == 1
+    assert meta['changed_partitions'] == ['2020', '2021']
+
+    rebuilt, reference = load(data_dir / 'cache_ref', monkeypatch)
+    assert reference['refresh']['mode'] == 'rebuild'
+    assert reference['partitions'] == meta['partitions']
+    pd.testing.assert_frame_equal(comparable(appended), comparable(rebuilt), check_dtype=False)
+
+
+def test_edit_rewrites_only_changed_year(data_dir, monkeypatch):
+    source = data_dir / 'data_bersih.csv'
+    rows = [trip('2020-03-01', 10), trip('2021-03-01', 20), trip('2022-03-01', 30)]
+    source.write_text(HEADER + ''.join(rows))
+    load(data_dir / 'cache', monkeypatch)
+
+    rows[1] = trip('2021-03-01', 25)
+    source.write_text(HEADER + ''.join(rows))
+    df, meta = load(data_dir / 'cache', monkeypatch)
+    assert meta['refresh']['mode'] == 'rebuild'
+    assert meta['changed_partitions'] == ['2021']
+    assert df['berat'].tolist() == [10, 25, 30]
+
+
+def test_schema_dtypes():
+    df = sistok_data.apply_schema(pd.DataFrame({
+        'pelabuhan_kedatangan_id': ['PPN Tegal', 'PPN Tegal', 'PPN Brondong'],
+        'berat': [10, 250, 40_000],
+        'jumlah_hari': [1.0, 2.5, 3.0],
+        'nilai_produksi': [3_000_000_000, 250, 'rusak'],
+        'tahun': [2020.0, 2021.0, None],
+    }))
+    assert isinstance(df['pelabuhan_kedatangan_id'].dtype, pd.CategoricalDtype)
+    assert df['berat'].dtype == 'int32'
+    assert df['jumlah_hari'].dtype == 'float32'
+    # Nilai IDR di atas batas int32 tetap utuh; sel rusak jadi NaN
+    assert df['nilai_produksi'].dtype == 'float64'
+    assert df['nilai_produksi'].iloc[0] == 3_000_000_000
+    assert np.isnan(df['nilai_produksi'].iloc[2])
+    assert df['tahun'].dtype == 'Int16'
+
+
+def test_integer_sums_do_not_overflow():
+    # Berat bulat disimpan int32; total per grup melewati batas int32
+    df = sistok_data.apply_schema(pd.DataFrame({'berat': [2_000_000_000] * 4, 'jumlah_hari': [1] * 4}))
+    assert df['berat'].dtype == 'int32' and df['jumlah_hari'].dtype == 'int8'
+    groups = pd.Series(['a', 'a', 'a', 'b'])
+    assert df['berat'].groupby(groups).sum().tolist() == [6_000_000_000, 2_000_000_000]
+    assert df['berat'].sum() == 8_000_000_000
+
+
+# Hitung panggilan refresh_dataset: snapshot yang masih berlaku tidak memanggilnya
+def count_refreshes(monkeypatch):
+    calls = []
+    refresh = sistok_data.refresh_dataset
+
+    def counted(version=None):
+        calls.append(version)
+        return refresh(version)
+
+    monkeypatch.setattr(sistok_data, 'refresh_dataset', counted)
+    return calls
+
+
+def test_snapshot_reused_until_version_or_format_changes(data_dir, monkeypatch):
+    source = data_dir / 'data_bersih.csv'
+    source.write_text(HEADER + trip('2020-01-01', 10) + trip('2021-01-01', 20))
+    calls = count_refreshes(monkeypatch)
+
+    first = sistok_data.load_dataset()
+    version = sistok_data.source_version()
+    assert version == sistok_data.sha256_file(str(source))
+    assert os.path.exists(sistok_data.snapshot_path(version))
+    again = sistok_data.load_dataset()
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(comparable(first), comparable(again))
+
+    # Format snapshot naik: snapshot dan partisi lama tidak dipakai lagi
+    monkeypatch.setattr(sistok_data, 'SNAPSHOT_FORMAT', sistok_data.SNAPSHOT_FORMAT + 1)
+    rebuilt = sistok_data.load_dataset()
+    assert len(calls) == 2
+    refresh = sistok_data.read_meta(version)['refresh']
+    assert refresh['mode'] == 'rebuild' and refresh['parsed_rows'] == 2
+    pd.testing.assert_frame_equal(comparable(first), comparable(rebuilt))
+
+    # Isi sumber berubah: versi (sha256) baru, snapshot baru
+    source.write_text(HEADER + trip('2020-01-01', 10) + trip('2021-01-01', 25))
+    changed = sistok_data.load_dataset()
+    assert sistok_data.source_version() != version
+    assert len(calls) == 3
+    assert changed['berat'].tolist() == [10, 25]
+
+
+def test_lfs_pointer_downloads_and_verifies(data_dir, monkeypatch):
+    original = data_dir / 'asli.csv'
+    original.write_text(HEADER + trip('2020-01-01', 10) + trip('2020-02-01', 30))
+    sha256 = sistok_data.sha256_file(str(original))
+    pointer = data_dir / 'data_bersih.csv'
+    pointer.write_text(f'{sistok_data.LFS_HEADER}\noid sha256:{sha256}\nsize {original.stat().st_size}\n')
+    assert sistok_data.read_lfs_pointer() == {'sha256': sha256, 'size': original.stat().st_size}
+    assert sistok_data.source_version() == sha256
+
+    # gdown diganti salinan file lokal (tanpa jaringan)
+    downloads = []
+
+    def download(url, path, quiet=False):
+        downloads.append(url)
+        shutil.copy(original, path)
+
+    monkeypatch.setitem(sys.modules, 'gdown', types.SimpleNamespace(download=download))
+    df = sistok_data.load_dataset()
+    assert df['berat'].tolist() == [10, 30]
+    assert downloads == [sistok_data.drive_url]
+    # CSV unduhan dihapus setelah partisi ditulis; load berikutnya tanpa unduh
+    assert not os.path.exists(os.path.join(sistok_data.CACHE_DIR, 'data_bersih.csv'))
+    sistok_data.load_dataset()
+    assert len(downloads) == 1
+
+
+def test_lfs_download_checksum_mismatch(data_dir, monkeypatch):
+    (data_dir / 'data_bersih.csv').write_text(f'{sistok_data.LFS_HEADER}\noid sha256:{"0" * 64}\nsize 10\n')
+
+    def download(url, path, quiet=False):
+        with open(path, 'w') as file:
+            file.write(HEADER + trip('2020-01-01', 10))
+
+    monkeypatch.setitem(sys.modules, 'gdown', types.SimpleNamespace(download=download))
+    with pytest.raises(ValueError, match='Checksum'):
+        sistok_data.load_dataset()
+    assert not os.path.exists(os.path.join(sistok_data.CACHE_DIR, 'data_bersih.csv'))
+
+
+def test_period_keys_and_labels():
+    tanggal = pd.to_datetime(['1970-01-01', '2024-01-01', '2024-01-07', '2024-01-08', '2024-02-29', None])
+    df = sistok_data.add_period_keys(pd.DataFrame({'tanggal_kedatangan': tanggal}))
+    assert df['periode_hari'].tolist()[:2] == [0, 19723]
+    # 2024-01-01 hari Senin: 1-7 Januari satu minggu, 8 Januari minggu berikutnya
+    weeks = df['periode_minggu'].tolist()
+    assert weeks[1] == weeks[2] == weeks[3] - 1
+    assert df['periode_bulan'].tolist()[:5] == [0, 648, 648, 648, 649]
+    assert df[['periode_hari', 'periode_minggu', 'periode_bulan']].iloc[-1].isna().all()
+
+    # Sama dengan label periode pandas
+    dated = tanggal[:-1]
+    assert sistok_data.period_labels(df['periode_hari'][:5], 'Daily') == dated.strftime('%Y-%m-%d').tolist()
+    assert sistok_data.period_labels(df['periode_minggu'][:5], 'Weekly') == [
+        f"{p.start_time:%Y-%m-%d}/{p.end_time:%Y-%m-%d}" for p in dated.to_period('W-SUN')
+    ]
+    assert sistok_data.period_labels(df['periode_bulan'][:5], 'Monthly') == dated.strftime('%Y-%m').tolist()
+    assert sistok_data.period_start(weeks[1:2], 'Weekly').tolist() == [np.datetime64('2024-01-01')]
+    assert sistok_data.period_start([649], 'Monthly').tolist() == [np.datetime64('2024-02-01')]
+
+
+def test_label_periods_categorical():
+    labels = sistok_data.label_periods(pd.Series([649, 648, 649, 650]), 'Monthly')
+    assert list(labels.categories) == ['2024-01', '2024-02', '2024-03']
+    assert labels.astype(str).tolist() == ['2024-02', '2024-01', '2024-02', '2024-03']
+    assert sistok_data.label_periods(pd.Series([2021, 2020]), 'Yearly').astype(str).tolist() == ['2021', '2020']
+
+
+def test_snapshot_is_shared_read_only(data_dir):
+    rows = [trip('2022-03-01', 30), trip('2020-03-01', 10, port='PPN Brondong'), trip('2021-03-01', 20)]
+    (data_dir / 'data_bersih.csv').write_text(HEADER + ''.join(rows))
+    df = sistok_data.load_dataset()
+
+    # Kolom angka, tanggal dan kode kategori adalah view read-only atas file snapshot
+    for values in [df['berat'].to_numpy(), df['nilai_produksi'].to_numpy(), df['tanggal_kedatangan'].to_numpy(),
+                   df['pelabuhan_kedatangan_id'].cat.codes.to_numpy()]:
+        assert not values.flags.writeable
+    with pytest.raises(ValueError):
+        df['nilai_produksi'].to_numpy()[0] = 0
+
+    # Snapshot urut per tahun, jadi index filter memakai frame yang sama tanpa copy
+    assert df['tahun'].tolist() == [2020, 2021, 2022]
+    index = sistok_query.build_filter_index(df)
+    assert index['data'] is df
+    filtered = sistok_query.filter_data(index, 'PPN Tegal', [], None, None, 'Monthly')
+    filtered['berat'] = filtered['berat'] * 2
+    assert filtered['berat'].tolist() == [40, 60]
+    assert df['berat'].tolist() == [10, 20, 30]
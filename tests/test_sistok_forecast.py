@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import sistok_forecast
+
+PATTERN = np.array([5, 8, 12, 20, 30, 25, 18, 10, 6, 4, 3, 4], dtype='float64')
+
+
+# Matriks bulanan kecil: musiman tepat 4 tahun, konstan 4 tahun, dan deret
+# pendek yang baru mulai 5 bulan sebelum akhir data (Desember 2023)
+def small_matrix():
+    rows = []
+    for year in range(2020, 2024):
+        for month in range(1, 13):
+            rows.append(('A', 'Tongkol', year, month, PATTERN[month - 1]))
+            rows.append(('A', 'Layang', year, month, 40.0))
+    for month, berat in zip(range(8, 13), [10.0, 20.0, 30.0, 40.0, 50.0]):
+        rows.append(('B', 'Tongkol', 2023, month, berat))
+    matrix = pd.DataFrame(rows, columns=['pelabuhan_kedatangan_id', 'nama_ikan_id', 'tahun', 'bulan', 'berat'])
+    return matrix.astype({'pelabuhan_kedatangan_id': 'category', 'nama_ikan_id': 'category'})
+
+
+def series(result, port, species):
+    forecast = result['forecast']
+    selected = forecast[(forecast['pelabuhan_kedatangan_id'] == port) & (forecast['nama_ikan_id'] == species)]
+    model = result['models'].set_index(['pelabuhan_kedatangan_id', 'nama_ikan_id']).loc[(port, species)]
+    return selected, model
+
+
+def test_series_matrix_starts():
+    keys, Y, start, first_year = sistok_forecast.series_matrix(small_matrix())
+    assert first_year == 2020
+    assert Y.shape == (3, 48)
+    assert dict(zip(zip(keys['pelabuhan_kedatangan_id'], keys['nama_ikan_id']), start)) == {
+        ('A', 'Tongkol'): 0, ('A', 'Layang'): 0, ('B', 'Tongkol'): 43,
+    }
+    assert np.isnan(Y[2, :43]).all()
+
+
+def test_seasonal_series_repeats_pattern():
+    result = sistok_forecast.fit_forecasts(small_matrix(), horizon=12)
+    forecast, model = series(result, 'A', 'Tongkol')
+    assert forecast['tahun'].tolist() == [2024] * 12
+    assert forecast['bulan'].tolist() == list(range(1, 13))
+    assert forecast['berat'].to_numpy() == pytest.approx(PATTERN, abs=1e-6)
+    assert model['model'] in ('musiman_naif', 'holt_winters')
+    assert model['mae'] == pytest.approx(0, abs=1e-6)
+
+
+def test_constant_series_stays_constant():
+    result = sistok_forecast.fit_forecasts(small_matrix(), horizon=6)
+    forecast, model = series(result, 'A', 'Layang')
+    assert forecast['berat'].to_numpy() == pytest.approx(np.full(6, 40.0))
+    assert model['mae'] == pytest.approx(0, abs=1e-9)
+    assert model['panjang'] == 48
+
+
+def test_short_series_uses_mean():
+    result = sistok_forecast.fit_forecasts(small_matrix(), horizon=3)
+    forecast, model = series(result, 'B', 'Tongkol')
+    # Belum bisa di-backtest: rata-rata bulan yang ada, tanpa MAE
+    assert model['model'] == 'rata_rata'
+    assert np.isnan(model['mae'])
+    assert model['panjang'] == 5
+    assert forecast['berat'].tolist() == [30.0, 30.0, 30.0]
+
+
+def test_empty_matrix():
+    result = sistok_forecast.fit_forecasts(small_matrix().iloc[:0])
+    assert result['forecast'].empty and result['models'].empty
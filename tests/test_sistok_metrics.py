@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+import sistok_metrics
+
+pytest.importorskip('prometheus_client')
+
+
+# Handler log yang dipasang exporter dilepas lagi supaya tes lain tidak ikut menulis
+@pytest.fixture
+def exporter_factory():
+    before = list(sistok_metrics.logger.handlers)
+    yield sistok_metrics.MetricsExporter
+    for handler in sistok_metrics.logger.handlers[len(before):]:
+        sistok_metrics.logger.removeHandler(handler)
+        handler.close()
+
+
+def make_trace(page='dashboard', rows=120):
+    trace = sistok_metrics.RerunTrace(page)
+    trace.lap('load_data')
+    trace.lap('filter', rows=rows)
+    return trace
+
+
+def test_trace_spans():
+    trace = make_trace()
+    assert [span['stage'] for span in trace.spans] == ['load_data', 'filter']
+    assert trace.spans[0]['rows'] is None and trace.spans[1]['rows'] == 120
+    assert trace.total_ms() == pytest.approx(sum(span['ms'] for span in trace.spans))
+    assert trace.to_dict()['page'] == 'dashboard'
+
+
+def test_record_updates_metrics_and_writes_files(tmp_path, exporter_factory):
+    # Folder tujuan belum ada (mis. metrics/ pada checkout baru)
+    textfile = tmp_path / 'metrics' / 'sistok.prom'
+    log_path = tmp_path / 'log' / 'rerun.jsonl'
+    exporter = exporter_factory(textfile=str(textfile), log_path=str(log_path), min_interval=0)
+
+    def sample(name, **labels):
+        return exporter.registry.get_sample_value(name, labels)
+
+    exporter.record(make_trace(rows=120))
+    exporter.record(make_trace(rows=80))
+    exporter.record(make_trace(page='analysis', rows=5))
+
+    assert sample('sistok_reruns_total', page='dashboard') == 2
+    assert sample('sistok_reruns_total', page='analysis') == 1
+    assert sample('sistok_stage_duration_seconds_count', page='dashboard', stage='filter') == 2
+    assert sample('sistok_stage_duration_seconds_bucket', page='dashboard', stage='filter', le='+Inf') == 2
+    # Gauge baris = rerun terakhir
+    assert sample('sistok_stage_rows', page='dashboard', stage='filter') == 80
+    assert sample('sistok_stage_rows', page='dashboard', stage='load_data') is None
+
+    text = textfile.read_text()
+    assert 'sistok_reruns_total{page="dashboard"} 2.0' in text
+    assert 'sistok_stage_rows{page="analysis",stage="filter"} 5.0' in text
+
+    for handler in sistok_metrics.logger.handlers:
+        handler.flush()
+    lines = [json.loads(line) for line in log_path.read_text().splitlines()]
+    assert [line['page'] for line in lines] == ['dashboard', 'dashboard', 'analysis']
+    assert [span['rows'] for span in lines[1]['spans']] == [None, 80]
+
+
+def test_textfile_throttled(tmp_path, exporter_factory):
+    textfile = tmp_path / 'sistok.prom'
+    exporter = exporter_factory(textfile=str(textfile), min_interval=0)
+    exporter.record(make_trace())
+    first = textfile.read_text()
+    exporter.min_interval = 3600
+    exporter.record(make_trace())
+    # Rerun kedua dalam min_interval: file belum ditulis ulang
+    assert textfile.read_text() == first
+    assert exporter.registry.get_sample_value('sistok_reruns_total', {'page': 'dashboard'}) == 2
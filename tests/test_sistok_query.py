@@ -0,0 +1,266 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import sistok_query
+
+
+# Lima trip, sengaja tidak urut tahun: build_filter_index mengurutkannya
+def small_index():
+    df = pd.DataFrame({
+        'tahun': pd.array([2021, 2020, 2022, 2020, 2021], dtype='Int16'),
+        'pelabuhan_kedatangan_id': pd.Categorical(['A', 'B', 'A', 'A', 'B']),
+        'nama_ikan_id': pd.Categorical(['Tongkol', 'Tongkol', 'Layang', 'Layang', 'Layang']),
+        'berat': [30.0, 10.0, 50.0, 20.0, 40.0],
+        'jenis_api': pd.Categorical(['Payang'] * 5),
+    })
+    return sistok_query.build_filter_index(df)
+
+
+def test_select_rows_by_filter():
+    index = small_index()
+    data = index['data']
+    assert data['tahun'].tolist() == [2020, 2020, 2021, 2021, 2022]
+
+    rows = sistok_query.select_rows(index, 'A', [], None, None)
+    assert sorted(data['berat'].take(rows)) == [20.0, 30.0, 50.0]
+    rows = sistok_query.select_rows(index, None, ['Layang'], 2021, 2022)
+    assert sorted(data['berat'].take(rows)) == [40.0, 50.0]
+    rows = sistok_query.select_rows(index, 'C', [], None, None)
+    assert sistok_query.count_rows(index, rows) == 0
+
+
+def test_page_data_sorts_and_projects():
+    index = small_index()
+    rows = sistok_query.select_rows(index, None, [], None, None)
+    ordered = sistok_query.sort_rows(index, rows, 'berat', 'Yearly', ascending=False)
+
+    first = sistok_query.page_data(index, ordered, ['nama_ikan_id', 'berat'], 'Yearly', 1, 2)
+    assert first.columns.tolist() == ['nama_ikan_id', 'berat']
+    assert first['berat'].tolist() == [50.0, 40.0]
+    last = sistok_query.page_data(index, ordered, ['berat', 'kolom_tidak_ada'], 'Yearly', 3, 2)
+    assert last.columns.tolist() == ['berat']
+    assert last['berat'].tolist() == [10.0]
+    assert sistok_query.page_data(index, ordered, ['berat'], 'Yearly', 4, 2).empty
+    assert np.array_equal(np.sort(ordered), rows)
+
+
+# Trip acak kecil dengan skema dataset (tanpa snapshot), untuk dibandingkan
+# dengan mask boolean langsung di DataFrame
+def random_trips(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    tanggal = pd.Timestamp('2019-01-01') + pd.to_timedelta(rng.integers(0, 4 * 365, n), unit='D')
+    return pd.DataFrame({
+        'pelabuhan_kedatangan_id': pd.Categorical(rng.choice(['A', 'B', 'C'], n)),
+        'nama_ikan_id': pd.Categorical(rng.choice(['Tongkol', 'Layang', 'Kembung', 'Tenggiri'], n)),
+        'jenis_api': pd.Categorical(rng.choice(['Payang', 'Rawai', 'Bubu'], n)),
+        'tanggal_kedatangan': tanggal,
+        'tahun': pd.array(tanggal.year, dtype='Int16'),
+        'berat': rng.integers(1, 500, n).astype('int16'),
+        'nilai_produksi': rng.integers(1, 500, n) * 10000.0,
+        'jumlah_hari': rng.integers(1, 5, n).astype('int8'),
+        'anomali': rng.random(n) < 0.05,
+    })
+
+
+def naive_mask(df, port, species, start_year, end_year):
+    mask = pd.Series(True, index=df.index)
+    if port:
+        mask &= df['pelabuhan_kedatangan_id'] == port
+    if species:
+        mask &= df['nama_ikan_id'].isin(species)
+    if start_year:
+        mask &= df['tahun'] >= start_year
+    if end_year:
+        mask &= df['tahun'] <= end_year
+    return mask
+
+
+CUBE_FILTERS = [
+    (None, [], None, None),
+    ('A', [], None, None),
+    (None, ['Tongkol', 'Layang'], 2020, 2021),
+    ('B', ['Kembung'], 2022, None),
+    ('C', ['Tidak Ada'], None, None),
+]
+
+
+@pytest.mark.parametrize('selection', CUBE_FILTERS)
+def test_cube_summary_matches_naive_mask(selection):
+    df = random_trips()
+    cube = sistok_query.build_cube(df)
+    assert int(cube['trip'].sum()) == len(df)
+    summary = sistok_query.dashboard_summary(sistok_query.slice_cube(cube, *selection))
+    expected = df[naive_mask(df, *selection)]
+
+    totals = summary['totals']
+    assert totals['trip'] == len(expected)
+    assert totals['berat'] == pytest.approx(float(expected['berat'].sum()))
+    assert totals['nilai_produksi'] == pytest.approx(float(expected['nilai_produksi'].sum()))
+    assert totals['jumlah_hari'] == expected['jumlah_hari'].sum()
+    assert totals['jenis_ikan'] == expected['nama_ikan_id'].nunique()
+    if expected.empty:
+        assert summary['tahun_min'] is None
+        return
+
+    assert summary['tahun_min'] == expected['tahun'].min() and summary['tahun_max'] == expected['tahun'].max()
+    yearly = expected.groupby('tahun')['berat'].sum()
+    assert summary['tangkapan_tahunan']['tahun'].tolist() == yearly.index.tolist()
+    assert summary['tangkapan_tahunan']['berat'].tolist() == yearly.astype(float).tolist()
+    gears = expected.groupby('jenis_api', observed=True)['berat'].sum().sort_values(ascending=False)
+    assert summary['alat_tangkap_dominan']['berat'].tolist() == gears.astype(float).tolist()
+
+
+def test_cube_keeps_month_and_anomaly_dimensions():
+    df = random_trips()
+    cube = sistok_query.build_cube(df)
+    assert not cube.duplicated(sistok_query.CUBE_KEYS).any()
+    normal = cube[~cube['anomali']]
+    assert normal['trip'].sum() == (~df['anomali']).sum()
+    march = cube[cube['bulan'] == 3]
+    assert march['berat'].sum() == df[df['tanggal_kedatangan'].dt.month == 3]['berat'].sum()
+    assert sistok_query.build_cube(df.iloc[:0]).columns.tolist() == sistok_query.CUBE_KEYS + sistok_query.CUBE_MEASURES
+
+
+@pytest.mark.parametrize('selection', CUBE_FILTERS)
+def test_filter_data_matches_naive_mask(selection):
+    df = random_trips().assign(trip_id=np.arange(300))
+    df.loc[df.index[:3], 'tahun'] = pd.NA
+    index = sistok_query.build_filter_index(df)
+    assert np.all(np.diff(index['tahun'][~np.isnan(index['tahun'])]) >= 0)
+
+    result = sistok_query.filter_data(index, *selection, 'Yearly')
+    expected = df[naive_mask(df, *selection).fillna(False)]
+    assert sorted(result['trip_id']) == sorted(expected['trip_id'])
+    # Hasil urut per tahun, baris tanpa tahun di akhir (hanya tanpa filter tahun)
+    years = result['tahun'].dropna().to_numpy()
+    assert np.all(np.diff(years) >= 0)
+    dated = result['tahun'].notna()
+    assert result['time_period'][dated].astype(str).tolist() == result['tahun'][dated].astype(str).tolist()
+    assert result['time_period'][~dated].isna().all()
+
+
+def test_filter_key_normalises_selection():
+    a = sistok_query.filter_key('v1', 'A', ['Tongkol', 'Layang'], 2020.0, None, 'Yearly')
+    b = sistok_query.filter_key('v1', 'A', ['Layang', 'Tongkol'], 2020, 0, 'Yearly')
+    assert a == b == ('v1', 'A', ('Layang', 'Tongkol'), 2020, None, 'Yearly')
+    assert sistok_query.filter_key('v2', 'A', ['Tongkol', 'Layang'], 2020, None, 'Yearly') != a
+    assert sistok_query.filter_key('v1', '', [], None, None, 'Yearly')[1:3] == (None, ())
+
+
+def test_result_cache_hit_and_lru_eviction():
+    cache = sistok_query.ResultCache(max_entries=2)
+    calls = []
+
+    def compute(value):
+        calls.append(value)
+        return value
+
+    assert cache.get_or_compute('a', lambda: compute('A')) == 'A'
+    assert cache.get_or_compute('a', lambda: compute('A2')) == 'A'
+    cache.put('b', 'B')
+    # 'a' baru dipakai, jadi 'b' yang paling lama tidak dipakai
+    cache.get('a')
+    cache.put('c', 'C')
+    assert cache.get('b') is None
+    assert cache.get('a') == 'A' and cache.get('c') == 'C'
+    assert calls == ['A']
+    assert cache.stats() == {'entries': 2, 'bytes': 2, 'hits': 4, 'misses': 2, 'evictions': 1}
+
+
+def test_result_cache_byte_limit():
+    frame = pd.DataFrame({'x': np.zeros(1000)})
+    size = sistok_query._size_of(frame)
+    cache = sistok_query.ResultCache(max_bytes=int(size * 2.5))
+    for key in 'abc':
+        cache.put(key, frame)
+    assert [cache.get(key) is not None for key in 'abc'] == [False, True, True]
+    assert cache.stats()['bytes'] == 2 * size
+    # Nilai yang lebih besar dari batas tidak disimpan sama sekali
+    cache.put('besar', pd.DataFrame({'x': np.zeros(10_000)}))
+    assert cache.get('besar') is None and cache.stats()['entries'] == 2
+
+
+def test_result_cache_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(sistok_query.time, 'monotonic', lambda: now[0])
+    cache = sistok_query.ResultCache(ttl=60)
+    cache.put('a', 'A')
+    now[0] += 59
+    assert cache.get('a') == 'A'
+    now[0] += 2
+    assert cache.get('a') is None
+    assert cache.stats()['entries'] == 0 and cache.stats()['evictions'] == 1
+    # Hitung ulang setelah kadaluarsa
+    assert cache.get_or_compute('a', lambda: 'A2') == 'A2'
+
+
+def test_gear_cpue_known_stock():
+    cube = pd.DataFrame({
+        'pelabuhan_kedatangan_id': ['A', 'A', 'A', 'A', 'B'],
+        'nama_ikan_id': ['Tongkol'] * 5,
+        'tahun': [2020, 2020, 2020, 2021, 2020],
+        'bulan': [1, 2, 1, 1, 1],
+        'jenis_api': ['Payang', 'Payang', 'Rawai', 'Rawai', 'Bubu'],
+        'berat': [600.0, 400.0, 500.0, 300.0, 50.0],
+        'jumlah_hari': [4, 6, 10, 3, 0],
+    })
+    table = sistok_query.gear_cpue(cube).set_index(['pelabuhan_kedatangan_id', 'tahun', 'jenis_api'])
+    # Stok A/2020: Payang 1 ton / 10 hari, Rawai 0,5 ton / 10 hari
+    payang, rawai = table.loc[('A', 2020, 'Payang')], table.loc[('A', 2020, 'Rawai')]
+    assert (payang['catch'], payang['effort'], payang['CPUE'], payang['FPI']) == pytest.approx((1.0, 10.0, 0.1, 1.0))
+    assert (rawai['CPUE'], rawai['FPI'], rawai['effort_std']) == pytest.approx((0.05, 0.5, 5.0))
+    # Satu alat di stoknya sendiri: FPI 1; effort 0: CPUE dan FPI kosong
+    assert table.loc[('A', 2021, 'Rawai'), 'FPI'] == 1.0
+    assert np.isnan(table.loc[('B', 2020, 'Bubu'), 'CPUE']) and np.isnan(table.loc[('B', 2020, 'Bubu'), 'FPI'])
+
+
+def test_gear_cpue_matches_per_stock_loop():
+    df = random_trips()
+    table = sistok_query.gear_cpue(sistok_query.build_cube(df))
+    for (port, species, year), stock in df.groupby(sistok_query.STOCK_KEYS, observed=True):
+        gears = stock.groupby('jenis_api', observed=True).agg(catch=('berat', 'sum'), effort=('jumlah_hari', 'sum'))
+        cpue = gears['catch'] / 1000 / gears['effort']
+        rows = table[
+            (table['pelabuhan_kedatangan_id'] == port) & (table['nama_ikan_id'] == species) & (table['tahun'] == year)
+        ].set_index('jenis_api')
+        assert rows['CPUE'].to_dict() == pytest.approx(cpue.to_dict())
+        assert rows['FPI'].to_dict() == pytest.approx((cpue / cpue.max()).to_dict())
+
+
+@pytest.mark.parametrize('selections, species, start_year, end_year', [
+    ({'pelabuhan_kedatangan_id': ['A', 'C']}, [], None, None),
+    ({'jenis_api': ['Rawai', 'Payang']}, ['Tongkol', 'Layang'], 2020, 2021),
+    ({'pelabuhan_kedatangan_id': ['B', 'A'], 'jenis_api': ['Bubu', 'Rawai']}, [], 2021, None),
+])
+def test_compare_groups_matches_naive_mask(selections, species, start_year, end_year):
+    df = random_trips()
+    result = sistok_query.compare_groups(sistok_query.build_cube(df), selections, species, start_year, end_year, n=2)
+    keys = [key for key in sistok_query.COMPARE_KEYS if selections.get(key)]
+    totals = result['totals'].set_index('grup')
+
+    labels = [' / '.join(values) for values in itertools.product(*(selections[key] for key in keys))]
+    assert list(result['totals']['grup'].cat.categories) == labels
+    for label in labels:
+        values = label.split(' / ')
+        mask = naive_mask(df, None, species, start_year, end_year)
+        for key, value in zip(keys, values):
+            mask &= df[key] == value
+        group = df[mask]
+        if group.empty:
+            assert label not in totals.index
+            continue
+        row = totals.loc[label]
+        assert row['trip'] == len(group)
+        assert row['berat'] == pytest.approx(group['berat'].sum())
+        assert row['nilai_produksi'] == pytest.approx(group['nilai_produksi'].sum())
+        assert row['jenis_ikan'] == group['nama_ikan_id'].nunique()
+        assert row['CPUE'] == pytest.approx(group['berat'].sum() / group['jumlah_hari'].sum())
+
+        yearly = result['yearly'][result['yearly']['grup'] == label].set_index('tahun')['berat']
+        assert yearly.to_dict() == pytest.approx(group.groupby('tahun')['berat'].sum().astype(float).to_dict())
+        top = result['top_species'][result['top_species']['grup'] == label]
+        expected_top = group.groupby('nama_ikan_id', observed=True)['berat'].sum().sort_values(ascending=False).head(2)
+        assert top['berat'].tolist() == pytest.approx(expected_top.astype(float).tolist())
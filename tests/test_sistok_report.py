@@ -0,0 +1,121 @@
+import os
+import zipfile
+
+import pandas as pd
+
+import sistok_report
+
+TABLES = {
+    'produksi_tahunan': pd.DataFrame({'tahun': [2020, 2021, 2022], 'Produksi (Ton)': [1.5, 2.0, 1.25]}),
+    'trip_per_alat': pd.DataFrame({'jenis_api': ['Payang', 'Rawai', 'Jumlah'], 'Total': [3.0, 5.0, 8.0]}),
+}
+
+
+# Jalankan satu job sampai selesai (termasuk _prune) dan return status akhirnya
+def run_job(jobs, key, options, tables=TABLES):
+    jobs.submit(key, options, tables)
+    jobs._executor.shutdown(wait=True)
+    return jobs.status(key, options)
+
+
+def old_reports(output_dir, count, fmt='pdf'):
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for i in range(count):
+        path = os.path.join(output_dir, f'laporan-lama{i}.{fmt}')
+        with open(path, 'w') as file:
+            file.write('lama')
+        os.utime(path, (1000 + i, 1000 + i))
+        paths.append(path)
+    return paths
+
+
+def test_job_writes_reports(tmp_path):
+    jobs = sistok_report.ReportJobs(str(tmp_path))
+    options = sistok_report.report_options(['trip_per_alat', 'produksi_tahunan'])
+    assert options['tables'] == ['produksi_tahunan', 'trip_per_alat']
+    key = sistok_report.report_key('abc', options)
+    assert jobs.status(key, options) is None
+
+    job = run_job(jobs, key, options)
+    assert job['done'] and job['error'] is None
+    assert job['stage'] == 'Selesai' and job['progress'] == 1.0
+    assert sorted(job['paths']) == ['pdf', 'xlsx']
+    for path in job['paths'].values():
+        assert os.path.getsize(path) > 0
+    assert not [name for name in os.listdir(tmp_path) if '.tmp.' in name]
+
+    # Job baru (mis. setelah restart app) memakai file yang sudah ada
+    restarted = sistok_report.ReportJobs(str(tmp_path))
+    assert restarted.submit(key, options, {})['stage'] == 'Selesai'
+    # Workbook: satu sheet per tabel, masing-masing dengan chart Excel
+    with zipfile.ZipFile(job['paths']['xlsx']) as workbook:
+        names = workbook.namelist()
+        sheets = workbook.read('xl/workbook.xml').decode()
+    assert 'name="produksi_tahunan"' in sheets and 'name="trip_per_alat"' in sheets
+    assert len([name for name in names if name.startswith('xl/charts/chart')]) == 2
+
+
+def test_prune_keeps_newest(tmp_path, monkeypatch):
+    monkeypatch.setattr(sistok_report, 'MAX_REPORTS', 2)
+    old = old_reports(str(tmp_path), 3)
+    jobs = sistok_report.ReportJobs(str(tmp_path))
+    options = sistok_report.report_options(['produksi_tahunan'], ['pdf'])
+    job = run_job(jobs, sistok_report.report_key('abc', options), options)
+
+    assert job['stage'] == 'Selesai'
+    assert sorted(os.listdir(tmp_path)) == sorted([os.path.basename(job['paths']['pdf']), os.path.basename(old[2])])
+    # Laporan yang sudah dihapus tidak dianggap selesai lagi
+    assert jobs.status('lama0', options) is None
+
+
+def test_prune_skips_vanished_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(sistok_report, 'MAX_REPORTS', 1)
+    old = old_reports(str(tmp_path), 4)
+    jobs = sistok_report.ReportJobs(str(tmp_path))
+
+    # Worker lain menghapus file di antara listdir dan getmtime/remove
+    getmtime, remove = os.path.getmtime, os.remove
+
+    def vanishing_getmtime(path):
+        if path == old[0]:
+            remove(path)
+        return getmtime(path)
+
+    def racing_remove(path):
+        remove(path)
+        if path == old[1]:
+            raise FileNotFoundError(path)
+
+    monkeypatch.setattr(os.path, 'getmtime', vanishing_getmtime)
+    monkeypatch.setattr(os, 'remove', racing_remove)
+    jobs._prune()
+    assert os.listdir(tmp_path) == [os.path.basename(old[3])]
+
+
+def test_prune_error_does_not_fail_report(tmp_path, monkeypatch):
+    jobs = sistok_report.ReportJobs(str(tmp_path))
+
+    def broken_prune():
+        raise PermissionError('folder laporan read-only')
+
+    monkeypatch.setattr(jobs, '_prune', broken_prune)
+    options = sistok_report.report_options(['produksi_tahunan'], ['pdf'])
+    job = run_job(jobs, sistok_report.report_key('abc', options), options)
+    assert job['stage'] == 'Selesai' and job['error'] is None
+    assert os.path.exists(job['paths']['pdf'])
+
+
+def test_failed_writer_marks_job(tmp_path, monkeypatch):
+    def broken_writer(tables, path, charts=True, progress=None):
+        raise ValueError('tabel rusak')
+
+    monkeypatch.setitem(sistok_report.WRITERS, 'pdf', broken_writer)
+    jobs = sistok_report.ReportJobs(str(tmp_path))
+    options = sistok_report.report_options(['produksi_tahunan'], ['pdf'])
+    key = sistok_report.report_key('abc', options)
+    jobs.submit(key, options, TABLES)
+    jobs._executor.shutdown(wait=True)
+    job = jobs._jobs[key]
+    assert job['done'] and job['stage'] == 'Gagal'
+    assert job['error'] == 'ValueError: tabel rusak'
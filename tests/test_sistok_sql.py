@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import sistok_charts
+import sistok_data
+import sistok_query
+import sistok_sql
+
+pytest.importorskip('duckdb')
+
+HEADER = 'pelabuhan_kedatangan_id,pelabuhan_keberangkatan_id,nama_ikan_id,jenis_api,provinsi,kelas_pelabuhan,berat,nilai_produksi,jumlah_hari,tanggal_berangkat,tanggal_kedatangan\n'
+ROWS = [
+    ('PPN Tegal', 'Tongkol', 'Payang', 10, '2020-01-05'),
+    ('PPN Tegal', 'Layang', 'Payang', 20, '2020-02-05'),
+    ('PPN Brondong', 'Tongkol', 'Rawai', 30, '2020-02-07'),
+    ('PPN Tegal', 'Tongkol', 'Rawai', 40, '2021-03-01'),
+    ('PPN Brondong', 'Layang', 'Payang', 50, '2022-04-01'),
+    ('PPN Tegal', 'Tongkol', 'Payang', 60, '2022-04-02'),
+]
+
+
+# Dataset kecil yang sama untuk kedua backend: snapshot pandas dan partisi Parquet
+@pytest.fixture
+def backends(tmp_path, monkeypatch):
+    source = tmp_path / 'data_bersih.csv'
+    source.write_text(HEADER + ''.join(
+        f'{port},{port},{ikan},{alat},Jawa Tengah,PPN,{berat},{berat * 1000},2,{day},{day}\n'
+        for port, ikan, alat, berat, day in ROWS
+    ))
+    monkeypatch.setattr(sistok_data, 'SOURCE_PATH', str(source))
+    monkeypatch.setattr(sistok_data, 'CACHE_DIR', str(tmp_path / 'cache'))
+    df = sistok_data.load_dataset()
+    _, manifest = sistok_data.refresh_dataset()
+    return sistok_query.build_filter_index(df), sistok_sql.open_source(manifest, threads=1)
+
+
+FILTERS = [
+    (None, [], None, None),
+    ('PPN Tegal', [], None, None),
+    (None, ['Layang'], 2020, 2021),
+    ('PPN Tegal', ['Tongkol'], 2021, 2022),
+]
+
+
+@pytest.mark.parametrize('selection', FILTERS)
+def test_select_and_page_match_pandas(backends, selection):
+    index, source = backends
+    rows = sistok_query.select_rows(index, *selection)
+    selected = sistok_sql.select_rows(source, *selection)
+    assert sistok_sql.count_rows(source, selected) == sistok_query.count_rows(index, rows)
+
+    columns = ['pelabuhan_kedatangan_id', 'nama_ikan_id', 'berat', 'time_period']
+    expected = sistok_query.page_data(index, sistok_query.sort_rows(index, rows, 'berat', 'Monthly'), columns, 'Monthly', 1, 50)
+    actual = sistok_sql.page_data(source, sistok_sql.sort_rows(source, selected, 'berat', 'Monthly'), columns, 'Monthly', 1, 50)
+    assert actual['berat'].tolist() == expected['berat'].tolist()
+    assert actual['time_period'].astype(str).tolist() == expected['time_period'].astype(str).tolist()
+
+
+def test_search_matches_pandas(backends):
+    index, source = backends
+    rows = sistok_query.search_rows(index, sistok_query.select_rows(index, None, [], None, None), ['nama_ikan_id'], 'layang')
+    selected = sistok_sql.search_rows(source, sistok_sql.select_rows(source, None, [], None, None), ['nama_ikan_id'], 'layang')
+    assert sistok_sql.count_rows(source, selected) == len(rows) == 2
+
+
+def test_cube_and_period_series_match_pandas(backends):
+    index, source = backends
+    keys = sistok_query.CUBE_KEYS
+    expected = sistok_query.build_cube(index['data']).astype({k: 'object' for k in keys}).sort_values(keys[:5]).reset_index(drop=True)
+    actual = sistok_sql.build_cube(source).astype({k: 'object' for k in keys}).sort_values(keys[:5]).reset_index(drop=True)
+    assert actual['trip'].sum() == len(ROWS)
+    for measure in sistok_query.CUBE_MEASURES:
+        assert np.allclose(actual[measure].astype(float), expected[measure].astype(float))
+
+    rows = sistok_query.select_rows(index, 'PPN Tegal', [], None, None)
+    expected = sistok_charts.period_series(index, rows, 'Yearly')
+    actual = sistok_sql.period_series(source, sistok_sql.select_rows(source, 'PPN Tegal', [], None, None), 'Yearly')
+    pd.testing.assert_frame_equal(actual.reset_index(drop=True), expected.reset_index(drop=True), check_dtype=False)
+    assert actual['berat'].tolist() == [30, 40, 60]
@@ -0,0 +1,91 @@
+import os
+
+import numpy as np
+import pytest
+
+import sistok_analysis
+import sistok_surplus
+
+SAMPLE = os.path.join(os.path.dirname(__file__), '..', 'data', 'data_kembung_karangantu.csv')
+EFFORT = np.array([200.0, 500.0, 800.0, 1200.0, 1600.0, 2000.0, 2600.0])
+
+
+def fit_one(catch, effort, n_boot=0):
+    results, n_years = sistok_surplus.fit_batch(np.asarray([catch]), np.asarray([effort]), n_boot=n_boot)
+    return {name: {key: value[0] for key, value in model.items()} for name, model in results.items()}, n_years[0]
+
+
+def test_fox_nonlinear_recovers_known_curve():
+    a, b = -2.0, -0.0005
+    results, n_years = fit_one(EFFORT * np.exp(a + b * EFFORT), EFFORT)
+    fox = results['Fox nonlinear']
+    assert n_years == len(EFFORT)
+    assert fox['konvergen']
+    assert fox['a'] == pytest.approx(a, rel=1e-6)
+    assert fox['b'] == pytest.approx(b, rel=1e-6)
+    # MSY = -exp(a - 1) / b, E_MSY = -1 / b
+    assert fox['msy'] == pytest.approx(np.exp(-3) / 0.0005, rel=1e-6)
+    assert fox['e_msy'] == pytest.approx(2000, rel=1e-6)
+
+
+def test_levenberg_marquardt_from_poor_start():
+    E = np.array([[0.2, 0.5, 0.8, 1.2, 1.6, 2.0]])
+    C = E * np.exp(1.5 - 0.7 * E)
+    w = np.ones_like(E)
+    c, d, converged = sistok_surplus._fox_levenberg_marquardt(C, E, w, np.array([-3.0]), np.array([2.0]))
+    assert converged[0]
+    assert c[0] == pytest.approx(1.5, rel=1e-6)
+    assert d[0] == pytest.approx(-0.7, rel=1e-6)
+
+
+def test_schaefer_nonlinear_recovers_known_parabola():
+    a, b = 0.2, -0.00005
+    results, _ = fit_one(a * EFFORT + b * EFFORT ** 2, EFFORT)
+    schaefer = results['Schaefer nonlinear']
+    assert schaefer['msy'] == pytest.approx(a ** 2 / (4 * 0.00005), rel=1e-6)
+    assert schaefer['e_msy'] == pytest.approx(2000, rel=1e-6)
+
+
+def test_too_few_years_is_nan():
+    results, n_years = fit_one([10.0, 12.0, np.nan], [100.0, 150.0, 200.0])
+    assert n_years == 2
+    for model in results.values():
+        assert np.isnan(model['msy'])
+        assert not model['konvergen']
+
+
+# Data contoh: optimum kuadrat terkecil Fox nonlinear punya b > 0 (tidak ada
+# MSY); dicek terhadap scipy.optimize.least_squares (a=-2.784, b=1.25e-4)
+def test_karangantu_sample():
+    with open(SAMPLE, 'rb') as file:
+        aggregates = sistok_analysis.ingest_upload(file)['aggregates']
+    series, models = sistok_surplus.assess_upload(aggregates, n_boot=200)
+    models = models.set_index('model')
+
+    fox = models.loc['Fox nonlinear']
+    assert fox['konvergen']
+    assert fox['a'] == pytest.approx(-2.784, abs=1e-3)
+    assert fox['b'] == pytest.approx(1.25e-4, rel=1e-2)
+    C, E = series['catch'].to_numpy(), series['effort_std'].to_numpy()
+    assert ((C - E * np.exp(fox['a'] + fox['b'] * E)) ** 2).sum() == pytest.approx(59622, rel=1e-3)
+    assert np.isnan(fox['msy']) and np.isnan(fox['e_msy'])
+
+    # Estimasi titik NaN -> interval juga NaN
+    for name in ['Fox nonlinear', 'Schaefer nonlinear']:
+        row = models.loc[name]
+        assert np.isnan(row[['msy_lo', 'msy_hi', 'e_msy_lo', 'e_msy_hi']].astype(float)).all()
+    assert models['boot_valid'].between(0, 1).all()
+
+
+def test_ci_blank_when_few_valid_replicates():
+    # Kurva Fox tepat: semua replikasi valid, interval ada dan memuat estimasi titik
+    results, _ = fit_one(EFFORT * np.exp(-2.0 - 0.0005 * EFFORT), EFFORT, n_boot=100)
+    fox = results['Fox nonlinear']
+    assert fox['boot_valid'] == pytest.approx(1.0)
+    assert fox['msy_lo'] <= fox['msy'] <= fox['msy_hi']
+
+    # Tangkapan naik terus dengan effort: MSY tidak ada, interval dikosongkan
+    results, _ = fit_one(0.05 * EFFORT * (1 + 0.1 * np.sin(EFFORT)), EFFORT, n_boot=100)
+    for model in results.values():
+        if np.isnan(model['msy']) or model['boot_valid'] < sistok_surplus.MIN_VALID_BOOT:
+            assert np.isnan(model['msy_lo']) and np.isnan(model['msy_hi'])